@@ -1,5 +1,7 @@
 """Run the FastAPI server."""
 
+import sys
+
 import uvicorn
 from src.infrastructure.config import settings
 
@@ -10,4 +12,6 @@ if __name__ == "__main__":
         port=settings.api_port,
         reload=settings.debug,
         log_level=settings.log_level.lower(),
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
     )
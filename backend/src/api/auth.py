@@ -1,5 +1,7 @@
 """API authentication using Bearer tokens."""
 
+import hmac
+import json
 import secrets
 
 from fastapi import HTTPException, Security, status
@@ -10,6 +12,9 @@ from ..infrastructure.config import settings
 # Security scheme for Bearer token
 security = HTTPBearer()
 
+# Encoded once so compare_digest does not re-encode the key on every request
+_API_KEY_BYTES = settings.api_key.encode("utf-8")
+
 
 async def verify_api_key(
     credentials: HTTPAuthorizationCredentials = Security(security),
@@ -25,8 +30,10 @@ async def verify_api_key(
     Raises:
         HTTPException: If the API key is invalid
     """
+    token = credentials.credentials.encode("utf-8")
+
     # Use constant-time comparison to prevent timing attacks
-    if not secrets.compare_digest(credentials.credentials, settings.api_key):
+    if not secrets.compare_digest(token, _API_KEY_BYTES):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key",
@@ -34,3 +41,67 @@ async def verify_api_key(
         )
 
     return credentials.credentials
+
+
+class BearerAuthMiddleware:
+    """Pure ASGI middleware that checks the Bearer token for protected paths.
+
+    Runs before routing and dependency injection, so protected requests are
+    authenticated straight from the raw ASGI headers without building
+    HTTPAuthorizationCredentials for every call.
+
+    Headers whose length differs from "Bearer <api_key>" are rejected before
+    any parsing. This reveals the key length to a caller probing with
+    different lengths; the key is random and high-entropy, so knowing its
+    length does not help guess it.
+    """
+
+    def __init__(self, app, api_key: bytes, protected_prefix: str = "/api/admin") -> None:
+        """Initialize the middleware.
+
+        Args:
+            app: Downstream ASGI application
+            api_key: Expected API key, already encoded to bytes
+            protected_prefix: Path prefix that requires authentication
+        """
+        self.app = app
+        self.api_key = api_key
+        self.protected_prefix = protected_prefix
+        self._expected_len = len(b"Bearer ") + len(api_key)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.protected_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        token = b""
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                if len(value) != self._expected_len:
+                    break
+                scheme, _, credentials = value.partition(b" ")
+                if scheme.lower() == b"bearer":
+                    token = credentials.strip()
+                break
+
+        # Use constant-time comparison to prevent timing attacks
+        if not token or not hmac.compare_digest(token, self.api_key):
+            await self._send_unauthorized(send)
+            return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _send_unauthorized(send) -> None:
+        """Send a 401 response directly, mirroring verify_api_key's error."""
+        body = json.dumps({"detail": "Invalid API key"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status.HTTP_401_UNAUTHORIZED,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"www-authenticate", b"Bearer"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,36 +1,71 @@
 """FastAPI application entry point."""
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from contextlib import asynccontextmanager
+from typing import Optional
 import logging
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+import logging.config
 
+import orjson
+
+from ..infrastructure.claude_client import claude_client
 from ..infrastructure.config import settings
+from ..infrastructure.database import db
+from ..infrastructure.validation_logger import validation_logger
+from .auth import BearerAuthMiddleware
+from .rate_limit import TokenBucketMiddleware
 from .routes import health, analyze, admin
 
 # Configure logging
-logging.basicConfig(
-    level=getattr(logging, settings.log_level),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
+logging.config.dictConfig({
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "default": {
+            "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        },
+    },
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+            "formatter": "default",
+        },
+    },
+    "root": {
+        "level": settings.log_level,
+        "handlers": ["console"],
+    },
+})
 
 logger = logging.getLogger(__name__)
 
-# Initialize rate limiter
-# 100 requests per minute per IP - very generous for normal use
-limiter = Limiter(key_func=get_remote_address, default_limits=["100/minute"])
+# Serialized OpenAPI schema, built once per process (routes never change at runtime)
+_openapi_bytes: Optional[bytes] = None
+
+
+def _frozen_openapi() -> bytes:
+    """Return the serialized OpenAPI schema, building it on first use."""
+    global _openapi_bytes
+    if _openapi_bytes is None:
+        _openapi_bytes = orjson.dumps(app.openapi())
+    return _openapi_bytes
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
     logger.info("Starting Ruh API...")
-    logger.info(f"Debug mode: {settings.debug}")
+    logger.info("Debug mode: %s", settings.debug)
+    _frozen_openapi()
+    validation_logger.start()
     yield
     logger.info("Shutting down Ruh API...")
+    await validation_logger.stop()
+    await db.close()
+    await claude_client.close()
 
 
 # Create FastAPI app
@@ -40,11 +75,43 @@ app = FastAPI(
     version="0.1.0",
     debug=settings.debug,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # C-implemented JSON encoding
+    # Served below from a schema frozen at startup
+    openapi_url=None,
+)
+
+# Admin API runs as a mounted sub-application with its own middleware stack:
+# every path is authenticated at the ASGI layer and gets a stricter limit.
+admin_app = FastAPI(
+    title="Ruh Admin API",
+    debug=settings.debug,
+    default_response_class=ORJSONResponse,
+)
+admin_app.add_middleware(
+    BearerAuthMiddleware,
+    api_key=settings.api_key.encode(),
+    protected_prefix="",
+)
+# Outermost in the sub-app so failed auth attempts are rate limited too
+admin_app.add_middleware(
+    TokenBucketMiddleware,
+    capacity=settings.admin_rate_limit_per_minute,
+    rate=settings.admin_rate_limit_per_minute / 60,
+    redis_url=settings.redis_url,
+    key_prefix="tb:admin",
 )
+admin_app.include_router(admin.router, tags=["admin"])
 
 # Add rate limiting
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# 100 requests per minute per IP (bursts up to 100) - very generous for normal use
+# Admin requests are limited by admin_app's own bucket instead.
+app.add_middleware(
+    TokenBucketMiddleware,
+    capacity=settings.rate_limit_per_minute,
+    rate=settings.rate_limit_per_minute / 60,
+    redis_url=settings.redis_url,
+    exempt_prefix="/api/admin",
+)
 
 # Configure CORS for Chrome extensions and web clients
 # Origins configured via ALLOWED_ORIGINS env var (comma-separated)
@@ -52,16 +119,34 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization", "Accept"],
+    allow_methods=["GET", "POST", "PUT", "DELETE"],  # OPTIONS preflights are handled by the middleware
+    allow_headers=["Content-Type", "Authorization"],  # Accept is CORS-safelisted
     expose_headers=["X-Request-ID"],
-    max_age=3600,  # Cache preflight requests for 1 hour
+    max_age=86400,  # Cache preflight requests for 24 hours (Chrome caps at 2h, Firefox at 24h)
 )
 
 # Include routers
 app.include_router(health.router, prefix="/api", tags=["health"])
 app.include_router(analyze.router, prefix="/api", tags=["analysis"])
-app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+app.mount("/api/admin", admin_app)
+
+
+@app.get("/openapi.json", include_in_schema=False)
+async def openapi_json() -> Response:
+    """Serve the pre-serialized OpenAPI schema."""
+    return Response(_frozen_openapi(), media_type="application/json")
+
+
+@app.get("/docs", include_in_schema=False)
+async def swagger_ui() -> HTMLResponse:
+    """Swagger UI backed by the frozen schema."""
+    return get_swagger_ui_html(openapi_url="/openapi.json", title=f"{app.title} - Swagger UI")
+
+
+@app.get("/redoc", include_in_schema=False)
+async def redoc() -> HTMLResponse:
+    """ReDoc backed by the frozen schema."""
+    return get_redoc_html(openapi_url="/openapi.json", title=f"{app.title} - ReDoc")
 
 
 @app.get("/")
@@ -0,0 +1,230 @@
+"""Token-bucket rate limiting.
+
+Provides a global pure-ASGI middleware and a per-route FastAPI dependency for
+stricter limits on expensive endpoints. Buckets live in Redis (when REDIS_URL
+is configured) so limits are shared across uvicorn workers and Cloud Run
+instances. Without Redis each process keeps its own buckets in memory.
+"""
+
+import logging
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+logger = logging.getLogger(__name__)
+
+# Atomically refill and take one token from the bucket stored at KEYS[1].
+# ARGV: capacity, refill rate (tokens/second), current unix time (seconds)
+# Returns: {allowed (0/1), tokens remaining (floored)}
+TOKEN_BUCKET_LUA = """
+local cap = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local t = redis.call('HMGET', KEYS[1], 'tok', 'ts')
+local tok = tonumber(t[1]) or cap
+local ts = tonumber(t[2]) or now
+tok = math.min(cap, tok + math.max(0, now - ts) * rate)
+local allowed = 0
+if tok >= 1 then
+    tok = tok - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tok', tok, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(cap / rate) + 1)
+return {allowed, math.floor(tok)}
+"""
+
+
+class TokenBucket:
+    """Per-client token buckets, stored in Redis or in process memory.
+
+    Each client gets a bucket of `capacity` tokens refilled at `rate` tokens
+    per second; a request spends one token.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        rate: float,
+        redis_url: str = "",
+        key_prefix: str = "tb",
+    ) -> None:
+        """Initialize the buckets.
+
+        Args:
+            capacity: Maximum burst size (tokens per bucket)
+            rate: Refill rate in tokens per second
+            redis_url: Redis URL for shared buckets; in-memory if empty
+            key_prefix: Bucket key namespace, so separate limiters don't share buckets
+        """
+        self.capacity = capacity
+        self.rate = rate
+        self.key_prefix = key_prefix
+        self._script = None
+        self._local: Dict[str, Tuple[float, float]] = {}
+        self._local_max_keys = 10_000
+
+        if redis_url:
+            try:
+                import redis.asyncio as redis
+
+                client = redis.from_url(redis_url)
+                self._script = client.register_script(TOKEN_BUCKET_LUA)
+                logger.info(f"Rate limiter '{key_prefix}' using Redis token buckets")
+            except Exception as e:
+                logger.error(f"Failed to initialize Redis rate limiter, using in-memory buckets: {e}")
+
+    @property
+    def retry_after(self) -> int:
+        """Seconds until an empty bucket has a token again."""
+        return max(1, math.ceil(1 / self.rate))
+
+    async def take(self, client_id: str) -> Optional[Tuple[bool, int]]:
+        """Take one token from a client's bucket.
+
+        Args:
+            client_id: Client identifier (IP address)
+
+        Returns:
+            (allowed, tokens remaining), or None if Redis failed
+        """
+        key = f"{self.key_prefix}:{client_id}"
+        now = time.time()
+
+        if self._script is not None:
+            try:
+                allowed, remaining = await self._script(
+                    keys=[key], args=[self.capacity, self.rate, now]
+                )
+                return bool(allowed), int(remaining)
+            except Exception as e:
+                logger.warning(f"⚠️  Rate limiter Redis call failed (allowing request): {e}")
+                return None
+
+        if len(self._local) >= self._local_max_keys:
+            # Drop buckets idle long enough to have refilled completely
+            idle_after = self.capacity / self.rate
+            self._local = {
+                k: v for k, v in self._local.items() if now - v[1] < idle_after
+            }
+
+        tokens, last = self._local.get(key, (float(self.capacity), now))
+        tokens = min(self.capacity, tokens + max(0.0, now - last) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._local[key] = (tokens, now)
+        return allowed, int(tokens)
+
+
+class TokenBucketMiddleware:
+    """Pure ASGI middleware enforcing a per-client token bucket.
+
+    Requests are allowed through if Redis is unreachable, matching how the
+    rest of the app treats optional infrastructure.
+    """
+
+    def __init__(
+        self,
+        app,
+        capacity: int = 100,
+        rate: float = 100 / 60,
+        redis_url: str = "",
+        key_prefix: str = "tb",
+        exempt_prefix: Optional[str] = None,
+    ) -> None:
+        """Initialize the middleware.
+
+        Args:
+            app: Downstream ASGI application
+            capacity: Maximum burst size (tokens per bucket)
+            rate: Refill rate in tokens per second
+            redis_url: Redis URL for shared buckets; in-memory if empty
+            key_prefix: Bucket key namespace, so separate limiters don't share buckets
+            exempt_prefix: Path prefix skipped by this limiter (limited elsewhere)
+        """
+        self.app = app
+        self.bucket = TokenBucket(capacity, rate, redis_url, key_prefix)
+        self.exempt_prefix = exempt_prefix
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or (
+            self.exempt_prefix and scope["path"].startswith(self.exempt_prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        result = await self.bucket.take(client[0] if client else "unknown")
+        if result is None:
+            # Limiter backend unavailable - fail open
+            await self.app(scope, receive, send)
+            return
+
+        allowed, remaining = result
+        if not allowed:
+            await self._send_rate_limited(send)
+            return
+
+        limit_headers = [
+            (b"ratelimit-limit", str(self.bucket.capacity).encode()),
+            (b"ratelimit-remaining", str(remaining).encode()),
+        ]
+
+        async def send_with_headers(message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + limit_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    async def _send_rate_limited(self, send) -> None:
+        """Send a 429 response with Retry-After and RateLimit headers."""
+        body = b'{"detail":"Rate limit exceeded. Please try again later."}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.bucket.retry_after).encode()),
+                (b"ratelimit-limit", str(self.bucket.capacity).encode()),
+                (b"ratelimit-remaining", b"0"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class RouteRateLimit:
+    """FastAPI dependency adding a stricter token bucket to a single route.
+
+    Applied on top of the global TokenBucketMiddleware limit, e.g.
+    `dependencies=[Depends(RouteRateLimit("analyze", 30))]`.
+    """
+
+    def __init__(self, name: str, per_minute: int, redis_url: str = "") -> None:
+        """Initialize the route limit.
+
+        Args:
+            name: Route name, used as the bucket key namespace
+            per_minute: Requests per minute per client (also the burst size)
+            redis_url: Redis URL for shared buckets; in-memory if empty
+        """
+        self.bucket = TokenBucket(per_minute, per_minute / 60, redis_url, f"tb:{name}")
+
+    async def __call__(self, request: Request) -> None:
+        """Spend a token for this request.
+
+        Raises:
+            HTTPException: 429 if the client's bucket is empty
+        """
+        client = request.client
+        result = await self.bucket.take(client.host if client else "unknown")
+        if result is not None and not result[0]:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded. Please try again later.",
+                headers={"Retry-After": str(self.bucket.retry_after)},
+            )
@@ -1,16 +1,207 @@
-"""Admin API endpoints for monitoring and management."""
-
-from fastapi import APIRouter, HTTPException, Depends, Query
-from datetime import datetime, timezone, timedelta
-from typing import List, Optional, Dict, Any
+"""Admin API endpoints for monitoring and management.
+
+Served from the admin sub-application mounted at /api/admin in main.py, whose
+BearerAuthMiddleware authenticates every route here.
+"""
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+import asyncio
+import hashlib
+from datetime import date, datetime, timezone, timedelta
+from time import monotonic
+from typing import List, Optional, Dict, Any, Tuple
+from uuid import UUID
 import logging
 
+import orjson
+
+from ...infrastructure.config import settings
 from ...infrastructure.database import db
-from ..auth import verify_api_key
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Validation log pagination bounds
+MAX_LOGS_PAGE_SIZE = 200
+MAX_OFFSET_WINDOW = 10_000
+
+# validation_logs columns callers may request via `fields`
+LOG_COLUMNS = frozenset({
+    "id", "timestamp", "log_type", "product_url", "product_name",
+    "substance_name", "severity", "confidence", "category", "cas_number",
+    "source", "details", "created_at",
+})
+
+# Columns returned by default - what the admin log table actually shows
+DEFAULT_LOG_FIELDS = "id,timestamp,log_type,product_url,product_name,substance_name,severity,confidence"
+
+# PostgREST base params shared by every log query, and the (column, operator)
+# applied for each of _build_logs_query's filter arguments, in order
+LOG_ORDER = ('order', 'timestamp.desc,id.desc')
+LOG_FILTERS = (
+    ('timestamp', 'gte'),    # start_date
+    ('timestamp', 'lte'),    # end_date
+    ('product_url', 'eq'),   # product_url
+    ('log_type', 'eq'),      # log_type
+)
+
+# Short-lived per-process cache for read-only aggregate endpoints
+# Key: (endpoint, param) -> (expiry, data)
+STATS_CACHE_TTL_SECONDS = 30
+_stats_cache: Dict[Tuple[str, int], Tuple[float, Any]] = {}
+
+# Browser/proxy cache lifetime for the read-only aggregate endpoints
+STATS_CACHE_CONTROL = f"private, max-age={STATS_CACHE_TTL_SECONDS}"
+
+
+def _get_cached_stats(key: Tuple[str, int]) -> Optional[Any]:
+    """Return cached data for key if present and not expired (disabled in debug)."""
+    if settings.debug:
+        return None
+    entry = _stats_cache.get(key)
+    if entry and entry[0] > monotonic():
+        return entry[1]
+    return None
+
+
+def _cache_stats(key: Tuple[str, int], data: Any) -> None:
+    """Cache data for key for STATS_CACHE_TTL_SECONDS."""
+    if not settings.debug:
+        _stats_cache[key] = (monotonic() + STATS_CACHE_TTL_SECONDS, data)
+
+
+def _cacheable_json(request: Request, payload: Any) -> Response:
+    """Serialize payload with an ETag, answering 304 if the client has it.
+
+    Args:
+        request: Incoming request (checked for If-None-Match)
+        payload: JSON-serializable response data
+
+    Returns:
+        304 Not Modified if the client's ETag matches, otherwise the JSON body
+        with ETag and Cache-Control headers
+    """
+    body = orjson.dumps(payload)
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": STATS_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def _fetch_validation_stats(days: int) -> Dict[str, Any]:
+    """Fetch validation summary stats for the past N days (cached)."""
+    cached = _get_cached_stats(("stats", days))
+    if cached is not None:
+        return cached
+
+    # Call SQL function
+    data = await db.rpc('get_recent_validation_summary', {'days_back': days})
+
+    if not data:
+        stats = {
+            "total_products_analyzed": 0,
+            "total_invalid_allergens": 0,
+            "total_invalid_pfas": 0,
+            "accuracy_rate": 100.0,
+            "most_problematic_products": [],
+            "days_analyzed": days
+        }
+    else:
+        stats = data[0]
+        stats["days_analyzed"] = days
+
+    _cache_stats(("stats", days), stats)
+    return stats
+
+
+async def _fetch_flagged_substances(limit: int) -> List[Dict[str, Any]]:
+    """Fetch the most frequently flagged substances (cached)."""
+    cached = _get_cached_stats(("flagged", limit))
+    if cached is not None:
+        return cached
+
+    # Call SQL function
+    substances = await db.rpc('get_most_flagged_substances', {'result_limit': limit}) or []
+    _cache_stats(("flagged", limit), substances)
+    return substances
+
+
+async def _fetch_recent_logs(limit: int) -> List[Dict[str, Any]]:
+    """Fetch the most recent validation logs (first page, no filters)."""
+    logs, _ = await db.select('validation_logs', {
+        'select': DEFAULT_LOG_FIELDS,
+        'order': 'timestamp.desc,id.desc',
+        'limit': limit,
+    })
+    return logs
+
+
+def _parse_log_fields(fields: Optional[str]) -> str:
+    """Validate a comma-separated column list against LOG_COLUMNS.
+
+    id and timestamp are always included since pagination cursors need them.
+
+    Raises:
+        HTTPException: If an unknown column is requested
+    """
+    if not fields:
+        return DEFAULT_LOG_FIELDS
+
+    columns = [column.strip() for column in fields.split(",") if column.strip()]
+    unknown = [column for column in columns if column not in LOG_COLUMNS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+
+    for required in ("timestamp", "id"):
+        if required not in columns:
+            columns.insert(0, required)
+
+    return ",".join(columns)
+
+
+def _build_logs_query(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    product_url: Optional[str],
+    log_type: Optional[str],
+    limit: int,
+    select: str = DEFAULT_LOG_FIELDS
+) -> List[Tuple[str, Any]]:
+    """Build PostgREST params for a filtered validation_logs page.
+
+    Rows are ordered by (timestamp DESC, id DESC) - id breaks ties between
+    logs sharing a timestamp so keyset pagination is stable.
+    """
+    params: List[Tuple[str, Any]] = [('select', select), LOG_ORDER, ('limit', limit)]
+
+    values = (start_date, end_date, product_url, log_type)
+    params.extend(
+        (column, f'{op}.{value}')
+        for (column, op), value in zip(LOG_FILTERS, values)
+        if value
+    )
+
+    return params
+
+
+def _keyset_filter(cursor_ts: str, cursor_id: str) -> Tuple[str, str]:
+    """PostgREST filter emulating (timestamp, id) < (cursor_ts, cursor_id)."""
+    return (
+        'or',
+        f'(timestamp.lt."{cursor_ts}",'
+        f'and(timestamp.eq."{cursor_ts}",id.lt.{cursor_id}))'
+    )
+
 
 @router.get("/validation-logs")
 async def get_validation_logs(
@@ -18,23 +209,51 @@ async def get_validation_logs(
     end_date: Optional[str] = Query(None, description="End date (ISO format: YYYY-MM-DD)"),
     product_url: Optional[str] = Query(None, description="Filter by product URL"),
     log_type: Optional[str] = Query(None, description="Filter by log type (invalid_allergen, invalid_pfas, etc.)"),
-    limit: int = Query(100, ge=1, le=1000, description="Maximum number of logs to return"),
-    offset: int = Query(0, ge=0, description="Number of logs to skip"),
-    api_key: str = Depends(verify_api_key)
+    limit: int = Query(100, ge=1, le=MAX_LOGS_PAGE_SIZE, description="Maximum number of logs to return"),
+    cursor_ts: Optional[datetime] = Query(None, description="Keyset cursor: timestamp of the last log seen"),
+    cursor_id: Optional[UUID] = Query(None, description="Keyset cursor: id of the last log seen"),
+    offset: int = Query(0, ge=0, description="Number of logs to skip (deprecated, use cursor)"),
+    include_count: bool = Query(False, description="Also return the exact total row count (slow)"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return")
 ) -> Dict[str, Any]:
     """Get validation logs with optional filtering.
 
+    Pagination is keyset-based on (timestamp DESC, id DESC): pass back the
+    `next_cursor` from the previous page as `cursor_ts` / `cursor_id` so deep
+    pages cost the same as the first one. `offset` is still honoured when no
+    cursor is given, for older clients.
+
     Query Parameters:
         - start_date: Filter logs from this date (ISO format)
         - end_date: Filter logs until this date (ISO format)
         - product_url: Filter by specific product URL
         - log_type: Filter by log type
-        - limit: Maximum number of results (default: 100, max: 1000)
-        - offset: Pagination offset (default: 0)
+        - limit: Maximum number of results (default: 100, max: 200)
+        - cursor_ts: Timestamp of the last log from the previous page
+        - cursor_id: ID of the last log from the previous page
+        - offset: Pagination offset (default: 0, ignored when a cursor is given,
+          offset + limit may not exceed 10,000)
+        - include_count: Return the exact number of matching logs (default: false)
+        - fields: Columns to return (default: the columns shown in the admin log table)
 
     Returns:
-        Dictionary with logs array and metadata
+        Dictionary with logs array, metadata and next_cursor (None on the last page)
     """
+    if (cursor_ts is None) != (cursor_id is None):
+        raise HTTPException(
+            status_code=400,
+            detail="cursor_ts and cursor_id must be provided together"
+        )
+
+    # Bound per-request work independent of table size
+    if cursor_ts is None and offset + limit > MAX_OFFSET_WINDOW:
+        raise HTTPException(
+            status_code=400,
+            detail="Use cursor pagination for deep pages"
+        )
+
+    select = _parse_log_fields(fields)
+
     if not db.is_available:
         raise HTTPException(
             status_code=503,
@@ -42,33 +261,29 @@ async def get_validation_logs(
         )
 
     try:
-        # Build query
-        query = db.client.table('validation_logs').select('*')
+        # Build query with filters
+        params = _build_logs_query(start_date, end_date, product_url, log_type, limit, select)
 
-        # Apply filters
-        if start_date:
-            query = query.gte('timestamp', start_date)
+        # Apply pagination
+        if cursor_ts is not None:
+            params.append(_keyset_filter(cursor_ts.isoformat(), str(cursor_id)))
+        else:
+            params.append(('offset', offset))
 
-        if end_date:
-            query = query.lte('timestamp', end_date)
+        # Execute query - only ask PostgREST for a count when requested, it is a full scan
+        logs, total = await db.select('validation_logs', params, count=include_count)
 
-        if product_url:
-            query = query.eq('product_url', product_url)
-
-        if log_type:
-            query = query.eq('log_type', log_type)
-
-        # Apply pagination and sorting
-        query = query.order('timestamp', desc=True).range(offset, offset + limit - 1)
-
-        # Execute query
-        response = query.execute()
+        next_cursor = None
+        if len(logs) == limit:
+            next_cursor = {"timestamp": logs[-1]["timestamp"], "id": logs[-1]["id"]}
 
         return {
-            "logs": response.data,
-            "count": len(response.data),
+            "logs": logs,
+            "count": len(logs),
             "offset": offset,
             "limit": limit,
+            "next_cursor": next_cursor,
+            "total": total,
             "filters": {
                 "start_date": start_date,
                 "end_date": end_date,
@@ -78,21 +293,88 @@ async def get_validation_logs(
         }
 
     except Exception as e:
-        logger.error(f"Failed to fetch validation logs: {e}", exc_info=True)
+        logger.error("Failed to fetch validation logs: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch validation logs: {str(e)}"
         )
 
 
+@router.get("/validation-logs/stream")
+async def stream_validation_logs(
+    start_date: Optional[str] = Query(None, description="Start date (ISO format: YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="End date (ISO format: YYYY-MM-DD)"),
+    product_url: Optional[str] = Query(None, description="Filter by product URL"),
+    log_type: Optional[str] = Query(None, description="Filter by log type (invalid_allergen, invalid_pfas, etc.)"),
+    max_rows: int = Query(1000, ge=1, le=MAX_OFFSET_WINDOW, description="Maximum number of logs to stream"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return")
+) -> StreamingResponse:
+    """Stream validation logs as NDJSON (one JSON object per line).
+
+    Rows are fetched from PostgREST in keyset-paginated batches and written
+    out as they arrive, so memory stays bounded by one batch and the first
+    rows are sent before the whole result set has been read.
+
+    Query Parameters:
+        - start_date: Filter logs from this date (ISO format)
+        - end_date: Filter logs until this date (ISO format)
+        - product_url: Filter by specific product URL
+        - log_type: Filter by log type
+        - max_rows: Maximum number of logs to stream (default: 1000, max: 10,000)
+        - fields: Columns to return (default: the columns shown in the admin log table)
+
+    Returns:
+        application/x-ndjson stream of validation logs, newest first
+    """
+    select = _parse_log_fields(fields)
+
+    if not db.is_available:
+        raise HTTPException(
+            status_code=503,
+            detail="Database unavailable"
+        )
+
+    async def generate_rows():
+        remaining = max_rows
+        cursor: Optional[Tuple[str, str]] = None
+
+        try:
+            while remaining > 0:
+                batch_size = min(MAX_LOGS_PAGE_SIZE, remaining)
+                params = _build_logs_query(
+                    start_date, end_date, product_url, log_type, batch_size, select
+                )
+                if cursor:
+                    params.append(_keyset_filter(*cursor))
+
+                logs, _ = await db.select('validation_logs', params)
+                for log in logs:
+                    yield orjson.dumps(log) + b"\n"
+
+                remaining -= len(logs)
+                if len(logs) < batch_size:
+                    break
+                cursor = (logs[-1]["timestamp"], logs[-1]["id"])
+        except Exception as e:
+            # Headers are already sent, so the stream just ends early
+            logger.error("Failed to stream validation logs: %s", e, exc_info=True)
+
+    return StreamingResponse(generate_rows(), media_type="application/x-ndjson")
+
+
 @router.get("/validation-stats")
 async def get_validation_stats(
-    days: int = Query(7, ge=1, le=90, description="Number of days to look back"),
-    api_key: str = Depends(verify_api_key)
-) -> Dict[str, Any]:
+    request: Request,
+    days: int = Query(7, ge=1, le=90, description="Number of days to look back")
+) -> Response:
     """Get validation statistics for the past N days.
 
-    Uses the get_recent_validation_summary SQL function.
+    Uses the get_recent_validation_summary SQL function, which reads the
+    pg_cron-refreshed daily materialized views. Stats are therefore eventually
+    consistent (up to 5 minutes stale) and the window is aligned to whole days.
+
+    Responses carry an ETag and a 30s Cache-Control so dashboard polls can be
+    answered with 304 Not Modified.
 
     Query Parameters:
         - days: Number of days to look back (default: 7, max: 90)
@@ -107,26 +389,11 @@ async def get_validation_stats(
         )
 
     try:
-        # Call SQL function
-        response = db.client.rpc('get_recent_validation_summary', {'days_back': days}).execute()
-
-        if not response.data or len(response.data) == 0:
-            return {
-                "total_products_analyzed": 0,
-                "total_invalid_allergens": 0,
-                "total_invalid_pfas": 0,
-                "accuracy_rate": 100.0,
-                "most_problematic_products": [],
-                "days_analyzed": days
-            }
-
-        stats = response.data[0]
-        stats["days_analyzed"] = days
-
-        return stats
+        stats = await _fetch_validation_stats(days)
+        return _cacheable_json(request, stats)
 
     except Exception as e:
-        logger.error(f"Failed to fetch validation stats: {e}", exc_info=True)
+        logger.error("Failed to fetch validation stats: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch validation stats: {str(e)}"
@@ -135,12 +402,13 @@ async def get_validation_stats(
 
 @router.get("/flagged-substances")
 async def get_flagged_substances(
-    limit: int = Query(20, ge=1, le=100, description="Maximum number of substances to return"),
-    api_key: str = Depends(verify_api_key)
-) -> List[Dict[str, Any]]:
+    request: Request,
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of substances to return")
+) -> Response:
     """Get the most frequently flagged (misclassified) substances.
 
-    Uses the get_most_flagged_substances SQL function.
+    Uses the get_most_flagged_substances SQL function. Responses carry an
+    ETag and a 30s Cache-Control.
 
     Query Parameters:
         - limit: Maximum number of results (default: 20, max: 100)
@@ -155,13 +423,11 @@ async def get_flagged_substances(
         )
 
     try:
-        # Call SQL function
-        response = db.client.rpc('get_most_flagged_substances', {'result_limit': limit}).execute()
-
-        return response.data or []
+        substances = await _fetch_flagged_substances(limit)
+        return _cacheable_json(request, substances)
 
     except Exception as e:
-        logger.error(f"Failed to fetch flagged substances: {e}", exc_info=True)
+        logger.error("Failed to fetch flagged substances: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch flagged substances: {str(e)}"
@@ -170,17 +436,18 @@ async def get_flagged_substances(
 
 @router.get("/stats-by-date")
 async def get_stats_by_date(
-    start_date: str = Query(..., description="Start date (ISO format: YYYY-MM-DD)"),
-    end_date: str = Query(..., description="End date (ISO format: YYYY-MM-DD)"),
-    api_key: str = Depends(verify_api_key)
-) -> List[Dict[str, Any]]:
+    request: Request,
+    start_date: date = Query(..., description="Start date (ISO format: YYYY-MM-DD)"),
+    end_date: date = Query(..., description="End date (ISO format: YYYY-MM-DD)")
+) -> Response:
     """Get daily validation statistics for a date range.
 
-    Uses the get_validation_stats_by_date SQL function.
+    Uses the get_validation_stats_by_date SQL function. Responses carry an
+    ETag and a 30s Cache-Control.
 
     Query Parameters:
-        - start_date: Start date (required, ISO format)
-        - end_date: End date (required, ISO format)
+        - start_date: Start date (required, ISO format, validated by FastAPI - 422 if malformed)
+        - end_date: End date (required, ISO format, validated by FastAPI - 422 if malformed)
 
     Returns:
         List of daily statistics
@@ -192,25 +459,16 @@ async def get_stats_by_date(
         )
 
     try:
-        # Parse dates to ensure valid format
-        start_dt = datetime.fromisoformat(start_date)
-        end_dt = datetime.fromisoformat(end_date)
-
         # Call SQL function
-        response = db.client.rpc('get_validation_stats_by_date', {
-            'start_date': start_dt.isoformat(),
-            'end_date': end_dt.isoformat()
-        }).execute()
+        data = await db.rpc('get_validation_stats_by_date', {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat()
+        })
 
-        return response.data or []
+        return _cacheable_json(request, data or [])
 
-    except ValueError as e:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid date format. Use ISO format (YYYY-MM-DD): {str(e)}"
-        )
     except Exception as e:
-        logger.error(f"Failed to fetch stats by date: {e}", exc_info=True)
+        logger.error("Failed to fetch stats by date: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch stats by date: {str(e)}"
@@ -219,8 +477,7 @@ async def get_stats_by_date(
 
 @router.get("/product-logs/{product_url:path}")
 async def get_product_validation_logs(
-    product_url: str,
-    api_key: str = Depends(verify_api_key)
+    product_url: str
 ) -> List[Dict[str, Any]]:
     """Get all validation logs for a specific product.
 
@@ -240,15 +497,74 @@ async def get_product_validation_logs(
 
     try:
         # Call SQL function
-        response = db.client.rpc('get_validation_logs_by_product', {
+        data = await db.rpc('get_validation_logs_by_product', {
             'search_product_url': product_url
-        }).execute()
+        })
 
-        return response.data or []
+        return data or []
 
     except Exception as e:
-        logger.error(f"Failed to fetch product validation logs: {e}", exc_info=True)
+        logger.error("Failed to fetch product validation logs: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch product validation logs: {str(e)}"
         )
+
+
+@router.get("/overview")
+async def get_admin_overview(
+    days: int = Query(7, ge=1, le=90, description="Number of days to look back for stats"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum flagged substances / recent logs to return")
+) -> Dict[str, Any]:
+    """Get everything the admin dashboard needs on page load in one request.
+
+    Runs the validation stats, flagged substances and recent logs queries
+    concurrently. A failing section is returned as None with its error listed
+    under "errors" instead of failing the whole overview.
+
+    Query Parameters:
+        - days: Number of days to look back for stats (default: 7, max: 90)
+        - limit: Maximum flagged substances / recent logs (default: 20, max: 100)
+
+    Returns:
+        Dictionary with stats, flagged_substances, recent_logs and errors
+    """
+    if not db.is_available:
+        raise HTTPException(
+            status_code=503,
+            detail="Database unavailable"
+        )
+
+    sections = ("stats", "flagged_substances", "recent_logs")
+    results = await asyncio.gather(
+        _fetch_validation_stats(days),
+        _fetch_flagged_substances(limit),
+        _fetch_recent_logs(limit),
+        return_exceptions=True,
+    )
+
+    overview: Dict[str, Any] = {"errors": {}}
+    for section, result in zip(sections, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to fetch overview %s: %s", section, result)
+            overview[section] = None
+            overview["errors"][section] = str(result)
+        else:
+            overview[section] = result
+
+    return overview
+
+
+@router.post("/knowledge-base/invalidate")
+async def invalidate_knowledge_base() -> Dict[str, Any]:
+    """Drop the cached allergen/PFAS knowledge bases after editing them.
+
+    The cache is per process, so only the instance serving this request is
+    refreshed immediately; others pick up changes within 5 minutes.
+
+    Returns:
+        Confirmation message
+    """
+    db.invalidate_knowledge_base_cache()
+    logger.info("Knowledge base cache invalidated")
+    return {"status": "invalidated"}
@@ -1,27 +1,33 @@
 """Product analysis endpoints."""
 
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
 from datetime import datetime, timezone
+from functools import partial
+import asyncio
 import logging
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 
 from ...domain.models import AnalysisRequest, AnalysisResponse, ProductAnalysis, ReviewInsights, ScrapedProduct
 from ...domain.harm_calculator import HarmScoreCalculator
-from ...domain.ingredient_matcher import match_ingredients_to_databases
+from ...domain.ingredient_matcher import LookupIndex, get_lookup_index, match_ingredients_to_databases
 from ...infrastructure.claude_agent import ProductSafetyAgent
 from ...infrastructure.product_scraper import ProductScraperService
+from ...infrastructure.scrapers.amazon import AmazonScraper
 from ...infrastructure.claude_query import ClaudeQueryService
 from ...infrastructure.database import db
 from ...infrastructure.review_vector_service import review_vector_service
 from ...infrastructure.validation_logger import validation_logger
-from ...infrastructure.token_tracker import TokenTracker
+from ...infrastructure.token_tracker import AnalysisTokenSummary, TokenTracker
+from ...infrastructure.config import settings
 from ..auth import verify_api_key
+from ..rate_limit import RouteRateLimit
 from anthropic import RateLimitError
-from typing import List, Dict, Any
+from typing import List, Dict, Any, FrozenSet, Optional, Tuple
 
-# Initialize limiter
-limiter = Limiter(key_func=get_remote_address)
+# Per-route limits on top of the global token bucket (shared via Redis if configured)
+analyze_rate_limit = RouteRateLimit("analyze", 30, redis_url=settings.redis_url)
+review_search_rate_limit = RouteRateLimit("review_search", 60, redis_url=settings.redis_url)
 
 # Try to import database, but make it optional
 try:
@@ -38,6 +44,7 @@ except ImportError as e:
         async def get_all_allergens(self): return []
         async def get_all_pfas(self): return []
         async def store_analysis(self, *args, **kwargs): return False
+        async def store_analysis_with_reviews(self, *args, **kwargs): return None
         async def get_or_create_anonymous_user(self): return None
         async def log_search(self, *args, **kwargs): return False
     db = MockDB()
@@ -47,12 +54,46 @@ logger = logging.getLogger(__name__)
 
 # Initialize scraper service (stateless, can be reused)
 scraper_service = ProductScraperService()
+amazon_scraper = AmazonScraper()  # Stateless, safe to share across worker threads
+
+# Uncached analyses currently running, keyed by (url_hash, allergen profile),
+# so concurrent requests for the same product share one Claude run
+_inflight_analyses: Dict[Tuple[str, FrozenSet[str]], "asyncio.Task[AnalysisResponse]"] = {}
+
+
+def _finish_inflight_analysis(
+    flight_key: Tuple[str, FrozenSet[str]],
+    task: "asyncio.Task[AnalysisResponse]"
+) -> None:
+    """Forget a finished analysis task so the next request starts a fresh one."""
+    if _inflight_analyses.get(flight_key) is task:
+        del _inflight_analyses[flight_key]
+    if not task.cancelled():
+        task.exception()  # Mark retrieved so failures nobody awaited don't warn
+
+
+async def load_knowledge_bases() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Load the allergen and PFAS knowledge bases concurrently.
+
+    Each loader already logs and returns [] on failure, so a missing
+    knowledge base degrades analysis instead of failing it.
+
+    Returns:
+        Tuple of (allergen records, PFAS records)
+    """
+    if not db.is_available:
+        logger.warning("⚠️  Supabase not available - proceeding without knowledge bases")
+        return [], []
+
+    logger.info("🔍 Loading allergen and PFAS knowledge bases from Supabase...")
+    allergen_db, pfas_db = await asyncio.gather(db.get_all_allergens(), db.get_all_pfas())
+    logger.info(f"✅ Loaded {len(allergen_db)} allergens and {len(pfas_db)} PFAS compounds")
+    return allergen_db, pfas_db
 
 
 def validate_and_filter_substances(
     analysis_data: Dict[str, Any],
-    allergen_database: List[Dict[str, Any]],
-    pfas_database: List[Dict[str, Any]],
+    lookup: LookupIndex,
     product_url: str,
     product_name: str
 ) -> Dict[str, Any]:
@@ -62,36 +103,31 @@ def validate_and_filter_substances(
 
     Args:
         analysis_data: Claude's analysis results
-        allergen_database: Full allergen knowledge base
-        pfas_database: Full PFAS knowledge base
+        lookup: Normalized allergen/PFAS knowledge bases
         product_url: Product URL for logging
         product_name: Product name for logging
 
     Returns:
         Validated analysis_data with filtered substances
     """
-    # Build lookup sets for fast validation (case-insensitive)
-    allergen_names = {a.get('name', '').lower() for a in allergen_database}
-    allergen_synonyms = set()
-    for a in allergen_database:
-        for syn in a.get('synonyms', []):
-            allergen_synonyms.add(syn.lower())
-    all_allergen_matches = allergen_names | allergen_synonyms
-
-    pfas_names = {p.get('name', '').lower() for p in pfas_database}
-    pfas_cas_numbers = {p.get('cas_number', '').strip() for p in pfas_database if p.get('cas_number')}
+    # LOG-ONLY MODE: Keep all substances for now, just log the issues.
+    # setdefault binds the lists in analysis_data once, so they stay in place.
+    # In future, we can switch to STRICT mode by using valid_* lists only
+    allergens_detected = analysis_data.setdefault('allergens_detected', [])
+    pfas_detected = analysis_data.setdefault('pfas_detected', [])
+    allergen_matches = lookup.allergen_matches
+    pfas_names = lookup.pfas_names
+    pfas_cas = lookup.pfas_cas
 
     # Validate allergens
-    allergens_detected = analysis_data.get('allergens_detected', [])
     valid_allergens = []
     invalid_allergens = []
 
     for allergen in allergens_detected:
         name = allergen.get('name', '')
-        name_lower = name.lower()
 
         # Check if in database (exact or synonym match)
-        if name_lower in all_allergen_matches:
+        if name.lower() in allergen_matches:
             valid_allergens.append(allergen)
         else:
             invalid_allergens.append(allergen)
@@ -105,17 +141,15 @@ def validate_and_filter_substances(
             )
 
     # Validate PFAS
-    pfas_detected = analysis_data.get('pfas_detected', [])
     valid_pfas = []
     invalid_pfas = []
 
     for pfas in pfas_detected:
         name = pfas.get('name', '')
-        name_lower = name.lower()
         cas = pfas.get('cas_number', '').strip()
 
         # Check if in database (by name or CAS number)
-        if name_lower in pfas_names or (cas and cas in pfas_cas_numbers):
+        if name.lower() in pfas_names or (cas and cas in pfas_cas):
             valid_pfas.append(pfas)
         else:
             invalid_pfas.append(pfas)
@@ -128,11 +162,6 @@ def validate_and_filter_substances(
                 product_name=product_name
             )
 
-    # LOG-ONLY MODE: Keep all substances for now, just log the issues
-    # In future, we can switch to STRICT mode by using valid_* lists only
-    analysis_data['allergens_detected'] = allergens_detected  # Keep all for now
-    analysis_data['pfas_detected'] = pfas_detected  # Keep all for now
-
     # Log validation summary
     validation_logger.log_validation_summary(
         product_name=product_name,
@@ -162,95 +191,131 @@ def validate_and_filter_substances(
     return analysis_data
 
 
-@router.post("/analyze", response_model=AnalysisResponse)
-@limiter.limit("30/minute")  # 30 requests per minute per IP - generous for normal browsing
-async def analyze_product(
-    request: Request,
-    analysis_request: AnalysisRequest,
-    api_key: str = Depends(verify_api_key)
-):
-    """Analyze a product for harmful substances.
+async def _store_analysis(
+    url_hash: str,
+    product_url: str,
+    analysis: ProductAnalysis,
+    token_summary: Optional[AnalysisTokenSummary],
+    review_rows: Optional[List[Dict[str, Any]]] = None,
+    review_summary: Optional[Dict[str, Any]] = None
+) -> Optional[int]:
+    """Store a fresh analysis and its reviews in Supabase in one call.
+
+    Failures are logged, never raised.
 
     Args:
-        request: HTTP request (required by slowapi for rate limiting)
-        analysis_request: Analysis request with product URL
-        api_key: Verified API key from Authorization header
+        url_hash: Hash of the product URL
+        product_url: Product URL
+        analysis: Completed analysis
+        token_summary: Claude token usage for the analysis, if tracked
+        review_rows: Embedded review_chunks rows from prepare_reviews()
+        review_summary: review_summaries row from prepare_reviews()
 
     Returns:
-        Analysis response with harm score and details
+        Number of reviews stored, or None if storage failed
     """
     try:
-        logger.info(f"Analyzing product: {analysis_request.product_url}")
+        logger.info(f"💾 Storing analysis in Supabase for: {analysis.product_name}")
+        # Format data to match what database.py expects
+        analysis_response = {
+            "analysis": {
+                "product_name": analysis.product_name,
+                "brand": analysis.brand,
+                "category": analysis.retailer,
+                "retailer": analysis.retailer,
+                "overall_score": analysis.overall_score,
+                "ingredients": analysis.ingredients,
+                "allergens": analysis.allergens_detected,  # database.py maps this to allergens_detected
+                "pfas_compounds": analysis.pfas_detected,  # database.py maps this to pfas_detected
+                "other_concerns": analysis.other_concerns,
+                "confidence": analysis.confidence,
+            }
+        }
+
+        # Add token usage data if available
+        if token_summary:
+            analysis_response["token_usage"] = {
+                "total_input_tokens": token_summary.total_input_tokens,
+                "total_output_tokens": token_summary.total_output_tokens,
+                "total_tokens": token_summary.total_tokens,
+                "total_cost_usd": token_summary.total_cost,
+                "api_call_count": token_summary.call_count,
+                "token_usage_details": [call.to_dict() for call in token_summary.calls],
+            }
+
+        reviews_stored = await db.store_analysis_with_reviews(
+            url_hash, product_url, analysis_response, review_rows or [], review_summary
+        )
+        if reviews_stored is not None:
+            logger.info(f"✅ Successfully stored analysis in Supabase (hash: {url_hash[:16]}...)")
+        else:
+            logger.warning(f"⚠️  Failed to store analysis in Supabase (non-fatal)")
+        return reviews_stored
+    except Exception as e:
+        logger.error(f"⚠️  Supabase storage failed (non-fatal): {e}")
+        return None
 
-        # Step 1: Generate URL hash for caching
-        url_hash = db.generate_url_hash(analysis_request.product_url)
 
-        # Step 2: Check cache (unless force_refresh is requested)
-        cached_analysis = None
-        if not analysis_request.force_refresh and db.is_available:
-            cached_analysis = await db.get_cached_analysis(url_hash)
+async def _log_search(product_url: str) -> None:
+    """Record a search for the anonymous user. Failures are logged, never raised.
 
-        # Step 3: If cached, return immediately
-        if cached_analysis:
-            logger.info(f"Returning cached analysis for: {cached_analysis.get('product_name')}")
+    Args:
+        product_url: Product URL that was searched
+    """
+    try:
+        user_id = await db.get_or_create_anonymous_user()
+        logger.debug(f"Logging search for user: {user_id}")
+        log_success = await db.log_search(user_id, product_url)
+        if log_success:
+            logger.info(f"✅ Successfully logged search for user {user_id}")
+        else:
+            logger.warning(f"⚠️  Failed to log search (non-fatal)")
+    except Exception as e:
+        logger.error(f"⚠️  Search logging failed (non-fatal): {e}")
 
-            # Calculate cache age
-            analyzed_at = datetime.fromisoformat(cached_analysis['analyzed_at'].replace('Z', '+00:00'))
-            cache_age = (datetime.now(timezone.utc) - analyzed_at).total_seconds()
 
-            # Build ProductAnalysis from cached data
-            analysis = ProductAnalysis(
-                product_url=cached_analysis['product_url'],
-                product_name=cached_analysis['product_name'],
-                brand=cached_analysis['brand'],
-                retailer=cached_analysis.get('retailer', cached_analysis.get('category', 'Unknown')),
-                ingredients=cached_analysis.get('ingredients', []),
-                overall_score=cached_analysis.get('overall_score', 100 - cached_analysis.get('harm_score', 0)),
-                allergens_detected=cached_analysis.get('allergens_detected', []),
-                pfas_detected=cached_analysis.get('pfas_detected', []),
-                other_concerns=cached_analysis.get('other_concerns', []),
-                confidence=cached_analysis.get('confidence', 80) / 100.0,  # Convert integer 0-100 to float 0.0-1.0
-                analyzed_at=analyzed_at,
-            )
+async def _run_uncached_analysis(
+    analysis_request: AnalysisRequest,
+    url_hash: str
+) -> AnalysisResponse:
+    """Run a full (non-cached) product analysis.
 
-            # Log search
-            if db.is_available:
-                user_id = await db.get_or_create_anonymous_user()
-                await db.log_search(user_id, analysis_request.product_url)
+    Args:
+        analysis_request: Analysis request with product URL
+        url_hash: Hash of the product URL
 
-            return AnalysisResponse(
-                analysis=analysis,
-                alternatives=[],  # TODO: Implement alternatives
-                cached=True,
-                cache_age_seconds=int(cache_age),
-                url_hash=url_hash,  # Include for fetching reviews later
-            )
+    Returns:
+        Fresh analysis response
+    """
+    logger.info("📝 Cache miss, performing new analysis")
 
-        # Step 4: Cache miss - perform new analysis
-        logger.info("📝 Cache miss, performing new analysis")
+    # Initialize shared token tracker for this analysis
+    token_tracker = TokenTracker()
+    token_tracker.start_analysis(url_hash)
 
-        # Initialize shared token tracker for this analysis
-        token_tracker = TokenTracker()
-        token_tracker.start_analysis(url_hash)
+    # Check if client provided HTML (extension captured from user's session)
+    client_product_html = analysis_request.product_html
+    client_reviews_html = analysis_request.reviews_html
 
-        # Check if client provided HTML (extension captured from user's session)
-        client_product_html = analysis_request.product_html
-        client_reviews_html = analysis_request.reviews_html
+    if client_product_html:
+        logger.info(f"📦 Client provided product HTML: {len(client_product_html)} bytes")
+    if client_reviews_html:
+        logger.info(f"📦 Client provided reviews: {len(client_reviews_html)} bytes")
 
-        if client_product_html:
-            logger.info(f"📦 Client provided product HTML: {len(client_product_html)} bytes")
-        if client_reviews_html:
-            logger.info(f"📦 Client provided reviews: {len(client_reviews_html)} bytes")
+    # Step 4b (started early): Load knowledge bases while the page is scraped/processed
+    kb_task = asyncio.create_task(load_knowledge_bases())
 
-        # Step 4a: Use client-provided HTML or fall back to scraping
-        scraped_html = None
+    # Step 4a: Use client-provided HTML or fall back to scraping
+    scraped_html = None
+    try:
         if client_product_html:
             # Process client HTML using selector-based extraction
             # This compresses ~2MB raw HTML to ~20KB clean text
             logger.info("✅ Processing client-provided HTML with selector extraction")
-            from ...infrastructure.scrapers.amazon import AmazonScraper
-            amazon_scraper = AmazonScraper()
-            scraped_html = amazon_scraper.process_client_html(
+            # BeautifulSoup parsing is CPU-bound - run it in a worker thread so the
+            # event loop keeps serving other requests (and the knowledge base load)
+            scraped_html = await asyncio.to_thread(
+                amazon_scraper.process_client_html,
                 url=analysis_request.product_url,
                 product_html=client_product_html,
                 reviews_html=client_reviews_html or "",
@@ -259,114 +324,38 @@ async def analyze_product(
             # Fall back to scraping (may fail on Cloud Run)
             logger.info("🕷️  No client HTML, attempting to scrape product page")
             scraped_html = await scraper_service.try_scrape(analysis_request.product_url)
+    except BaseException:
+        kb_task.cancel()
+        raise
 
-        # Step 4b: Load knowledge bases from Supabase (with graceful fallback)
-        allergen_db = []
-        pfas_db = []
-        if db.is_available:
-            try:
-                logger.info("🔍 Loading allergen and PFAS knowledge bases from Supabase...")
-                allergen_db = await db.get_all_allergens()
-                pfas_db = await db.get_all_pfas()
-                logger.info(f"✅ Loaded {len(allergen_db)} allergens and {len(pfas_db)} PFAS compounds")
-            except Exception as e:
-                logger.warning(f"⚠️  Failed to load knowledge bases (continuing): {e}")
-        else:
-            logger.warning("⚠️  Supabase not available - proceeding without knowledge bases")
-
-        # Step 4c: Initialize Claude services with shared token tracker
-        query_service = ClaudeQueryService(token_tracker=token_tracker)
-        agent = ProductSafetyAgent(token_tracker=token_tracker)
-
-        # Step 4d: Branch based on scraping success
-        basic_analysis = None  # Store database-only fallback
-
-        if scraped_html is not None and scraped_html.confidence > 0.3:
-            # SUCCESS PATH: HTML available → Query → Agent
-            logger.info("✅ HTML available - using two-step Claude process")
-
-            # Claude Query: Extract structured data from HTML
-            logger.info("📊 Step 1/2: Claude Query - extracting product data from HTML")
-            product_data = await query_service.extract_product_data(scraped_html)
-
-            if product_data.get("confidence", 0) < 0.3:
-                logger.warning("⚠️  Claude extraction failed, falling back to web_fetch")
-                # Fallback to old method
-                try:
-                    analysis_data = await agent.analyze_product(
-                        product_url=analysis_request.product_url,
-                        allergen_profile=analysis_request.allergen_profile,
-                        allergen_database=allergen_db,
-                        pfas_database=pfas_db,
-                    )
-                except RateLimitError as e:
-                    logger.warning(f"⚠️  Rate limit hit during web_fetch fallback: {e}")
-                    raise HTTPException(
-                        status_code=429,
-                        detail="Rate limit exceeded. Please try again later.",
-                        headers={"Retry-After": "60"}
-                    )
-            else:
-                # NEW: Step 1 - Python-level database comparison (fast, always works)
-                logger.info("🔍 Step 1/3: Database matching - comparing ingredients against databases")
-                basic_analysis = match_ingredients_to_databases(
-                    ingredients=product_data.get('ingredients', []),
-                    materials=product_data.get('materials', []),
-                    allergen_database=allergen_db,
-                    pfas_database=pfas_db
-                )
-                logger.info(f"✅ Database matching complete: {len(basic_analysis['allergens_detected'])} allergens, {len(basic_analysis['pfas_detected'])} PFAS")
-
-                # Step 2/3 - Try Claude Agent enhancement with web_search
-                logger.info("🤖 Step 2/3: Claude Agent - enriching with AI analysis and web_search")
-                try:
-                    analysis_data = await agent.analyze_extracted_product(
-                        product_data=product_data,
-                        product_url=analysis_request.product_url,
-                        allergen_profile=analysis_request.allergen_profile,
-                        allergen_database=allergen_db,
-                        pfas_database=pfas_db,
-                    )
+    # Step 4b: Wait for the knowledge bases (with graceful fallback)
+    try:
+        allergen_db, pfas_db = await kb_task
+    except Exception as e:
+        logger.warning(f"⚠️  Failed to load knowledge bases (continuing): {e}")
+        allergen_db, pfas_db = [], []
 
-                    # Merge basic + enhanced analysis (prefer Claude's findings, supplement with database matches)
-                    logger.info("🔀 Step 3/3: Merging database results with AI analysis")
-                    # Keep Claude's allergens and PFAS, but add any database-only finds
-                    db_allergen_names = {a['name'] for a in basic_analysis['allergens_detected']}
-                    ai_allergen_names = {a['name'] for a in analysis_data.get('allergens_detected', [])}
-                    db_pfas_names = {p['name'] for p in basic_analysis['pfas_detected']}
-                    ai_pfas_names = {p['name'] for p in analysis_data.get('pfas_detected', [])}
-
-                    # Add database findings not found by AI
-                    for allergen in basic_analysis['allergens_detected']:
-                        if allergen['name'] not in ai_allergen_names:
-                            analysis_data.setdefault('allergens_detected', []).append(allergen)
-
-                    for pfas in basic_analysis['pfas_detected']:
-                        if pfas['name'] not in ai_pfas_names:
-                            analysis_data.setdefault('pfas_detected', []).append(pfas)
-
-                    logger.info(f"✅ Merged analysis: {len(analysis_data['allergens_detected'])} allergens, {len(analysis_data['pfas_detected'])} PFAS")
-
-                except RateLimitError as e:
-                    logger.warning(f"⚠️  Rate limit hit - returning database-only results: {e}")
-                    # Return basic database results with note about rate limit
-                    analysis_data = basic_analysis
-                    analysis_data['product_name'] = product_data.get('product_name', 'Unknown Product')
-                    analysis_data['brand'] = product_data.get('brand', 'Unknown')
-                    analysis_data['ingredients'] = product_data.get('ingredients', [])
-                    analysis_data['note'] = 'Rate limit reached - showing database matches only'
-
-                except Exception as e:
-                    logger.error(f"⚠️  Claude Agent failed - returning database-only results: {e}")
-                    # Return basic database results as fallback
-                    analysis_data = basic_analysis
-                    analysis_data['product_name'] = product_data.get('product_name', 'Unknown Product')
-                    analysis_data['brand'] = product_data.get('brand', 'Unknown')
-                    analysis_data['ingredients'] = product_data.get('ingredients', [])
-                    analysis_data['note'] = 'AI analysis unavailable - showing database matches only'
-        else:
-            # FALLBACK PATH: Use Claude web_fetch (old method)
-            logger.info("🔄 Scraping not available - using Claude web_fetch fallback")
+    # Normalize the knowledge bases once for both matching and validation
+    lookup = get_lookup_index(allergen_db, pfas_db)
+
+    # Step 4c: Initialize Claude services with shared token tracker
+    query_service = ClaudeQueryService(token_tracker=token_tracker)
+    agent = ProductSafetyAgent(token_tracker=token_tracker)
+
+    # Step 4d: Branch based on scraping success
+    basic_analysis = None  # Store database-only fallback
+
+    if scraped_html is not None and scraped_html.confidence > 0.3:
+        # SUCCESS PATH: HTML available → Query → Agent
+        logger.info("✅ HTML available - using two-step Claude process")
+
+        # Claude Query: Extract structured data from HTML
+        logger.info("📊 Step 1/2: Claude Query - extracting product data from HTML")
+        product_data = await query_service.extract_product_data(scraped_html)
+
+        if product_data.get("confidence", 0) < 0.3:
+            logger.warning("⚠️  Claude extraction failed, falling back to web_fetch")
+            # Fallback to old method
             try:
                 analysis_data = await agent.analyze_product(
                     product_url=analysis_request.product_url,
@@ -375,132 +364,244 @@ async def analyze_product(
                     pfas_database=pfas_db,
                 )
             except RateLimitError as e:
-                logger.warning(f"⚠️  Rate limit hit during web_fetch: {e}")
+                logger.warning(f"⚠️  Rate limit hit during web_fetch fallback: {e}")
                 raise HTTPException(
                     status_code=429,
                     detail="Rate limit exceeded. Please try again later.",
                     headers={"Retry-After": "60"}
                 )
+        else:
+            # NEW: Step 1 - Python-level database comparison (fast, always works)
+            logger.info("🔍 Step 1/3: Database matching - comparing ingredients against databases")
+            basic_analysis = match_ingredients_to_databases(
+                ingredients=product_data.get('ingredients', []),
+                materials=product_data.get('materials', []),
+                lookup=lookup
+            )
+            logger.info(f"✅ Database matching complete: {len(basic_analysis['allergens_detected'])} allergens, {len(basic_analysis['pfas_detected'])} PFAS")
 
-        # Step 5: Validate Claude's substances against database (LOG-ONLY mode)
-        logger.info("🔍 Validating detected substances against database...")
-        analysis_data = validate_and_filter_substances(
-            analysis_data=analysis_data,
-            allergen_database=allergen_db,
-            pfas_database=pfas_db,
-            product_url=analysis_request.product_url,
-            product_name=analysis_data.get("product_name", "Unknown")
-        )
+            # Step 2/3 - Try Claude Agent enhancement with web_search
+            logger.info("🤖 Step 2/3: Claude Agent - enriching with AI analysis and web_search")
+            try:
+                analysis_data = await agent.analyze_extracted_product(
+                    product_data=product_data,
+                    product_url=analysis_request.product_url,
+                    allergen_profile=analysis_request.allergen_profile,
+                    allergen_database=allergen_db,
+                    pfas_database=pfas_db,
+                )
 
-        # Calculate harm score
-        harm_score = HarmScoreCalculator.calculate(analysis_data)
-
-        # Build ProductAnalysis model
-        analysis = ProductAnalysis(
-            product_url=analysis_request.product_url,
-            product_name=analysis_data.get("product_name"),
-            brand=analysis_data.get("brand"),
-            retailer=analysis_data.get("retailer"),
-            ingredients=analysis_data.get("ingredients", []),
-            overall_score=100 - harm_score,  # Convert harm to safety score
-            allergens_detected=analysis_data.get("allergens_detected", []),
-            pfas_detected=analysis_data.get("pfas_detected", []),
-            other_concerns=analysis_data.get("other_concerns", []),
-            confidence=analysis_data.get("confidence", 0.8),
-            analyzed_at=datetime.now(timezone.utc),
-        )
+                # Merge basic + enhanced analysis (prefer Claude's findings, supplement with database matches)
+                logger.info("🔀 Step 3/3: Merging database results with AI analysis")
+                # Keep Claude's allergens and PFAS, but add any database-only finds
+                for key in ('allergens_detected', 'pfas_detected'):
+                    ai_found = analysis_data.setdefault(key, [])
+                    ai_names = {s['name'] for s in ai_found}
+                    ai_found.extend(s for s in basic_analysis[key] if s['name'] not in ai_names)
 
-        # Finish token tracking and get summary
-        token_summary = token_tracker.finish_analysis()
+                logger.info(f"✅ Merged analysis: {len(analysis_data['allergens_detected'])} allergens, {len(analysis_data['pfas_detected'])} PFAS")
 
-        # Step 5: Store analysis in Supabase (with graceful fallback)
-        if db.is_available:
-            try:
-                logger.info(f"💾 Storing analysis in Supabase for: {analysis.product_name}")
-                # Format data to match what database.py expects
-                analysis_response = {
-                    "analysis": {
-                        "product_name": analysis.product_name,
-                        "brand": analysis.brand,
-                        "category": analysis.retailer,
-                        "retailer": analysis.retailer,
-                        "overall_score": analysis.overall_score,
-                        "ingredients": analysis.ingredients,
-                        "allergens": analysis.allergens_detected,  # database.py maps this to allergens_detected
-                        "pfas_compounds": analysis.pfas_detected,  # database.py maps this to pfas_detected
-                        "other_concerns": analysis.other_concerns,
-                        "confidence": analysis.confidence,
-                    }
-                }
-
-                # Add token usage data if available
-                if token_summary:
-                    analysis_response["token_usage"] = {
-                        "total_input_tokens": token_summary.total_input_tokens,
-                        "total_output_tokens": token_summary.total_output_tokens,
-                        "total_tokens": token_summary.total_tokens,
-                        "total_cost_usd": token_summary.total_cost,
-                        "api_call_count": token_summary.call_count,
-                        "token_usage_details": [call.to_dict() for call in token_summary.calls],
-                    }
-
-                store_success = await db.store_analysis(url_hash, analysis_request.product_url, analysis_response)
-                if store_success:
-                    logger.info(f"✅ Successfully stored analysis in Supabase (hash: {url_hash[:16]}...)")
-                else:
-                    logger.warning(f"⚠️  Failed to store analysis in Supabase (non-fatal)")
-            except Exception as e:
-                logger.error(f"⚠️  Supabase storage failed (non-fatal): {e}")
-        else:
-            logger.debug("⚠️  Supabase not available - skipping analysis storage")
+            except RateLimitError as e:
+                logger.warning(f"⚠️  Rate limit hit - returning database-only results: {e}")
+                # Return basic database results with note about rate limit
+                analysis_data = basic_analysis
+                analysis_data['product_name'] = product_data.get('product_name', 'Unknown Product')
+                analysis_data['brand'] = product_data.get('brand', 'Unknown')
+                analysis_data['ingredients'] = product_data.get('ingredients', [])
+                analysis_data['note'] = 'Rate limit reached - showing database matches only'
 
-        # Step 6: Log search (with graceful fallback)
-        if db.is_available:
-            try:
-                user_id = await db.get_or_create_anonymous_user()
-                logger.debug(f"Logging search for user: {user_id}")
-                log_success = await db.log_search(user_id, analysis_request.product_url)
-                if log_success:
-                    logger.info(f"✅ Successfully logged search for user {user_id}")
-                else:
-                    logger.warning(f"⚠️  Failed to log search (non-fatal)")
             except Exception as e:
-                logger.error(f"⚠️  Search logging failed (non-fatal): {e}")
-        else:
-            logger.debug("⚠️  Supabase not available - skipping search logging")
+                logger.error(f"⚠️  Claude Agent failed - returning database-only results: {e}")
+                # Return basic database results as fallback
+                analysis_data = basic_analysis
+                analysis_data['product_name'] = product_data.get('product_name', 'Unknown Product')
+                analysis_data['brand'] = product_data.get('brand', 'Unknown')
+                analysis_data['ingredients'] = product_data.get('ingredients', [])
+                analysis_data['note'] = 'AI analysis unavailable - showing database matches only'
+    else:
+        # FALLBACK PATH: Use Claude web_fetch (old method)
+        logger.info("🔄 Scraping not available - using Claude web_fetch fallback")
+        try:
+            analysis_data = await agent.analyze_product(
+                product_url=analysis_request.product_url,
+                allergen_profile=analysis_request.allergen_profile,
+                allergen_database=allergen_db,
+                pfas_database=pfas_db,
+            )
+        except RateLimitError as e:
+            logger.warning(f"⚠️  Rate limit hit during web_fetch: {e}")
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded. Please try again later.",
+                headers={"Retry-After": "60"}
+            )
 
-        logger.info(
-            f"Analysis complete: {analysis.product_name} - Harm score: {harm_score}"
-        )
+    # Step 5: Validate Claude's substances against database (LOG-ONLY mode)
+    logger.info("🔍 Validating detected substances against database...")
+    analysis_data = validate_and_filter_substances(
+        analysis_data=analysis_data,
+        lookup=lookup,
+        product_url=analysis_request.product_url,
+        product_name=analysis_data.get("product_name", "Unknown")
+    )
+
+    # Calculate harm score
+    harm_score = HarmScoreCalculator.calculate(analysis_data)
+
+    # Build ProductAnalysis model
+    analysis = ProductAnalysis(
+        product_url=analysis_request.product_url,
+        product_name=analysis_data.get("product_name"),
+        brand=analysis_data.get("brand"),
+        retailer=analysis_data.get("retailer"),
+        ingredients=analysis_data.get("ingredients", []),
+        overall_score=100 - harm_score,  # Convert harm to safety score
+        allergens_detected=analysis_data["allergens_detected"],  # Set by validate_and_filter_substances
+        pfas_detected=analysis_data["pfas_detected"],
+        other_concerns=analysis_data.get("other_concerns", []),
+        confidence=analysis_data.get("confidence", 0.8),
+        analyzed_at=datetime.now(timezone.utc),
+    )
+
+    # Finish token tracking and get summary
+    token_summary = token_tracker.finish_analysis()
 
-        # Step 7: Store reviews with embeddings (non-blocking, best effort)
-        reviews_stored = None
+    reviews_stored = None
+    if db.is_available:
+        # Step 5: Embed client reviews so they are stored together with the analysis
+        review_rows, review_summary = [], None
         if client_reviews_html:
             try:
-                # Count reviews for logging
-                review_count = client_reviews_html.count('data-hook="review"')
-                logger.info(f"💬 Storing {review_count} reviews with embeddings...")
-
-                stored, failed = await review_vector_service.store_reviews(
-                    url_hash=url_hash,
-                    product_url=analysis_request.product_url,
-                    reviews_html=client_reviews_html,
-                    source="client",
-                    pages_fetched=5  # Default assumption from client
+                logger.info("💬 Embedding reviews...")
+                review_rows, review_summary = await asyncio.to_thread(
+                    review_vector_service.prepare_reviews,
+                    url_hash,
+                    analysis_request.product_url,
+                    client_reviews_html,
+                    "client",
+                    5,  # Pages fetched - default assumption from client
                 )
-                reviews_stored = stored
-                logger.info(f"✅ Reviews stored: {stored} success, {failed} failed")
             except Exception as e:
-                logger.warning(f"⚠️  Review storage failed (non-fatal): {e}")
-
-        return AnalysisResponse(
-            analysis=analysis,
-            alternatives=[],  # TODO: Implement alternatives
-            cached=False,
-            cache_age_seconds=None,
-            url_hash=url_hash,  # Include for fetching reviews later
-            reviews_stored=reviews_stored,
+                logger.warning(f"⚠️  Review embedding failed (non-fatal): {e}")
+
+        # Steps 6-7: Store analysis + reviews (one RPC) and log search concurrently
+        stored, _ = await asyncio.gather(
+            _store_analysis(
+                url_hash, analysis_request.product_url, analysis, token_summary,
+                review_rows, review_summary,
+            ),
+            _log_search(analysis_request.product_url),
         )
+        if client_reviews_html:
+            reviews_stored = stored
+    else:
+        logger.debug("⚠️  Supabase not available - skipping analysis storage and search logging")
+
+    logger.info(
+        f"Analysis complete: {analysis.product_name} - Harm score: {harm_score}"
+    )
+
+    return AnalysisResponse(
+        analysis=analysis,
+        alternatives=[],  # TODO: Implement alternatives
+        cached=False,
+        cache_age_seconds=None,
+        url_hash=url_hash,  # Include for fetching reviews later
+        reviews_stored=reviews_stored,
+    )
+
+
+# 30 requests per minute per IP - generous for normal browsing
+@router.post("/analyze", response_model=AnalysisResponse, dependencies=[Depends(analyze_rate_limit)])
+async def analyze_product(
+    analysis_request: AnalysisRequest,
+    background_tasks: BackgroundTasks,
+    api_key: str = Depends(verify_api_key)
+):
+    """Analyze a product for harmful substances.
+
+    Args:
+        analysis_request: Analysis request with product URL
+        background_tasks: Tasks run after the response is sent
+        api_key: Verified API key from Authorization header
+
+    Returns:
+        Analysis response with harm score and details
+
+    Raises:
+        HTTPException: 413 if client-provided HTML exceeds the configured caps
+    """
+    # Reject oversize client HTML before any parsing (and outside the 500 handler below)
+    for field, html, limit in (
+        ("product_html", analysis_request.product_html, settings.max_product_html_chars),
+        ("reviews_html", analysis_request.reviews_html, settings.max_reviews_html_chars),
+    ):
+        if html and len(html) > limit:
+            raise HTTPException(
+                status_code=413,
+                detail=f"{field} too large ({len(html)} characters, limit {limit})",
+            )
+
+    try:
+        logger.info(f"Analyzing product: {analysis_request.product_url}")
+
+        # Step 1: Generate URL hash for caching
+        url_hash = db.generate_url_hash(analysis_request.product_url)
+
+        # Step 2: Check cache (unless force_refresh is requested)
+        cached_analysis = None
+        if not analysis_request.force_refresh and db.is_available:
+            cached_analysis = await db.get_cached_analysis(url_hash)
+
+        # Step 3: If cached, return immediately
+        if cached_analysis:
+            logger.info(f"Returning cached analysis for: {cached_analysis.get('product_name')}")
+
+            # Calculate cache age
+            analyzed_at = datetime.fromisoformat(cached_analysis['analyzed_at'])  # Accepts a trailing Z on 3.11+
+            cache_age = (datetime.now(timezone.utc) - analyzed_at).total_seconds()
+
+            # Build ProductAnalysis from cached data. These rows were dumped from
+            # a validated ProductAnalysis, so skip validators until response_model.
+            analysis = ProductAnalysis.build_trusted(
+                product_url=cached_analysis['product_url'],
+                product_name=cached_analysis['product_name'],
+                brand=cached_analysis['brand'],
+                retailer=cached_analysis.get('retailer', cached_analysis.get('category', 'Unknown')),
+                ingredients=cached_analysis.get('ingredients', []),
+                overall_score=cached_analysis.get('overall_score', 100 - cached_analysis.get('harm_score', 0)),
+                allergens_detected=cached_analysis.get('allergens_detected', []),
+                pfas_detected=cached_analysis.get('pfas_detected', []),
+                other_concerns=cached_analysis.get('other_concerns', []),
+                confidence=cached_analysis.get('confidence', 80) / 100.0,  # Convert integer 0-100 to float 0.0-1.0
+                analyzed_at=analyzed_at,
+            )
+
+            # Log search after the response is sent - telemetry only, keep it off the fast path
+            if db.is_available:
+                background_tasks.add_task(_log_search, analysis_request.product_url)
+
+            return AnalysisResponse.model_construct(
+                analysis=analysis,
+                alternatives=[],  # TODO: Implement alternatives
+                cached=True,
+                cache_age_seconds=int(cache_age),
+                url_hash=url_hash,  # Include for fetching reviews later
+            )
+
+        # Step 4: Cache miss - perform new analysis, joining an identical one already running.
+        # The analysis runs in its own task that every request (the starter
+        # included) awaits through a shield, so a client disconnecting
+        # cancels only its own wait, never the shared work.
+        flight_key = (url_hash, frozenset(analysis_request.allergen_profile))
+        inflight = _inflight_analyses.get(flight_key)
+        if inflight is not None:
+            logger.info("⏳ Identical analysis already in progress, waiting for its result")
+        else:
+            inflight = asyncio.create_task(_run_uncached_analysis(analysis_request, url_hash))
+            _inflight_analyses[flight_key] = inflight
+            inflight.add_done_callback(partial(_finish_inflight_analysis, flight_key))
+        return await asyncio.shield(inflight)
 
     except Exception as e:
         logger.error(f"Analysis failed: {str(e)}", exc_info=True)
@@ -631,9 +732,6 @@ async def get_review_insights(
 # SEMANTIC REVIEW SEARCH
 # ============================================
 
-from pydantic import BaseModel, Field
-from typing import Optional, List
-
 
 class ReviewSearchRequest(BaseModel):
     """Request for semantic review search."""
@@ -662,10 +760,12 @@ class ReviewSearchResponse(BaseModel):
     total_results: int
 
 
-@router.post("/reviews/search", response_model=ReviewSearchResponse)
-@limiter.limit("60/minute")
+@router.post(
+    "/reviews/search",
+    response_model=ReviewSearchResponse,
+    dependencies=[Depends(review_search_rate_limit)],
+)
 async def search_reviews(
-    request: Request,
     search_request: ReviewSearchRequest,
     api_key: str = Depends(verify_api_key)
 ):
@@ -687,32 +787,37 @@ async def search_reviews(
         results = await review_vector_service.search_reviews(
             query=search_request.query,
             url_hash=search_request.url_hash,
-            top_k=search_request.top_k * 3,  # Retrieve more for reranking
+            top_k=search_request.top_k * 3,  # Wider candidate pool for Cohere to rerank
             rerank_top_n=search_request.top_k,
             min_rating=search_request.min_rating,
-            verified_only=search_request.verified_only
+            verified_only=search_request.verified_only,
+            text_max_len=500  # Truncate for response
         )
 
-        # Format results
-        formatted_results = []
-        for r in results:
-            formatted_results.append(ReviewSearchResult(
-                id=str(r.get('id', '')),
-                url_hash=r.get('url_hash', ''),
-                review_text=r.get('review_text', '')[:500],  # Truncate for response
-                review_rating=r.get('review_rating'),
-                verified_purchase=r.get('verified_purchase', False),
-                similarity=r.get('similarity', 0.0),
-                rerank_score=r.get('rerank_score')
-            ))
+        # Format results. Rows come from our own search_reviews RPC, so build
+        # the ReviewSearchResponse shape as plain dicts and let orjson encode
+        # them directly; returning a Response skips response_model
+        # serialization (the model still documents the endpoint).
+        formatted_results = [
+            {
+                "id": str(r.get('id', '')),
+                "url_hash": r.get('url_hash', ''),
+                "review_text": r.get('review_text', ''),
+                "review_rating": r.get('review_rating'),
+                "verified_purchase": r.get('verified_purchase', False),
+                "similarity": r.get('similarity', 0.0),
+                "rerank_score": r.get('rerank_score')
+            }
+            for r in results
+        ]
 
         logger.info(f"✅ Found {len(formatted_results)} matching reviews")
 
-        return ReviewSearchResponse(
-            query=search_request.query,
-            results=formatted_results,
-            total_results=len(formatted_results)
-        )
+        return ORJSONResponse({
+            "query": search_request.query,
+            "results": formatted_results,
+            "total_results": len(formatted_results)
+        })
 
     except Exception as e:
         logger.error(f"❌ Review search failed: {e}", exc_info=True)
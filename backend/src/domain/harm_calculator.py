@@ -1,7 +1,9 @@
 """Harm score calculation logic."""
 
+from functools import lru_cache
 from typing import Dict, Any
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +53,17 @@ class HarmScoreCalculator:
         "chemical_product": 1.15,
     }
 
+    # Product-name keywords that mark a high-risk product (1.3x)
+    HIGH_RISK_KEYWORDS = (
+        "killer", "spray", "poison", "toxic", "bleach",
+        "acid", "lye", "caustic", "corrosive"
+    )
+    HIGH_RISK_MULTIPLIER = 1.3
+
+    # One pass over the text per keyword group instead of one `in` per keyword
+    _CATEGORY_KEYWORDS_RE = re.compile("|".join(map(re.escape, CATEGORY_MULTIPLIERS)))
+    _HIGH_RISK_KEYWORDS_RE = re.compile("|".join(map(re.escape, HIGH_RISK_KEYWORDS)))
+
     @staticmethod
     def calculate(analysis_data: Dict[str, Any]) -> int:
         """Calculate harm score from analysis data.
@@ -80,42 +93,39 @@ class HarmScoreCalculator:
             "confidence_penalty": 0.0
         }
 
-        # Add points for allergens (severity-based)
+        # Bind lookup tables and inputs once for the loops below
+        severity_points = HarmScoreCalculator.SEVERITY_POINTS.get
+        category_points = HarmScoreCalculator.CATEGORY_POINTS.get
         allergens = analysis_data.get("allergens_detected", [])
+        pfas_compounds = analysis_data.get("pfas_detected", [])
+        other_concerns = analysis_data.get("other_concerns", [])
+
+        # Add points for allergens (severity-based)
+        allergen_points = 0.0
         for allergen in allergens:
-            severity = allergen.get("severity", "low")
-            points = HarmScoreCalculator.SEVERITY_POINTS.get(severity, 8)
-            confidence = allergen.get("confidence", 1.0)
-            contribution = points * confidence
-            breakdown["allergens"] += contribution
-            base_score += contribution
+            points = severity_points(allergen.get("severity", "low"), 8)
+            allergen_points += points * allergen.get("confidence", 1.0)
+        breakdown["allergens"] = allergen_points
 
         # Add points for PFAS (each PFAS is inherently high risk)
-        pfas_compounds = analysis_data.get("pfas_detected", [])
+        # PFAS are forever chemicals - high base score
+        pfas_points = 0.0
         for pfas in pfas_compounds:
-            confidence = pfas.get("confidence", 1.0)
-            # PFAS are forever chemicals - high base score
-            contribution = 40 * confidence
-            breakdown["pfas"] += contribution
-            base_score += contribution
+            pfas_points += 40 * pfas.get("confidence", 1.0)
+        breakdown["pfas"] = pfas_points
 
         # Add points for other_concerns (category-based scoring)
-        other_concerns = analysis_data.get("other_concerns", [])
+        concern_points = 0.0
         for concern in other_concerns:
-            category = concern.get("category", "other")
-            confidence = concern.get("confidence", 1.0)
-
             # Use category-specific points (with "under_investigation" capped at 5)
-            if category in HarmScoreCalculator.CATEGORY_POINTS:
-                points = HarmScoreCalculator.CATEGORY_POINTS[category]
-            else:
+            points = category_points(concern.get("category", "other"))
+            if points is None:
                 # Fallback to severity-based if category not recognized
-                severity = concern.get("severity", "low")
-                points = HarmScoreCalculator.SEVERITY_POINTS.get(severity, 8)
+                points = severity_points(concern.get("severity", "low"), 8)
+            concern_points += points * concern.get("confidence", 1.0)
+        breakdown["other_concerns"] = concern_points
 
-            contribution = points * confidence
-            breakdown["other_concerns"] += contribution
-            base_score += contribution
+        base_score += allergen_points + pfas_points + concern_points
 
         # Apply category multiplier for high-risk product types
         category_multiplier = HarmScoreCalculator._get_category_multiplier(
@@ -153,9 +163,13 @@ class HarmScoreCalculator:
         return final_score
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def _get_category_multiplier(product_name: str, category: str) -> float:
         """Determine if product is in a high-risk category.
 
+        Cached because the same products are re-scored on every analysis of
+        them, and the result depends only on the two strings.
+
         Args:
             product_name: Product name
             category: Product category
@@ -164,20 +178,18 @@ class HarmScoreCalculator:
             Multiplier (1.0 = no boost, >1.0 = higher risk)
         """
         product_lower = product_name.lower()
-        category_lower = category.lower()
 
-        for keyword, multiplier in HarmScoreCalculator.CATEGORY_MULTIPLIERS.items():
-            if keyword in product_lower or keyword in category_lower:
-                return multiplier
+        # Category keywords may appear in either string; the NUL keeps a match
+        # from spanning both. Highest multiplier wins if several match.
+        found = HarmScoreCalculator._CATEGORY_KEYWORDS_RE.findall(
+            f"{product_lower}\x00{category.lower()}"
+        )
+        if found:
+            return max(HarmScoreCalculator.CATEGORY_MULTIPLIERS[k] for k in found)
 
         # Check for specific keywords
-        high_risk_keywords = [
-            "killer", "spray", "poison", "toxic", "bleach",
-            "acid", "lye", "caustic", "corrosive"
-        ]
-        for keyword in high_risk_keywords:
-            if keyword in product_lower:
-                return 1.3
+        if HarmScoreCalculator._HIGH_RISK_KEYWORDS_RE.search(product_lower):
+            return HarmScoreCalculator.HIGH_RISK_MULTIPLIER
 
         return 1.0
 
@@ -7,22 +7,195 @@ Used when Claude Agent fails or rate limits are hit.
 """
 
 import logging
-from typing import List, Dict, Any
-from difflib import SequenceMatcher
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import List, Dict, Any, FrozenSet, Optional, Sequence, Set, Tuple
+
+import ahocorasick
+from rapidfuzz import fuzz, process
 
 logger = logging.getLogger(__name__)
 
+# CAS registry numbers, e.g. 335-67-1
+CAS_NUMBER_PATTERN = re.compile(r'(?<!\d)\d{2,7}-\d{2}-\d(?!\d)')
+
+
+class SubstringIndex:
+    """Finds knowledge base names in a substring relation with a component.
+
+    Names contained in the component are found with one Aho-Corasick pass
+    over the component. Components contained in a name are found by searching
+    all names joined into one string. Both scans run in C, so the cost does
+    not grow with one Python iteration per knowledge base entry.
+    """
+
+    _SEPARATOR = "\x00"
+
+    def __init__(self, names: Sequence[str]) -> None:
+        """Build the index.
+
+        Args:
+            names: Lower-cased knowledge base names
+        """
+        self.names = tuple(names)
+        self._automaton: Optional[ahocorasick.Automaton] = None
+        if names:
+            self._automaton = ahocorasick.Automaton()
+            for i, name in enumerate(names):
+                indices = self._automaton.get(name, ())
+                self._automaton.add_word(name, indices + (i,))
+            self._automaton.make_automaton()
+
+        self._haystack = self._SEPARATOR.join(names)
+        self._starts: List[int] = []
+        offset = 0
+        for name in names:
+            self._starts.append(offset)
+            offset += len(name) + 1
 
-def similar(a: str, b: str) -> float:
-    """Calculate similarity between two strings (0.0 to 1.0)"""
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+    def hits(self, component_lower: str) -> Set[int]:
+        """Return indices of names that contain, or are contained in, the component.
+
+        Args:
+            component_lower: Lower-cased product component
+
+        Returns:
+            Set of name indices
+        """
+        found: Set[int] = set()
+        if self._automaton is None:
+            return found
+
+        # Names occurring inside the component
+        for _, indices in self._automaton.iter(component_lower):
+            found.update(indices)
+
+        # Component occurring inside a name
+        pos = self._haystack.find(component_lower)
+        while pos != -1:
+            found.add(bisect_right(self._starts, pos) - 1)
+            pos = self._haystack.find(component_lower, pos + 1)
+
+        return found
+
+
+@dataclass(frozen=True)
+class LookupIndex:
+    """Normalized allergen/PFAS knowledge bases, built once and shared.
+
+    Names are lower-cased up front so validation and matching only do set
+    membership and comparisons against pre-normalized strings.
+    """
+
+    allergen_matches: FrozenSet[str]  # Allergen names and synonyms, lower-cased
+    pfas_names: FrozenSet[str]  # PFAS names, lower-cased
+    pfas_cas: FrozenSet[str]  # PFAS CAS numbers, stripped
+    allergens: Tuple[Tuple[str, Dict[str, Any]], ...]  # (name_lower, record) for named allergens
+    pfas: Tuple[Tuple[str, Dict[str, Any]], ...]  # (name_lower, record) for named PFAS
+    pfas_by_cas: Dict[str, Tuple[int, ...]]  # Stripped CAS number -> indices into pfas
+    allergen_substrings: SubstringIndex  # Substring search over allergens names
+    pfas_substrings: SubstringIndex  # Substring search over pfas names
+
+
+def build_lookup_index(
+    allergen_database: List[Dict[str, Any]],
+    pfas_database: List[Dict[str, Any]]
+) -> LookupIndex:
+    """Build a LookupIndex from raw knowledge base records.
+
+    Args:
+        allergen_database: List of allergen records from database
+        pfas_database: List of PFAS compound records from database
+
+    Returns:
+        LookupIndex over both knowledge bases
+    """
+    allergen_matches = set()
+    for allergen in allergen_database:
+        allergen_matches.add(allergen.get('name', '').lower())
+        for synonym in allergen.get('synonyms') or []:
+            allergen_matches.add(synonym.lower())
+
+    named_allergens = tuple((a['name'].lower(), a) for a in allergen_database if a.get('name'))
+    named_pfas = tuple((p['name'].lower(), p) for p in pfas_database if p.get('name'))
+    pfas_by_cas: Dict[str, Tuple[int, ...]] = {}
+    for i, (_, pfas) in enumerate(named_pfas):
+        cas = (pfas.get('cas_number') or '').strip()
+        if cas:
+            pfas_by_cas[cas] = pfas_by_cas.get(cas, ()) + (i,)
+
+    return LookupIndex(
+        allergen_matches=frozenset(allergen_matches),
+        pfas_names=frozenset(p.get('name', '').lower() for p in pfas_database),
+        pfas_cas=frozenset(p['cas_number'].strip() for p in pfas_database if p.get('cas_number')),
+        allergens=named_allergens,
+        pfas=named_pfas,
+        pfas_by_cas=pfas_by_cas,
+        allergen_substrings=SubstringIndex([name for name, _ in named_allergens]),
+        pfas_substrings=SubstringIndex([name for name, _ in named_pfas]),
+    )
+
+
+# Last index built, with the exact lists it was built from
+_last_index: Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]], LookupIndex]] = None
+
+
+def get_lookup_index(
+    allergen_database: List[Dict[str, Any]],
+    pfas_database: List[Dict[str, Any]]
+) -> LookupIndex:
+    """Return a LookupIndex for these knowledge bases, reusing the last one if unchanged.
+
+    Reuse is by identity: when the same list objects are passed again (e.g.
+    served from an in-process cache) the index is not rebuilt.
+
+    Args:
+        allergen_database: List of allergen records from database
+        pfas_database: List of PFAS compound records from database
+
+    Returns:
+        LookupIndex over both knowledge bases
+    """
+    global _last_index
+    if (
+        _last_index is not None
+        and _last_index[0] is allergen_database
+        and _last_index[1] is pfas_database
+    ):
+        return _last_index[2]
+
+    index = build_lookup_index(allergen_database, pfas_database)
+    _last_index = (allergen_database, pfas_database, index)
+    return index
+
+
+def _fuzzy_scores(component_lower: str, names: Sequence[str], threshold: float) -> Dict[int, float]:
+    """Score a component against every knowledge base name in one C-level pass.
+
+    Args:
+        component_lower: Lower-cased product component
+        names: Lower-cased knowledge base names
+        threshold: Minimum similarity (0.0-1.0) to report
+
+    Returns:
+        Mapping of name index -> similarity (0.0-1.0) for names at or above threshold
+    """
+    matches = process.extract(
+        component_lower,
+        names,
+        scorer=fuzz.ratio,
+        processor=None,
+        score_cutoff=threshold * 100,
+        limit=None,
+    )
+    return {index: score / 100 for _, score, index in matches}
 
 
 def match_ingredients_to_databases(
     ingredients: List[str],
     materials: List[str],
-    allergen_database: List[Dict[str, Any]],
-    pfas_database: List[Dict[str, Any]],
+    lookup: LookupIndex,
     similarity_threshold: float = 0.75
 ) -> Dict[str, Any]:
     """
@@ -31,8 +204,7 @@ def match_ingredients_to_databases(
     Args:
         ingredients: List of ingredient names from product
         materials: List of material names from product
-        allergen_database: List of allergen records from database
-        pfas_database: List of PFAS compound records from database
+        lookup: Normalized knowledge bases from get_lookup_index()
         similarity_threshold: Minimum similarity score for matching (0.0-1.0)
 
     Returns:
@@ -40,25 +212,41 @@ def match_ingredients_to_databases(
     """
     logger.info(f"Matching {len(ingredients)} ingredients and {len(materials)} materials against databases")
 
-    # Combine ingredients and materials for comprehensive checking
-    all_components = ingredients + materials
+    # Combine ingredients and materials for comprehensive checking, lower-cased
+    # once for both knowledge bases (their names are lower-cased in the index)
+    all_components = [
+        (component, component.lower())
+        for component in ingredients + materials
+        if component and len(component) >= 2
+    ]
+    if not all_components:
+        return {
+            "allergens_detected": [],
+            "pfas_detected": [],
+            "other_concerns": [],
+            "confidence": 0.7 if ingredients or materials else 0.3,
+            "method": "database_matching"
+        }
 
     # Initialize results
     allergens_detected = []
     pfas_detected = []
 
+    allergen_names = lookup.allergen_substrings.names
+    pfas_names = lookup.pfas_substrings.names
+
     # Match against allergen database
-    for component in all_components:
-        if not component or len(component) < 2:
-            continue
+    for component, component_lower in all_components:
+        exact = lookup.allergen_substrings.hits(component_lower)
+        # Fuzzy matching is only a fallback for components with no exact hit
+        fuzzy = {} if exact else _fuzzy_scores(component_lower, allergen_names, similarity_threshold)
 
-        for allergen in allergen_database:
-            allergen_name = allergen.get('name', '')
-            if not allergen_name:
-                continue
+        for i in sorted(exact | fuzzy.keys()):
+            allergen = lookup.allergens[i][1]
+            allergen_name = allergen['name']
 
-            # Check for exact substring match (case-insensitive)
-            if allergen_name.lower() in component.lower() or component.lower() in allergen_name.lower():
+            # Exact substring match (case-insensitive) takes precedence
+            if i in exact:
                 allergens_detected.append({
                     "name": allergen_name,
                     "severity": allergen.get('severity', 'moderate'),
@@ -69,32 +257,37 @@ def match_ingredients_to_databases(
                 logger.info(f"Exact match found: {allergen_name} in {component}")
                 continue
 
-            # Check for fuzzy match
-            similarity = similar(component, allergen_name)
-            if similarity >= similarity_threshold:
-                allergens_detected.append({
-                    "name": allergen_name,
-                    "severity": allergen.get('severity', 'moderate'),
-                    "health_effects": allergen.get('health_effects', 'Potential allergic reactions'),
-                    "source": f"Similar to: {component}",
-                    "confidence": similarity
-                })
-                logger.info(f"Fuzzy match found: {allergen_name} ~ {component} (similarity: {similarity:.2f})")
+            # Fuzzy match
+            similarity = fuzzy[i]
+            allergens_detected.append({
+                "name": allergen_name,
+                "severity": allergen.get('severity', 'moderate'),
+                "health_effects": allergen.get('health_effects', 'Potential allergic reactions'),
+                "source": f"Similar to: {component}",
+                "confidence": similarity
+            })
+            logger.info(f"Fuzzy match found: {allergen_name} ~ {component} (similarity: {similarity:.2f})")
 
     # Match against PFAS database
-    for component in all_components:
-        if not component or len(component) < 2:
-            continue
+    for component, component_lower in all_components:
+        exact = lookup.pfas_substrings.hits(component_lower)
+        cas_hits = {
+            i
+            for cas in CAS_NUMBER_PATTERN.findall(component)
+            for i in lookup.pfas_by_cas.get(cas, ())
+        }
+        if exact or cas_hits:
+            fuzzy = {}
+        else:
+            fuzzy = _fuzzy_scores(component_lower, pfas_names, similarity_threshold)
 
-        for pfas in pfas_database:
-            pfas_name = pfas.get('name', '')
+        for i in sorted(exact | cas_hits | fuzzy.keys()):
+            pfas = lookup.pfas[i][1]
+            pfas_name = pfas['name']
             cas_number = pfas.get('cas_number', '')
 
-            if not pfas_name:
-                continue
-
-            # Check for exact substring match (case-insensitive)
-            if pfas_name.lower() in component.lower() or component.lower() in pfas_name.lower():
+            # Exact substring match (case-insensitive) takes precedence
+            if i in exact:
                 pfas_detected.append({
                     "name": pfas_name,
                     "cas_number": cas_number,
@@ -105,8 +298,8 @@ def match_ingredients_to_databases(
                 logger.info(f"PFAS exact match found: {pfas_name} in {component}")
                 continue
 
-            # Check CAS number match if available
-            if cas_number and cas_number in component:
+            # CAS number match
+            if i in cas_hits:
                 pfas_detected.append({
                     "name": pfas_name,
                     "cas_number": cas_number,
@@ -117,17 +310,16 @@ def match_ingredients_to_databases(
                 logger.info(f"PFAS CAS match found: {cas_number} in {component}")
                 continue
 
-            # Check for fuzzy match
-            similarity = similar(component, pfas_name)
-            if similarity >= similarity_threshold:
-                pfas_detected.append({
-                    "name": pfas_name,
-                    "cas_number": cas_number,
-                    "health_effects": pfas.get('health_effects', 'Forever chemicals - potential health risks'),
-                    "source": f"Similar to: {component}",
-                    "confidence": similarity
-                })
-                logger.info(f"PFAS fuzzy match found: {pfas_name} ~ {component} (similarity: {similarity:.2f})")
+            # Fuzzy match
+            similarity = fuzzy[i]
+            pfas_detected.append({
+                "name": pfas_name,
+                "cas_number": cas_number,
+                "health_effects": pfas.get('health_effects', 'Forever chemicals - potential health risks'),
+                "source": f"Similar to: {component}",
+                "confidence": similarity
+            })
+            logger.info(f"PFAS fuzzy match found: {pfas_name} ~ {component} (similarity: {similarity:.2f})")
 
     # Remove duplicates (same allergen found in multiple ingredients)
     allergens_detected = _deduplicate_detections(allergens_detected, 'name')
@@ -139,7 +331,7 @@ def match_ingredients_to_databases(
         overall_confidence = sum(all_confidences) / len(all_confidences)
     else:
         # No matches found - confidence depends on whether we had ingredients to check
-        overall_confidence = 0.7 if all_components else 0.3
+        overall_confidence = 0.7 if ingredients or materials else 0.3
 
     logger.info(f"Database matching complete: {len(allergens_detected)} allergens, {len(pfas_detected)} PFAS detected")
 
@@ -154,9 +346,12 @@ def match_ingredients_to_databases(
 
 def _deduplicate_detections(detections: List[Dict], key: str) -> List[Dict]:
     """Remove duplicate detections, keeping the one with highest confidence"""
-    seen = {}
+    # name -> (confidence, detection), so the kept confidence isn't looked up again
+    seen: Dict[Any, Tuple[float, Dict]] = {}
     for detection in detections:
         name = detection.get(key)
-        if name not in seen or detection.get('confidence', 0) > seen[name].get('confidence', 0):
-            seen[name] = detection
-    return list(seen.values())
+        confidence = detection.get('confidence', 0)
+        previous = seen.get(name)
+        if previous is None or confidence > previous[0]:
+            seen[name] = (confidence, detection)
+    return [detection for _, detection in seen.values()]
@@ -2,10 +2,25 @@
 
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Annotated, Any, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
+
+
+# Shared constrained types, so each bound is declared (and compiled) once
+Confidence = Annotated[float, Field(ge=0.0, le=1.0)]
+Score = Annotated[int, Field(ge=0, le=100)]
+Rank = Annotated[int, Field(ge=1, le=5)]
+
+# Risk level indexed by harm score (0-100): <=20 Safe, <=40 Low, <=60 Moderate, <=80 High
+_RISK_LEVELS = (
+    ("Safe",) * 21
+    + ("Low Risk",) * 20
+    + ("Moderate Risk",) * 20
+    + ("High Risk",) * 20
+    + ("Dangerous",) * 20
+)
 
 
 class SeverityLevel(str, Enum):
@@ -17,13 +32,27 @@ class SeverityLevel(str, Enum):
     SEVERE = "severe"
 
 
+class FrequencyLevel(str, Enum):
+    """How often an issue is mentioned in reviews."""
+
+    RARE = "rare"
+    OCCASIONAL = "occasional"
+    COMMON = "common"
+    FREQUENT = "frequent"
+
+
 class AllergenDetection(BaseModel):
     """Detected allergen in a product."""
 
     name: str
     severity: SeverityLevel
     source: str  # Where it was found (e.g., "ingredients list")
-    confidence: float = Field(ge=0.0, le=1.0)
+    confidence: Confidence
+
+    @classmethod
+    def build_trusted(cls, data: dict[str, Any]) -> "AllergenDetection":
+        """Build from already-validated data without running validators."""
+        return cls.model_construct(**{**data, "severity": SeverityLevel(data["severity"])})
 
 
 class PFASDetection(BaseModel):
@@ -33,7 +62,12 @@ class PFASDetection(BaseModel):
     cas_number: Optional[str] = None
     body_effects: str  # Detailed explanation of effects on human body
     source: str
-    confidence: float = Field(ge=0.0, le=1.0)
+    confidence: Confidence
+
+    @classmethod
+    def build_trusted(cls, data: dict[str, Any]) -> "PFASDetection":
+        """Build from already-validated data without running validators."""
+        return cls.model_construct(**data)
 
 
 class ToxinConcern(BaseModel):
@@ -43,7 +77,12 @@ class ToxinConcern(BaseModel):
     category: str  # e.g., "heavy metal", "carcinogen", "endocrine disruptor"
     severity: SeverityLevel
     description: str
-    confidence: float = Field(ge=0.0, le=1.0)
+    confidence: Confidence
+
+    @classmethod
+    def build_trusted(cls, data: dict[str, Any]) -> "ToxinConcern":
+        """Build from already-validated data without running validators."""
+        return cls.model_construct(**{**data, "severity": SeverityLevel(data["severity"])})
 
 
 class ProductAnalysis(BaseModel):
@@ -54,39 +93,54 @@ class ProductAnalysis(BaseModel):
     product_name: Optional[str] = None
     brand: Optional[str] = None
     retailer: Optional[str] = None
-    ingredients: list[str] = []
+    ingredients: list[str] = Field(default_factory=list)
 
     # Analysis results
-    overall_score: int = Field(ge=0, le=100)  # 0=dangerous, 100=safe (inverted for clarity)
-    allergens_detected: list[AllergenDetection] = []
-    pfas_detected: list[PFASDetection] = []
-    other_concerns: list[ToxinConcern] = []
+    overall_score: Score  # 0=dangerous, 100=safe (inverted for clarity)
+    allergens_detected: list[AllergenDetection] = Field(default_factory=list)
+    pfas_detected: list[PFASDetection] = Field(default_factory=list)
+    other_concerns: list[ToxinConcern] = Field(default_factory=list)
 
     # Metadata
-    confidence: float = Field(ge=0.0, le=1.0)
+    confidence: Confidence
     analyzed_at: Optional[datetime] = None
     analysis_version: str = "1.0.0"
     claude_model: str = "claude-sonnet-4-5-20250929"
 
+    @classmethod
+    def build_trusted(cls, **data: Any) -> "ProductAnalysis":
+        """Build from trusted backend data without running validators.
+
+        For analyses assembled from our own cache rows or schema-checked
+        Claude output. The response is still validated once by the route's
+        response_model on the way out, so nothing is validated twice.
+
+        Args:
+            **data: ProductAnalysis fields; detection lists as plain dicts
+
+        Returns:
+            ProductAnalysis with nested detection models
+        """
+        for field, model in (
+            ("allergens_detected", AllergenDetection),
+            ("pfas_detected", PFASDetection),
+            ("other_concerns", ToxinConcern),
+        ):
+            if field in data:
+                data[field] = [model.build_trusted(item) for item in data[field]]
+        return cls.model_construct(**data)
+
+    @computed_field
     @property
     def harm_score(self) -> int:
         """Calculate harm score (0-100, where 100 is most harmful)."""
         return 100 - self.overall_score
 
+    @computed_field
     @property
     def risk_level(self) -> str:
         """Get human-readable risk level."""
-        harm = self.harm_score
-        if harm <= 20:
-            return "Safe"
-        elif harm <= 40:
-            return "Low Risk"
-        elif harm <= 60:
-            return "Moderate Risk"
-        elif harm <= 80:
-            return "High Risk"
-        else:
-            return "Dangerous"
+        return _RISK_LEVELS[min(max(self.harm_score, 0), 100)]
 
 
 class AlternativeProduct(BaseModel):
@@ -98,13 +152,13 @@ class AlternativeProduct(BaseModel):
     brand: Optional[str] = None
 
     # Scores
-    safety_score: int = Field(ge=0, le=100)
+    safety_score: Score
     safety_improvement: int  # Delta from original product
     price: Optional[float] = None
     price_difference: Optional[float] = None
 
     # Ranking
-    rank: int = Field(ge=1, le=5)
+    rank: Rank
 
     # Affiliate
     affiliate_link: Optional[str] = None
@@ -118,7 +172,7 @@ class AnalysisRequest(BaseModel):
 
     product_url: str
     user_id: Optional[UUID] = None  # Anonymous UUID from extension
-    allergen_profile: list[str] = []  # User's known allergens
+    allergen_profile: list[str] = Field(default_factory=list)  # User's known allergens
     force_refresh: bool = False  # Skip cache and re-analyze
 
     # Client-side HTML (captured by extension from user's session)
@@ -131,7 +185,7 @@ class AnalysisResponse(BaseModel):
     """Response containing product analysis and alternatives."""
 
     analysis: ProductAnalysis
-    alternatives: list[AlternativeProduct] = []
+    alternatives: list[AlternativeProduct] = Field(default_factory=list)
     cached: bool = False
     cache_age_seconds: Optional[int] = None
     url_hash: str = ""  # SHA256 hash of product URL for fetching reviews
@@ -163,8 +217,8 @@ class HealthConcern(BaseModel):
     """Consumer health concern from reviews."""
 
     concern: str  # e.g., "skin rash", "allergic reaction"
-    frequency: str  # "rare", "occasional", "common", "frequent"
-    severity: str  # "low", "moderate", "high", "severe"
+    frequency: FrequencyLevel
+    severity: SeverityLevel
     examples: list[str]  # Actual review quotes
 
 
@@ -172,8 +226,8 @@ class CommonComplaint(BaseModel):
     """Common complaint from reviews."""
 
     complaint: str
-    frequency: str
-    severity: str
+    frequency: FrequencyLevel
+    severity: SeverityLevel
     examples: list[str]
 
 
@@ -181,7 +235,7 @@ class PositiveFeedback(BaseModel):
     """Positive feedback from reviews."""
 
     aspect: str
-    frequency: str
+    frequency: FrequencyLevel
 
 
 class QuestionConcern(BaseModel):
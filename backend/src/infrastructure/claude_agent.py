@@ -1,16 +1,332 @@
 """Claude Agent for product safety analysis."""
 
+import asyncio
 import json
 import logging
 import time
-from typing import Dict, Any, List, Optional
-import httpx
-from anthropic import Anthropic, RateLimitError, APIError
+from typing import Dict, Any, List, Optional, Tuple
+from anthropic import RateLimitError, APIError
 from ..infrastructure.config import settings
+from ..infrastructure.claude_client import claude_client
 from ..infrastructure.token_tracker import TokenTracker
+from ..infrastructure.claude_rate_limiter import claude_rate_limiter
 
 logger = logging.getLogger(__name__)
 
+# Bounds in-flight agent calls per process; each one holds a connection open
+# for the whole multi-second web_search / web_fetch turn
+_agent_call_slots = asyncio.Semaphore(settings.claude_max_concurrency)
+
+
+# Static instructions for analyze_product() (fallback: Claude fetches the page
+# itself). Kept byte-identical across requests so they stay prompt-cached.
+PRODUCT_ANALYSIS_INSTRUCTIONS = """You are a product safety analysis expert. Your job is to analyze products for harmful substances including allergens, PFAS (forever chemicals), and other toxins.
+
+CRITICAL OUTPUT REQUIREMENT: Your final answer MUST be ONLY a valid JSON object.
+- NO explanatory text before the JSON
+- NO explanatory text after the JSON
+- NO markdown code blocks (no ```json or ```)
+- NO comments
+- Start immediately with { and end with }
+
+**Your Analysis Process:**
+1. **IMPORTANT:** ONLY use web_fetch if the user message does NOT contain product information (name, brand, ingredients, materials)
+   - If product info is already in the message → SKIP web_fetch, proceed to step 2
+   - If no product info in message → Use web_fetch to retrieve the product page
+
+2. Use web_search strategically (max 5 searches) to find:
+   a) **PRIORITY 1:** Manufacturer's official website for complete ingredient/material lists when missing from product page
+      - Search: "[brand] [product name] official ingredients" OR "[brand] official MSDS"
+      - ONLY use credible sources: manufacturer.com, official MSDS, .gov sites
+
+   b) **PRIORITY 2:** Regulatory actions and safety recalls
+      - Search: "[product] recall FDA warning" OR "[product] safety alert CPSC"
+      - ONLY use: FDA.gov, HealthCanada.gc.ca, CPSC.gov, EPA.gov, EU REACH
+
+   c) **PRIORITY 3:** Scientific studies and carcinogen classifications
+      - Search: "[ingredient] IARC classification" OR "[ingredient] EPA toxicity"
+      - ONLY use: PubMed, peer-reviewed journals, IARC, EPA, NIH
+
+   d) **PRIORITY 4:** Class action lawsuits and documented health impacts
+      - Search: "[product] class action lawsuit [ingredient]" OR "[brand] settlement"
+      - ONLY use: Court records, major news outlets (.gov, .edu, established media)
+
+3. Cross-reference findings with the knowledge base provided below
+4. Return a comprehensive structured JSON analysis
+
+**CRITICAL WEBSEARCH RESTRICTIONS:**
+- DO NOT use consumer blogs, forums, or non-scientific health websites
+- DO NOT use marketing materials or unverified product review sites (except for lawsuit discovery)
+- ONLY use credible sources: .gov, .edu, manufacturer official sites, peer-reviewed journals, major news outlets
+
+**Output Format - YOUR FINAL ANSWER MUST BE THIS JSON OBJECT:**
+After fetching and analyzing the product page, return your analysis as a JSON object with this exact structure:
+{
+    "product_name": "string",
+    "brand": "string",
+    "retailer": "string (e.g., Amazon, Amazon.ca)",
+    "ingredients": ["ingredient1", "ingredient2"],
+    "allergens_detected": [
+        {
+            "name": "allergen name (MUST match knowledge base below)",
+            "severity": "low|moderate|high|severe",
+            "source": "where found in product",
+            "confidence": 0.0-1.0
+        }
+    ],
+    "pfas_detected": [
+        {
+            "name": "PFAS compound name (MUST match knowledge base below)",
+            "cas_number": "CAS number if known",
+            "body_effects": "description of effects on human body",
+            "source": "where found (e.g., non-stick coating)",
+            "confidence": 0.0-1.0
+        }
+    ],
+    "other_concerns": [
+        {
+            "name": "concern name",
+            "category": "under_investigation|carcinogen|regulatory_action|heavy_metal|endocrine_disruptor|other",
+            "severity": "low|moderate|high|severe",
+            "description": "brief description",
+            "confidence": 0.0-1.0
+        }
+    ],
+    "confidence": 0.0-1.0
+}
+
+**CRITICAL CLASSIFICATION RULES - READ CAREFULLY:**
+
+1. **ALLERGENS - ONLY substances in the Allergen Knowledge Base below can go in allergens_detected**
+   - If you find an ingredient via websearch that is NOT in the Allergen Knowledge Base → DO NOT add to allergens_detected
+   - Minor irritants (citric acid, fragrance, etc.) are NOT allergens unless listed in the knowledge base
+   - If a substance causes irritation but is not a priority allergen → add to other_concerns with category="under_investigation"
+
+2. **PFAS - ONLY substances in the PFAS Knowledge Base below can go in pfas_detected**
+   - If you find a chemical via websearch that is NOT in the PFAS Knowledge Base → DO NOT add to pfas_detected
+   - Unknown fluorinated compounds → add to other_concerns with category="under_investigation"
+   - Match by CAS number or exact name from the knowledge base
+
+3. **OTHER CONCERNS - Use this for substances not in the knowledge bases**
+   - category="under_investigation": Substances with credible evidence but not in our database (max severity=low)
+   - category="carcinogen": IARC-classified carcinogens (Groups 1, 2A, 2B) with credible source
+   - category="regulatory_action": Substances with FDA recall, EPA warning, or class action lawsuit
+   - category="heavy_metal", "endocrine_disruptor", "other": Other toxins with credible evidence
+
+4. **EVIDENCE REQUIREMENTS for other_concerns:**
+   - MUST have credible source (.gov, .edu, peer-reviewed journal, court record)
+   - MUST NOT include unverified consumer complaints or blog posts
+   - MUST include description with source citation
+
+**PFAS Detection Guidelines:**
+- Non-stick cookware often contains PTFE (Teflon) - check knowledge base
+- "Water-resistant", "stain-resistant" products may have PFAS coatings
+- Match against knowledge base by CAS number or exact name
+- If ingredients aren't fully listed, note lower confidence
+
+**Allergen Detection:**
+- Check ingredient lists carefully against knowledge base
+- Look for synonyms listed in knowledge base
+- If not in knowledge base → NOT an allergen (may be irritant)
+"""
+
+# Static instructions for analyze_extracted_product() (product data already
+# extracted from the page)
+EXTRACTED_ANALYSIS_INSTRUCTIONS = """You are a product safety analysis expert. You have been provided with pre-extracted product information.
+
+CRITICAL OUTPUT REQUIREMENT: You MUST respond with ONLY a valid JSON object.
+- NO explanatory text before the JSON
+- NO explanatory text after the JSON
+- NO markdown code blocks (no ```json or ```)
+- NO comments
+- Start immediately with { and end with }
+
+**Your Analysis Process:**
+1. Review the provided product details (already extracted from the product page)
+2. Use web_search strategically (max 3 searches) to find:
+   a) **SEARCH 1 (IF INGREDIENTS/MATERIALS MISSING):** Manufacturer's official website for complete ingredient/material lists
+      - Search: "[brand] [product name] official ingredients" OR "[brand] official MSDS"
+      - ONLY use: manufacturer.com, official MSDS, .gov sites
+      - Look for manufacturer's product page, ingredient disclosure, or safety data
+
+   b) **SEARCH 2:** Regulatory actions and safety recalls
+      - Search: "[product] recall FDA warning" OR "[product] safety alert CPSC"
+      - ONLY use: FDA.gov, HealthCanada.gc.ca, CPSC.gov, EPA.gov, EU REACH
+      - Look for regulatory actions, recalls, safety warnings
+
+   c) **SEARCH 3:** Scientific studies, carcinogen classifications, or class action lawsuits
+      - Search: "[ingredient] IARC classification" OR "[product] class action lawsuit"
+      - ONLY use: PubMed, peer-reviewed journals, IARC, EPA, court records, major news outlets
+      - Look for scientific research, carcinogen status, documented health impacts
+
+**CRITICAL WEBSEARCH RESTRICTIONS:**
+- DO NOT use consumer blogs, forums, review sites, or non-scientific health websites
+- DO NOT use marketing materials or unverified sources
+- ONLY use credible sources: .gov, .edu, manufacturer official sites, peer-reviewed journals, court records
+
+**Output Format - YOUR ENTIRE RESPONSE MUST BE THIS JSON OBJECT:**
+{
+    "product_name": "string",
+    "brand": "string",
+    "retailer": "string",
+    "ingredients": ["complete list from manufacturer website if found, else from product page"],
+    "allergens_detected": [
+        {
+            "name": "allergen name (MUST match knowledge base below)",
+            "severity": "low|moderate|high|severe",
+            "source": "where found",
+            "confidence": 0.0-1.0
+        }
+    ],
+    "pfas_detected": [
+        {
+            "name": "PFAS compound (MUST match knowledge base below)",
+            "cas_number": "CAS number if known",
+            "body_effects": "effects on human body",
+            "source": "where found",
+            "confidence": 0.0-1.0
+        }
+    ],
+    "other_concerns": [
+        {
+            "name": "concern name",
+            "category": "under_investigation|carcinogen|regulatory_action|heavy_metal|endocrine_disruptor|other",
+            "severity": "low|moderate|high|severe",
+            "description": "brief description with source citation",
+            "confidence": 0.0-1.0
+        }
+    ],
+    "research_sources": [
+        {"type": "manufacturer_website", "url": "...", "finding": "..."},
+        {"type": "regulatory_action", "url": "...", "finding": "..."},
+        {"type": "scientific_study", "url": "...", "finding": "..."}
+    ],
+    "confidence": 0.0-1.0
+}
+
+**CRITICAL CLASSIFICATION RULES - READ CAREFULLY:**
+
+1. **ALLERGENS - ONLY substances in the Allergen Knowledge Base below can go in allergens_detected**
+   - If you find an ingredient via websearch that is NOT in the Allergen Knowledge Base → DO NOT add to allergens_detected
+   - Minor irritants (citric acid, fragrance, etc.) are NOT allergens unless listed in the knowledge base
+   - If a substance causes irritation but is not a priority allergen → add to other_concerns with category="under_investigation", severity="low"
+
+2. **PFAS - ONLY substances in the PFAS Knowledge Base below can go in pfas_detected**
+   - If you find a chemical via websearch that is NOT in the PFAS Knowledge Base → DO NOT add to pfas_detected
+   - Unknown fluorinated compounds → add to other_concerns with category="under_investigation"
+   - Match by CAS number or exact name from the knowledge base
+
+3. **OTHER CONCERNS - Use this for substances not in the knowledge bases**
+   - category="under_investigation": Substances with credible evidence but not in our database (MUST have severity="low" max)
+   - category="carcinogen": ONLY IARC-classified carcinogens (Groups 1, 2A, 2B) from credible sources
+   - category="regulatory_action": ONLY substances with FDA recall, EPA warning, or class action lawsuit
+   - category="heavy_metal", "endocrine_disruptor", "other": Other toxins with credible evidence
+
+4. **EVIDENCE REQUIREMENTS for other_concerns:**
+   - MUST have credible source (.gov, .edu, peer-reviewed journal, court record)
+   - MUST NOT include unverified consumer complaints or blog posts
+   - MUST include description with source citation (e.g., "IARC Group 2A carcinogen per iarc.who.int/2023")
+"""
+
+
+_json_decoder = json.JSONDecoder()
+
+
+def _extract_json(text: str) -> Dict[str, Any]:
+    """Return the first JSON object embedded in text.
+
+    Decodes from each `{` in turn with raw_decode, which stops where the
+    object closes, so markdown fences and prose around the JSON (including
+    stray braces before it) are skipped without separate scans.
+
+    Args:
+        text: Claude response text
+
+    Returns:
+        The decoded JSON object
+
+    Raises:
+        ValueError: If the text contains no JSON object
+    """
+    start = text.find("{")
+    while start != -1:
+        try:
+            obj, _ = _json_decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            pass
+        else:
+            if isinstance(obj, dict):
+                return obj
+        start = text.find("{", start + 1)
+    raise ValueError("No JSON found")
+
+
+# Last knowledge base text rendered, with the exact lists it was rendered from
+_last_kb: Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]], str]] = None
+
+
+def _render_kb(
+    pfas_database: List[Dict[str, Any]],
+    allergen_database: List[Dict[str, Any]],
+) -> str:
+    """Render the allergen and PFAS knowledge bases for the system prompt.
+
+    Rows are sorted (allergens by name, PFAS by name and CAS number) so the
+    text, and with it the prompt-cache prefix, doesn't change when the
+    database returns rows in a different order.
+
+    The last rendering is reused by identity: the knowledge base lists are
+    served from DatabaseService's in-process cache, so requests within its
+    TTL pass the same list objects and skip rendering entirely.
+
+    Args:
+        pfas_database: List of PFAS compounds from database
+        allergen_database: List of allergens from database
+
+    Returns:
+        Knowledge base section of the system prompt
+    """
+    global _last_kb
+    if (
+        _last_kb is not None
+        and _last_kb[0] is allergen_database
+        and _last_kb[1] is pfas_database
+    ):
+        return _last_kb[2]
+
+    allergens = sorted(
+        (a.get('name', ''), tuple(a.get('synonyms') or [])[:3])  # Limit synonyms to 3
+        for a in allergen_database
+    )
+    pfas = sorted(
+        (p.get('name', ''), p.get('cas_number') or '')
+        for p in pfas_database
+    )
+
+    lines = []
+
+    # Add FULL allergen database (token-efficient format)
+    if allergens:
+        lines.append(f"\n**ALLERGEN KNOWLEDGE BASE ({len(allergens)} priority allergens):**")
+        lines.append("ONLY these substances can be classified as allergens. If a substance is not on this list, it is NOT an allergen.\n")
+        lines.extend(
+            f"- {name} (synonyms: {', '.join(synonyms)})" if synonyms else f"- {name}"
+            for name, synonyms in allergens
+        )
+
+    # Add FULL PFAS database (token-efficient format)
+    if pfas:
+        lines.append(f"\n**PFAS KNOWLEDGE BASE ({len(pfas)} compounds):**")
+        lines.append("ONLY these substances can be classified as PFAS. If a substance is not on this list, it is NOT PFAS.\n")
+        lines.extend(
+            f"- {name} (CAS: {cas})" if cas else f"- {name}"
+            for name, cas in pfas
+        )
+
+    kb = "\n".join(lines) + "\n" if lines else ""
+    _last_kb = (allergen_database, pfas_database, kb)
+    return kb
+
 
 class ProductSafetyAgent:
     """Claude Agent that analyzes products for harmful substances."""
@@ -22,9 +338,8 @@ class ProductSafetyAgent:
             token_tracker: Optional TokenTracker instance for usage tracking.
                           If not provided, a new one will be created.
         """
-        self.client = Anthropic(api_key=settings.anthropic_api_key)
+        self.client = claude_client
         self.model = "claude-sonnet-4-5-20250929"
-        self.http_client = httpx.AsyncClient(timeout=30.0, follow_redirects=True)
         self.token_tracker = token_tracker or TokenTracker()
 
     async def analyze_product(
@@ -50,8 +365,8 @@ class ProductSafetyAgent:
         allergen_database = allergen_database or []
 
         # Build the analysis prompt
-        system_prompt = self._build_system_prompt(
-            allergen_profile, pfas_database, allergen_database
+        system_prompt = self._system_blocks(
+            PRODUCT_ANALYSIS_INSTRUCTIONS, pfas_database, allergen_database, allergen_profile
         )
         user_message = self._build_user_message(product_url)
 
@@ -67,6 +382,7 @@ class ProductSafetyAgent:
                 "type": "web_fetch_20250910",
                 "name": "web_fetch",
                 "max_uses": 3,  # Limit fetches to prevent token overuse
+                "cache_control": {"type": "ephemeral"},  # Cache tool definitions
             },
         ]
 
@@ -76,8 +392,8 @@ class ProductSafetyAgent:
         logger.info(f"Calling Claude with web_search (max 5) and web_fetch (max 3) tools")
 
         # Pre-request token counting
-        # Note: tools add significant tokens, but count_tokens API handles this
-        estimated_tokens = self.token_tracker.count_tokens(
+        # The static prompt + tools are counted once; the rest is estimated locally
+        estimated_tokens = await self.token_tracker.estimate_input_tokens(
             model=self.model,
             messages=messages,
             system=system_prompt,
@@ -88,19 +404,22 @@ class ProductSafetyAgent:
         # The API will execute web_search and web_fetch internally
         # tool_choice="auto" lets Claude decide when to use tools
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=4096,
-                system=system_prompt,
-                messages=messages,
-                tools=tools,
-                tool_choice={"type": "auto"},  # Claude decides when to use tools
-                extra_headers={
-                    "anthropic-beta": "web-fetch-2025-09-10"
-                }
-            )
+            async with _agent_call_slots:
+                await claude_rate_limiter.acquire()
+                response = await self.client.messages.create(
+                    model=self.model,
+                    max_tokens=4096,  # Room for tool narration before the JSON answer
+                    system=system_prompt,
+                    messages=messages,
+                    tools=tools,
+                    tool_choice={"type": "auto"},  # Claude decides when to use tools
+                    extra_headers={
+                        "anthropic-beta": "web-fetch-2025-09-10"
+                    }
+                )
         except RateLimitError as e:
             logger.error(f"❌ Rate limit exceeded in analyze_product: {e}")
+            claude_rate_limiter.on_failure()
             # Re-raise to be handled by caller
             raise
         except APIError as e:
@@ -108,6 +427,8 @@ class ProductSafetyAgent:
             # Re-raise to be handled by caller
             raise
 
+        claude_rate_limiter.on_success()
+
         # Record token usage with detailed logging
         self.token_tracker.record_usage(
             call_name="agent_fallback_analysis",
@@ -146,145 +467,41 @@ class ProductSafetyAgent:
         analysis = self._parse_response(response)
         return analysis
 
-    def _build_system_prompt(
+    def _system_blocks(
         self,
-        allergen_profile: List[str],
+        instructions: str,
         pfas_database: List[Dict[str, Any]],
         allergen_database: List[Dict[str, Any]],
-    ) -> str:
-        """Build the system prompt for Claude."""
-        prompt = """You are a product safety analysis expert. Your job is to analyze products for harmful substances including allergens, PFAS (forever chemicals), and other toxins.
-
-**Your Analysis Process:**
-1. **IMPORTANT:** ONLY use web_fetch if the user message does NOT contain product information (name, brand, ingredients, materials)
-   - If product info is already in the message → SKIP web_fetch, proceed to step 2
-   - If no product info in message → Use web_fetch to retrieve the product page
-
-2. Use web_search strategically (max 5 searches) to find:
-   a) **PRIORITY 1:** Manufacturer's official website for complete ingredient/material lists when missing from product page
-      - Search: "[brand] [product name] official ingredients" OR "[brand] official MSDS"
-      - ONLY use credible sources: manufacturer.com, official MSDS, .gov sites
-
-   b) **PRIORITY 2:** Regulatory actions and safety recalls
-      - Search: "[product] recall FDA warning" OR "[product] safety alert CPSC"
-      - ONLY use: FDA.gov, HealthCanada.gc.ca, CPSC.gov, EPA.gov, EU REACH
-
-   c) **PRIORITY 3:** Scientific studies and carcinogen classifications
-      - Search: "[ingredient] IARC classification" OR "[ingredient] EPA toxicity"
-      - ONLY use: PubMed, peer-reviewed journals, IARC, EPA, NIH
-
-   d) **PRIORITY 4:** Class action lawsuits and documented health impacts
-      - Search: "[product] class action lawsuit [ingredient]" OR "[brand] settlement"
-      - ONLY use: Court records, major news outlets (.gov, .edu, established media)
-
-3. Cross-reference findings with the knowledge base provided below
-4. Return a comprehensive structured JSON analysis
-
-**CRITICAL WEBSEARCH RESTRICTIONS:**
-- DO NOT use consumer blogs, forums, or non-scientific health websites
-- DO NOT use marketing materials or unverified product review sites (except for lawsuit discovery)
-- ONLY use credible sources: .gov, .edu, manufacturer official sites, peer-reviewed journals, major news outlets
-
-**Output Format:**
-After fetching and analyzing the product page, return your analysis as a JSON object with this exact structure:
-{
-    "product_name": "string",
-    "brand": "string",
-    "retailer": "string (e.g., Amazon, Amazon.ca)",
-    "ingredients": ["ingredient1", "ingredient2"],
-    "allergens_detected": [
-        {
-            "name": "allergen name (MUST match knowledge base below)",
-            "severity": "low|moderate|high|severe",
-            "source": "where found in product",
-            "confidence": 0.0-1.0
-        }
-    ],
-    "pfas_detected": [
-        {
-            "name": "PFAS compound name (MUST match knowledge base below)",
-            "cas_number": "CAS number if known",
-            "body_effects": "description of effects on human body",
-            "source": "where found (e.g., non-stick coating)",
-            "confidence": 0.0-1.0
-        }
-    ],
-    "other_concerns": [
-        {
-            "name": "concern name",
-            "category": "under_investigation|carcinogen|regulatory_action|heavy_metal|endocrine_disruptor|other",
-            "severity": "low|moderate|high|severe",
-            "description": "brief description",
-            "confidence": 0.0-1.0
-        }
-    ],
-    "confidence": 0.0-1.0
-}
-
-**CRITICAL CLASSIFICATION RULES - READ CAREFULLY:**
-
-1. **ALLERGENS - ONLY substances in the Allergen Knowledge Base below can go in allergens_detected**
-   - If you find an ingredient via websearch that is NOT in the Allergen Knowledge Base → DO NOT add to allergens_detected
-   - Minor irritants (citric acid, fragrance, etc.) are NOT allergens unless listed in the knowledge base
-   - If a substance causes irritation but is not a priority allergen → add to other_concerns with category="under_investigation"
-
-2. **PFAS - ONLY substances in the PFAS Knowledge Base below can go in pfas_detected**
-   - If you find a chemical via websearch that is NOT in the PFAS Knowledge Base → DO NOT add to pfas_detected
-   - Unknown fluorinated compounds → add to other_concerns with category="under_investigation"
-   - Match by CAS number or exact name from the knowledge base
-
-3. **OTHER CONCERNS - Use this for substances not in the knowledge bases**
-   - category="under_investigation": Substances with credible evidence but not in our database (max severity=low)
-   - category="carcinogen": IARC-classified carcinogens (Groups 1, 2A, 2B) with credible source
-   - category="regulatory_action": Substances with FDA recall, EPA warning, or class action lawsuit
-   - category="heavy_metal", "endocrine_disruptor", "other": Other toxins with credible evidence
+        allergen_profile: List[str],
+    ) -> List[Dict[str, Any]]:
+        """Build the system prompt as content blocks with prompt-cache breakpoints.
 
-4. **EVIDENCE REQUIREMENTS for other_concerns:**
-   - MUST have credible source (.gov, .edu, peer-reviewed journal, court record)
-   - MUST NOT include unverified consumer complaints or blog posts
-   - MUST include description with source citation
+        Layout, most to least stable: static instructions (cached), the sorted
+        knowledge bases (cached separately, so a table change only re-writes
+        this block), then the user's allergen profile (never cached).
 
-**PFAS Detection Guidelines:**
-- Non-stick cookware often contains PTFE (Teflon) - check knowledge base
-- "Water-resistant", "stain-resistant" products may have PFAS coatings
-- Match against knowledge base by CAS number or exact name
-- If ingredients aren't fully listed, note lower confidence
-
-**Allergen Detection:**
-- Check ingredient lists carefully against knowledge base
-- Look for synonyms listed in knowledge base
-- If not in knowledge base → NOT an allergen (may be irritant)
-"""
+        Args:
+            instructions: Static instructions for this analysis path
+            pfas_database: List of PFAS compounds from database
+            allergen_database: List of allergens from database
+            allergen_profile: User's known allergens
 
-        # Add FULL allergen database (token-efficient format)
-        if allergen_database:
-            prompt += f"\n**ALLERGEN KNOWLEDGE BASE ({len(allergen_database)} priority allergens):**\n"
-            prompt += "ONLY these substances can be classified as allergens. If a substance is not on this list, it is NOT an allergen.\n\n"
-            for allergen in allergen_database:
-                name = allergen.get('name', '')
-                synonyms = allergen.get('synonyms', [])
-                if synonyms:
-                    prompt += f"- {name} (synonyms: {', '.join(synonyms[:3])})\n"  # Limit synonyms to 3
-                else:
-                    prompt += f"- {name}\n"
-
-        # Add FULL PFAS database (token-efficient format)
-        if pfas_database:
-            prompt += f"\n**PFAS KNOWLEDGE BASE ({len(pfas_database)} compounds):**\n"
-            prompt += "ONLY these substances can be classified as PFAS. If a substance is not on this list, it is NOT PFAS.\n\n"
-            for pfas in pfas_database:
-                name = pfas.get('name', '')
-                cas = pfas.get('cas_number', '')
-                if cas:
-                    prompt += f"- {name} (CAS: {cas})\n"
-                else:
-                    prompt += f"- {name}\n"
-
-        # Add user allergen profile if provided
+        Returns:
+            System content blocks for messages.create / count_tokens
+        """
+        blocks: List[Dict[str, Any]] = [
+            {"type": "text", "text": instructions, "cache_control": {"type": "ephemeral"}}
+        ]
+        kb = _render_kb(pfas_database, allergen_database)
+        if kb:
+            blocks.append({"type": "text", "text": kb, "cache_control": {"type": "ephemeral"}})
         if allergen_profile:
-            prompt += f"\n**User's Allergen Profile:**\nPay special attention to: {', '.join(allergen_profile)}\n"
+            blocks.append({"type": "text", "text": self._profile_suffix(allergen_profile)})
+        return blocks
 
-        return prompt
+    def _profile_suffix(self, allergen_profile: List[str]) -> str:
+        """Build the per-request allergen profile section of the system prompt."""
+        return f"**User's Allergen Profile:**\nPay special attention to: {', '.join(allergen_profile)}\n"
 
     def _build_user_message(self, product_url: str) -> str:
         """Build the user message for Claude (fallback method when scraping fails)."""
@@ -298,70 +515,53 @@ After fetching and analyzing the product page, return your analysis as a JSON ob
 
     def _parse_response(self, response: Any) -> Dict[str, Any]:
         """Parse Claude's response and extract analysis JSON with validation."""
-        # Extract text content from response
-        for block in response.content:
-            if hasattr(block, "text"):
-                text = block.text
-
-                # Try to extract JSON
-                try:
-                    # Look for JSON in various formats
-                    if "```json" in text:
-                        json_start = text.find("```json") + 7
-                        json_end = text.find("```", json_start)
-                        json_str = text[json_start:json_end].strip()
-                    elif "```" in text:
-                        json_start = text.find("```") + 3
-                        json_end = text.find("```", json_start)
-                        json_str = text[json_start:json_end].strip()
-                    else:
-                        # Try to find JSON object directly
-                        json_start = text.find("{")
-                        json_end = text.rfind("}") + 1
-                        if json_start != -1 and json_end > json_start:
-                            json_str = text[json_start:json_end]
-                        else:
-                            raise ValueError("No JSON found")
-
-                    analysis = json.loads(json_str)
-
-                    # VALIDATION: Check for required fields and valid values
-                    if not analysis.get("product_name") or analysis.get("product_name") == "Unknown":
-                        logger.warning(f"⚠️  Claude returned 'Unknown' or missing product_name. Raw response: {text[:300]}")
-
-                    # Ensure lists exist
-                    analysis.setdefault('allergens_detected', [])
-                    analysis.setdefault('pfas_detected', [])
-                    analysis.setdefault('other_concerns', [])
-                    analysis.setdefault('ingredients', [])
-
-                    # Validate confidence is between 0-1
-                    confidence = analysis.get('confidence', 0.8)
-                    if not isinstance(confidence, (int, float)) or confidence < 0 or confidence > 1:
-                        logger.warning(f"⚠️  Invalid confidence value: {confidence}, defaulting to 0.5")
-                        analysis['confidence'] = 0.5
-
-                    logger.info(f"✅ Successfully parsed Claude response: {analysis.get('product_name', 'Unknown')}")
-                    return analysis
-
-                except (json.JSONDecodeError, ValueError) as e:
-                    # Log the full error for debugging
-                    logger.error(f"❌ JSON parsing failed: {str(e)}")
-                    logger.error(f"Raw Claude response text (first 1000 chars): {text[:1000]}")
-
-                    # Return error structure with partial data if possible
-                    return {
-                        "product_name": "Unknown",
-                        "brand": "Unknown",
-                        "retailer": "Unknown",
-                        "ingredients": [],
-                        "allergens_detected": [],
-                        "pfas_detected": [],
-                        "other_concerns": [],
-                        "confidence": 0.1,
-                        "error": f"Failed to parse JSON: {str(e)}",
-                        "raw_response_preview": text[:500]  # Include preview for debugging
-                    }
+        # Extract text content from response (with tools there can be several
+        # text blocks, e.g. narration before a search and the final answer)
+        texts = [block.text for block in response.content if hasattr(block, "text")]
+        if texts:
+            text = "\n".join(texts)
+
+            # Try to extract JSON
+            try:
+                analysis = _extract_json(text)
+
+                # VALIDATION: Check for required fields and valid values
+                if not analysis.get("product_name") or analysis.get("product_name") == "Unknown":
+                    logger.warning(f"⚠️  Claude returned 'Unknown' or missing product_name. Raw response: {text[:300]}")
+
+                # Ensure lists exist
+                analysis.setdefault('allergens_detected', [])
+                analysis.setdefault('pfas_detected', [])
+                analysis.setdefault('other_concerns', [])
+                analysis.setdefault('ingredients', [])
+
+                # Validate confidence is between 0-1
+                confidence = analysis.get('confidence', 0.8)
+                if not isinstance(confidence, (int, float)) or confidence < 0 or confidence > 1:
+                    logger.warning(f"⚠️  Invalid confidence value: {confidence}, defaulting to 0.5")
+                    analysis['confidence'] = 0.5
+
+                logger.info(f"✅ Successfully parsed Claude response: {analysis.get('product_name', 'Unknown')}")
+                return analysis
+
+            except ValueError as e:
+                # Log the full error for debugging
+                logger.error(f"❌ JSON parsing failed: {str(e)}")
+                logger.error(f"Raw Claude response text (first 1000 chars): {text[:1000]}")
+
+                # Return error structure with partial data if possible
+                return {
+                    "product_name": "Unknown",
+                    "brand": "Unknown",
+                    "retailer": "Unknown",
+                    "ingredients": [],
+                    "allergens_detected": [],
+                    "pfas_detected": [],
+                    "other_concerns": [],
+                    "confidence": 0.1,
+                    "error": f"Failed to parse JSON: {str(e)}",
+                    "raw_response_preview": text[:500]  # Include preview for debugging
+                }
 
         # No text block found
         logger.error("❌ No text block found in Claude response")
@@ -402,8 +602,8 @@ After fetching and analyzing the product page, return your analysis as a JSON ob
         allergen_database = allergen_database or []
 
         # Build analysis prompt
-        system_prompt = self._build_analysis_prompt_for_extracted_data(
-            allergen_profile, pfas_database, allergen_database
+        system_prompt = self._system_blocks(
+            EXTRACTED_ANALYSIS_INSTRUCTIONS, pfas_database, allergen_database, allergen_profile
         )
 
         # Build user message from extracted data
@@ -415,6 +615,7 @@ After fetching and analyzing the product page, return your analysis as a JSON ob
                 "type": "web_search_20250305",
                 "name": "web_search",
                 "max_uses": 3,  # Limit to 3 searches: manufacturer site, reviews, safety data
+                "cache_control": {"type": "ephemeral"},  # Cache tool definitions
             },
         ]
 
@@ -423,8 +624,8 @@ After fetching and analyzing the product page, return your analysis as a JSON ob
         logger.info(f"🔍 Calling Claude Agent for safety analysis with web_search")
         logger.info(f"   Product: {product_data.get('product_name')}")
 
-        # Pre-request token counting
-        estimated_tokens = self.token_tracker.count_tokens(
+        # Pre-request token estimate (static prompt + tools counted once)
+        estimated_tokens = await self.token_tracker.estimate_input_tokens(
             model=self.model,
             messages=messages,
             system=system_prompt,
@@ -433,16 +634,19 @@ After fetching and analyzing the product page, return your analysis as a JSON ob
 
         # tool_choice="auto" lets Claude decide when to use web_search
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=2048,  # Reduced from 4096
-                system=system_prompt,
-                messages=messages,
-                tools=tools,
-                tool_choice={"type": "auto"},  # Claude decides when to search
-            )
+            async with _agent_call_slots:
+                await claude_rate_limiter.acquire()
+                response = await self.client.messages.create(
+                    model=self.model,
+                    max_tokens=2048,  # Reduced from 4096
+                    system=system_prompt,
+                    messages=messages,
+                    tools=tools,
+                    tool_choice={"type": "auto"},  # Claude decides when to search
+                )
         except RateLimitError as e:
             logger.error(f"❌ Rate limit exceeded in analyze_extracted_product: {e}")
+            claude_rate_limiter.on_failure()
             # Re-raise to be handled by caller (will fallback to database-only results)
             raise
         except APIError as e:
@@ -450,6 +654,8 @@ After fetching and analyzing the product page, return your analysis as a JSON ob
             # Re-raise to be handled by caller
             raise
 
+        claude_rate_limiter.on_success()
+
         # Record token usage with detailed logging
         self.token_tracker.record_usage(
             call_name="agent_safety_analysis",
@@ -462,138 +668,6 @@ After fetching and analyzing the product page, return your analysis as a JSON ob
         analysis = self._parse_response(response)
         return analysis
 
-    def _build_analysis_prompt_for_extracted_data(
-        self,
-        allergen_profile: List[str],
-        pfas_database: List[Dict[str, Any]],
-        allergen_database: List[Dict[str, Any]],
-    ) -> str:
-        """Build system prompt for safety analysis with extracted data."""
-        prompt = """You are a product safety analysis expert. You have been provided with pre-extracted product information.
-
-CRITICAL OUTPUT REQUIREMENT: You MUST respond with ONLY a valid JSON object.
-- NO explanatory text before the JSON
-- NO explanatory text after the JSON
-- NO markdown code blocks (no ```json or ```)
-- NO comments
-- Start immediately with { and end with }
-
-**Your Analysis Process:**
-1. Review the provided product details (already extracted from the product page)
-2. Use web_search strategically (max 3 searches) to find:
-   a) **SEARCH 1 (IF INGREDIENTS/MATERIALS MISSING):** Manufacturer's official website for complete ingredient/material lists
-      - Search: "[brand] [product name] official ingredients" OR "[brand] official MSDS"
-      - ONLY use: manufacturer.com, official MSDS, .gov sites
-      - Look for manufacturer's product page, ingredient disclosure, or safety data
-
-   b) **SEARCH 2:** Regulatory actions and safety recalls
-      - Search: "[product] recall FDA warning" OR "[product] safety alert CPSC"
-      - ONLY use: FDA.gov, HealthCanada.gc.ca, CPSC.gov, EPA.gov, EU REACH
-      - Look for regulatory actions, recalls, safety warnings
-
-   c) **SEARCH 3:** Scientific studies, carcinogen classifications, or class action lawsuits
-      - Search: "[ingredient] IARC classification" OR "[product] class action lawsuit"
-      - ONLY use: PubMed, peer-reviewed journals, IARC, EPA, court records, major news outlets
-      - Look for scientific research, carcinogen status, documented health impacts
-
-**CRITICAL WEBSEARCH RESTRICTIONS:**
-- DO NOT use consumer blogs, forums, review sites, or non-scientific health websites
-- DO NOT use marketing materials or unverified sources
-- ONLY use credible sources: .gov, .edu, manufacturer official sites, peer-reviewed journals, court records
-
-**Output Format - YOUR ENTIRE RESPONSE MUST BE THIS JSON OBJECT:**
-{
-    "product_name": "string",
-    "brand": "string",
-    "retailer": "string",
-    "ingredients": ["complete list from manufacturer website if found, else from product page"],
-    "allergens_detected": [
-        {
-            "name": "allergen name (MUST match knowledge base below)",
-            "severity": "low|moderate|high|severe",
-            "source": "where found",
-            "confidence": 0.0-1.0
-        }
-    ],
-    "pfas_detected": [
-        {
-            "name": "PFAS compound (MUST match knowledge base below)",
-            "cas_number": "CAS number if known",
-            "body_effects": "effects on human body",
-            "source": "where found",
-            "confidence": 0.0-1.0
-        }
-    ],
-    "other_concerns": [
-        {
-            "name": "concern name",
-            "category": "under_investigation|carcinogen|regulatory_action|heavy_metal|endocrine_disruptor|other",
-            "severity": "low|moderate|high|severe",
-            "description": "brief description with source citation",
-            "confidence": 0.0-1.0
-        }
-    ],
-    "research_sources": [
-        {"type": "manufacturer_website", "url": "...", "finding": "..."},
-        {"type": "regulatory_action", "url": "...", "finding": "..."},
-        {"type": "scientific_study", "url": "...", "finding": "..."}
-    ],
-    "confidence": 0.0-1.0
-}
-
-**CRITICAL CLASSIFICATION RULES - READ CAREFULLY:**
-
-1. **ALLERGENS - ONLY substances in the Allergen Knowledge Base below can go in allergens_detected**
-   - If you find an ingredient via websearch that is NOT in the Allergen Knowledge Base → DO NOT add to allergens_detected
-   - Minor irritants (citric acid, fragrance, etc.) are NOT allergens unless listed in the knowledge base
-   - If a substance causes irritation but is not a priority allergen → add to other_concerns with category="under_investigation", severity="low"
-
-2. **PFAS - ONLY substances in the PFAS Knowledge Base below can go in pfas_detected**
-   - If you find a chemical via websearch that is NOT in the PFAS Knowledge Base → DO NOT add to pfas_detected
-   - Unknown fluorinated compounds → add to other_concerns with category="under_investigation"
-   - Match by CAS number or exact name from the knowledge base
-
-3. **OTHER CONCERNS - Use this for substances not in the knowledge bases**
-   - category="under_investigation": Substances with credible evidence but not in our database (MUST have severity="low" max)
-   - category="carcinogen": ONLY IARC-classified carcinogens (Groups 1, 2A, 2B) from credible sources
-   - category="regulatory_action": ONLY substances with FDA recall, EPA warning, or class action lawsuit
-   - category="heavy_metal", "endocrine_disruptor", "other": Other toxins with credible evidence
-
-4. **EVIDENCE REQUIREMENTS for other_concerns:**
-   - MUST have credible source (.gov, .edu, peer-reviewed journal, court record)
-   - MUST NOT include unverified consumer complaints or blog posts
-   - MUST include description with source citation (e.g., "IARC Group 2A carcinogen per iarc.who.int/2023")
-"""
-
-        # Add FULL allergen database (token-efficient format)
-        if allergen_database:
-            prompt += f"\n**ALLERGEN KNOWLEDGE BASE ({len(allergen_database)} priority allergens):**\n"
-            prompt += "ONLY these substances can be classified as allergens. If a substance is not on this list, it is NOT an allergen.\n\n"
-            for allergen in allergen_database:
-                name = allergen.get('name', '')
-                synonyms = allergen.get('synonyms', [])
-                if synonyms:
-                    prompt += f"- {name} (synonyms: {', '.join(synonyms[:3])})\n"  # Limit synonyms to 3
-                else:
-                    prompt += f"- {name}\n"
-
-        # Add FULL PFAS database (token-efficient format)
-        if pfas_database:
-            prompt += f"\n**PFAS KNOWLEDGE BASE ({len(pfas_database)} compounds):**\n"
-            prompt += "ONLY these substances can be classified as PFAS. If a substance is not on this list, it is NOT PFAS.\n\n"
-            for pfas in pfas_database:
-                name = pfas.get('name', '')
-                cas = pfas.get('cas_number', '')
-                if cas:
-                    prompt += f"- {name} (CAS: {cas})\n"
-                else:
-                    prompt += f"- {name}\n"
-
-        if allergen_profile:
-            prompt += f"\n**User's Allergen Profile:**\nPay special attention to: {', '.join(allergen_profile)}\n"
-
-        return prompt
-
     def _build_user_message_from_extracted_data(
         self, product_data: Dict[str, Any], product_url: str
     ) -> str:
@@ -644,7 +718,3 @@ CRITICAL OUTPUT REQUIREMENT: You MUST respond with ONLY a valid JSON object.
         """Find safer alternative products (placeholder for Phase 4)."""
         # Will implement in Phase 4
         return []
-
-    async def close(self) -> None:
-        """Close HTTP client."""
-        await self.http_client.aclose()
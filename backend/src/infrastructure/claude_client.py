@@ -0,0 +1,20 @@
+"""Shared Anthropic client for every Claude call in this process.
+
+ProductSafetyAgent, ClaudeQueryService and TokenTracker are created per
+analysis; sharing one client lets them reuse pooled HTTP/2 connections to
+api.anthropic.com instead of opening a new TCP+TLS connection each time.
+"""
+
+import httpx
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+
+from .config import settings
+
+# Keeps the SDK's default timeouts (agent turns with web tools run long)
+claude_client = AsyncAnthropic(
+    api_key=settings.anthropic_api_key,
+    http_client=DefaultAsyncHttpxClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    ),
+)
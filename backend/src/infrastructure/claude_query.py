@@ -8,10 +8,11 @@ import json
 import logging
 from typing import Dict, Any, Optional
 
-from anthropic import Anthropic
+from anthropic import RateLimitError
 
-from .config import settings
+from .claude_client import claude_client
 from .token_tracker import TokenTracker
+from .claude_rate_limiter import claude_rate_limiter
 from ..domain.models import ScrapedProduct
 from ..domain.extraction_schemas import ProductExtraction, ReviewInsightsExtraction
 
@@ -37,7 +38,7 @@ class ClaudeQueryService:
             token_tracker: Optional TokenTracker instance for usage tracking.
                           If not provided, a new one will be created.
         """
-        self.client = Anthropic(api_key=settings.anthropic_api_key)
+        self.client = claude_client
         self.model = "claude-sonnet-4-5-20250929"
         self.token_tracker = token_tracker or TokenTracker()
 
@@ -63,7 +64,7 @@ class ClaudeQueryService:
         logger.info(f"   Message size after processing: {len(user_message) / 1024:.1f}KB")
 
         # Pre-request token counting
-        estimated_tokens = self.token_tracker.count_tokens(
+        estimated_tokens = await self.token_tracker.count_tokens(
             model=self.model,
             messages=messages,
             system=system_prompt,
@@ -76,7 +77,8 @@ class ClaudeQueryService:
 
             # Use .parse() which handles schema transformation automatically
             # and returns parsed_output as a validated Pydantic model
-            response = self.client.beta.messages.parse(
+            await claude_rate_limiter.acquire()
+            response = await self.client.beta.messages.parse(
                 model=self.model,
                 max_tokens=2048,
                 betas=[STRUCTURED_OUTPUTS_BETA],
@@ -85,6 +87,8 @@ class ClaudeQueryService:
                 output_format=ProductExtraction,
             )
 
+            claude_rate_limiter.on_success()
+
             # Record token usage with detailed logging
             self.token_tracker.record_usage(
                 call_name="product_extraction",
@@ -104,6 +108,8 @@ class ClaudeQueryService:
             return extracted_data
 
         except Exception as e:
+            if isinstance(e, RateLimitError):
+                claude_rate_limiter.on_failure()
             logger.error(f"❌ CLAUDE QUERY FAILED: {type(e).__name__}: {str(e)}")
             # Log more details for BadRequestError
             if hasattr(e, 'response'):
@@ -133,7 +139,7 @@ class ClaudeQueryService:
         logger.info(f"   Reviews HTML size: {len(scraped_html.raw_html_reviews) / 1024:.1f}KB")
 
         # Pre-request token counting
-        estimated_tokens = self.token_tracker.count_tokens(
+        estimated_tokens = await self.token_tracker.count_tokens(
             model=self.model,
             messages=messages,
             system=system_prompt,
@@ -141,7 +147,8 @@ class ClaudeQueryService:
 
         try:
             # Use .parse() which handles schema transformation automatically
-            response = self.client.beta.messages.parse(
+            await claude_rate_limiter.acquire()
+            response = await self.client.beta.messages.parse(
                 model=self.model,
                 max_tokens=3072,  # Larger for comprehensive review analysis
                 betas=[STRUCTURED_OUTPUTS_BETA],
@@ -150,6 +157,8 @@ class ClaudeQueryService:
                 output_format=ReviewInsightsExtraction,
             )
 
+            claude_rate_limiter.on_success()
+
             # Record token usage with detailed logging
             self.token_tracker.record_usage(
                 call_name="review_insights_extraction",
@@ -169,6 +178,8 @@ class ClaudeQueryService:
             return insights
 
         except Exception as e:
+            if isinstance(e, RateLimitError):
+                claude_rate_limiter.on_failure()
             logger.error(f"❌ REVIEW EXTRACTION FAILED: {type(e).__name__}: {str(e)}")
             raise
 
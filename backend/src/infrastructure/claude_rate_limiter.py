@@ -0,0 +1,83 @@
+"""Adaptive client-side rate limiting for outbound Claude API calls.
+
+Paces requests to Anthropic with a token bucket whose refill rate adapts
+AIMD-style: it creeps up while calls succeed and is cut on a RateLimitError,
+so bursts queue briefly here instead of failing at the API.
+"""
+
+import asyncio
+import logging
+import time
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveTokenBucket:
+    """Token bucket with additive-increase / multiplicative-decrease refill rate."""
+
+    def __init__(
+        self,
+        capacity: int,
+        rate: float,
+        alpha: float = 1.5,
+        beta: float = 0.5,
+        min_rate: float = 1 / 60,
+    ) -> None:
+        """Initialize the bucket.
+
+        Args:
+            capacity: Maximum burst size (tokens)
+            rate: Initial refill rate in calls per second
+            alpha: Ceiling for the rate as a multiple of the initial rate
+            beta: Factor applied to the rate after a rate-limit failure
+            min_rate: Floor for the rate in calls per second
+        """
+        self.capacity = capacity
+        self.rate = rate
+        self.max_rate = rate * alpha
+        self.min_rate = min_rate
+        self.beta = beta
+        # Each success adds back 1% of the initial rate
+        self._increase = rate / 100
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+
+    def _refill(self) -> None:
+        """Add tokens for the time elapsed since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it.
+
+        Refill and take run without an await in between, so they are atomic on
+        the event loop; waiters sleep independently and re-check on waking,
+        picking up a rate changed by on_success/on_failure meanwhile.
+        """
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def on_success(self) -> None:
+        """Additively raise the rate after a successful call."""
+        self.rate = min(self.max_rate, self.rate + self._increase)
+
+    def on_failure(self) -> None:
+        """Cut the rate and drain the bucket after a RateLimitError."""
+        self._refill()
+        self.rate = max(self.min_rate, self.rate * self.beta)
+        self._tokens = 0.0
+        logger.warning(f"⚠️  Claude rate limited, pacing calls at {self.rate * 60:.1f}/min")
+
+
+# Global limiter shared by every Claude client in this process
+claude_rate_limiter = AdaptiveTokenBucket(
+    capacity=settings.claude_max_burst,
+    rate=settings.claude_requests_per_minute / 60,
+)
@@ -1,6 +1,7 @@
 """Application configuration."""
 
 from typing import List
+from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -24,6 +25,24 @@ class Settings(BaseSettings):
     # Redis (optional for basic API functionality)
     redis_url: str = ""
 
+    # Rate limiting (token bucket per client IP, shared via Redis if configured)
+    rate_limit_per_minute: int = 100
+    admin_rate_limit_per_minute: int = 20
+
+    # Outbound Claude API pacing (adaptive, per process)
+    claude_requests_per_minute: int = 50
+    claude_max_burst: int = 10
+    claude_max_concurrency: int = 16
+
+    # Review search: concurrent vector searches + reranks per process, and how
+    # long query embeddings wait to be batched into one Cohere call
+    review_search_max_concurrency: int = 32
+    query_embed_batch_window_ms: int = 20
+
+    # Client-captured HTML size caps (characters) - larger payloads get a 413
+    max_product_html_chars: int = 4_000_000
+    max_reviews_html_chars: int = 6_000_000
+
     # Celery (optional for basic API functionality)
     celery_broker_url: str = ""
     celery_result_backend: str = ""
@@ -46,6 +65,14 @@ class Settings(BaseSettings):
         extra="ignore",  # Ignore extra fields like CLOUD_RUN_URL
     )
 
+    @field_validator("allowed_origins")
+    @classmethod
+    def _reject_wildcard_origin(cls, value: str) -> str:
+        """CORS credentials are sent, which browsers refuse with a '*' origin."""
+        if "*" in (origin.strip() for origin in value.split(",")):
+            raise ValueError("ALLOWED_ORIGINS cannot contain '*' (CORS credentials are enabled)")
+        return value
+
     @property
     def cors_origins(self) -> List[str]:
         """Parse CORS origins from comma-separated string."""
@@ -1,17 +1,91 @@
 """Supabase database service layer."""
 
+import asyncio
 import hashlib
 import logging
+import re
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from time import monotonic
+from typing import Optional, List, Dict, Any, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from uuid import UUID
 
+import httpx
 from supabase import create_client, Client
 
 from .config import settings
 
 logger = logging.getLogger(__name__)
 
+# Allergen/PFAS knowledge bases change on the order of hours, not requests
+KNOWLEDGE_BASE_TTL_SECONDS = 300
+
+# In-process memo of recent cache hits, so popular products skip the Supabase round trip
+ANALYSIS_MEMO_TTL_SECONDS = 60
+ANALYSIS_MEMO_MAX_SIZE = 1024
+
+
+# Amazon product pages are identified by their ASIN, whatever the rest of the path
+AMAZON_ASIN_PATTERN = re.compile(r'/(?:dp|gp/product|gp/aw/d)/([A-Z0-9]{10})(?:[/?]|$)', re.IGNORECASE)
+
+# Ad/analytics click IDs that never select a product, on any site (plus utm_*)
+TRACKING_PARAMS = frozenset({
+    'gclid', 'gbraid', 'wbraid', 'dclid', 'fbclid', 'msclkid', 'mc_cid', 'mc_eid',
+})
+
+# Amazon's own tracking parameters. Names like 'tag', 'th' or 'ref' can select
+# the product elsewhere, so these are only dropped on Amazon hosts
+AMAZON_TRACKING_PARAMS = TRACKING_PARAMS | frozenset({
+    'ref', 'ref_', 'tag', 'psc', 'th', 'qid', 'sr', 'keywords', 'crid', 'sprefix',
+    'content-id', 'pd_rd_i', 'pd_rd_r', 'pd_rd_w', 'pd_rd_wg', 'pf_rd_p', 'pf_rd_r',
+    'smid', 'spla', 'dib', 'dib_tag', 'linkcode', 'linkid', 'camp', 'creative',
+})
+
+
+def canonical_product_url(url: str) -> str:
+    """Reduce a product URL to the parts that identify the product.
+
+    Tracking parameters, fragments and host case differ between visits to the
+    same product, so they are dropped before hashing. Only universal click IDs
+    and utm_* are treated as tracking on other retailers; Amazon URLs collapse
+    to /dp/<ASIN> on their host.
+
+    Args:
+        url: Product URL as seen by the extension
+
+    Returns:
+        Canonical URL (the input unchanged if it can't be parsed)
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    host = parts.netloc.lower()
+    if not host:
+        return url
+
+    tracking_params = TRACKING_PARAMS
+    if 'amazon.' in host:
+        asin = AMAZON_ASIN_PATTERN.search(parts.path)
+        if asin:
+            return f"https://{host}/dp/{asin.group(1).upper()}"
+        tracking_params = AMAZON_TRACKING_PARAMS
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in tracking_params and not key.lower().startswith('utm_')
+    )
+    return urlunsplit((parts.scheme.lower() or 'https', host, parts.path.rstrip('/') or '/', urlencode(query), ''))
+
+
+@lru_cache(maxsize=8192)
+def _sha256_hex(url: str) -> str:
+    """Hash a canonical product URL once; the analyze route and search logging hash the same URLs."""
+    return hashlib.sha256(canonical_product_url(url).encode()).hexdigest()
+
 
 class DatabaseService:
     """Service for interacting with Supabase database."""
@@ -19,8 +93,19 @@ class DatabaseService:
     def __init__(self):
         """Initialize Supabase client."""
         self.client: Optional[Client] = None
+        self.http: Optional[httpx.AsyncClient] = None
         self._anonymous_user_id: Optional[UUID] = None
 
+        # Knowledge base cache: table -> (expiry, rows)
+        self._kb_cache: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._kb_locks: Dict[str, asyncio.Lock] = {
+            'allergens': asyncio.Lock(),
+            'pfas_compounds': asyncio.Lock(),
+        }
+
+        # Recent cached analyses, least recently used first: url_hash -> (expiry, row)
+        self._analysis_memo: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
         if settings.supabase_url and settings.supabase_key:
             try:
                 self.client = create_client(
@@ -31,6 +116,18 @@ class DatabaseService:
             except Exception as e:
                 logger.error(f"Failed to initialize Supabase client: {e}")
                 self.client = None
+
+            # Async PostgREST client - does not block the event loop, and
+            # HTTP/2 multiplexes concurrent queries over one connection
+            self.http = httpx.AsyncClient(
+                base_url=settings.supabase_url.rstrip("/") + "/rest/v1",
+                headers={
+                    "apikey": settings.supabase_key,
+                    "Authorization": f"Bearer {settings.supabase_key}",
+                },
+                http2=True,
+                timeout=30.0,
+            )
         else:
             logger.warning("Supabase credentials not configured, database features disabled")
 
@@ -39,6 +136,85 @@ class DatabaseService:
         """Check if database is available."""
         return self.client is not None
 
+    async def close(self) -> None:
+        """Close the async PostgREST client."""
+        if self.http is not None:
+            await self.http.aclose()
+
+    async def rpc(self, name: str, payload: Dict[str, Any]) -> Any:
+        """Call a SQL function through PostgREST without blocking the event loop.
+
+        Args:
+            name: SQL function name
+            payload: Function arguments
+
+        Returns:
+            Decoded JSON result of the function
+        """
+        response = await self.http.post(f"/rpc/{name}", json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def select(
+        self,
+        table: str,
+        params: Union[Dict[str, Any], List[Tuple[str, Any]]],
+        count: bool = False
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Read rows from a table through PostgREST without blocking the event loop.
+
+        Args:
+            table: Table name
+            params: PostgREST query params (select, filters, order, limit, ...).
+                    Use a list of tuples to apply several filters to one column.
+            count: Ask PostgREST for the exact total row count (expensive)
+
+        Returns:
+            Tuple of (rows, total count or None)
+        """
+        headers = {"Prefer": "count=exact"} if count else None
+        response = await self.http.get(f"/{table}", params=params, headers=headers)
+        response.raise_for_status()
+
+        total = None
+        if count:
+            # Content-Range: 0-99/1234
+            content_range = response.headers.get("content-range", "")
+            _, _, total_str = content_range.partition("/")
+            if total_str.isdigit():
+                total = int(total_str)
+
+        return response.json(), total
+
+    async def insert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        columns: Optional[str] = None
+    ) -> None:
+        """Bulk-insert rows through PostgREST without blocking the event loop.
+
+        Args:
+            table: Table name
+            rows: Rows to insert
+            columns: Comma-separated columns to insert. Needed when rows have
+                     different keys; missing values fall back to column defaults
+                     (NULL for columns without one).
+        """
+        params = None
+        prefer = "return=minimal"
+        if columns:
+            params = {"columns": columns}
+            # Without missing=default PostgREST inserts NULL for absent keys
+            prefer += ", missing=default"
+        response = await self.http.post(
+            f"/{table}",
+            json=rows,
+            params=params,
+            headers={"Prefer": prefer},
+        )
+        response.raise_for_status()
+
     async def get_or_create_anonymous_user(self) -> UUID:
         """Get or create a default anonymous user for tracking searches.
 
@@ -73,7 +249,10 @@ class DatabaseService:
             return UUID('00000000-0000-0000-0000-000000000000')
 
     def generate_url_hash(self, url: str) -> str:
-        """Generate SHA256 hash of product URL for efficient lookups.
+        """Generate SHA256 hash of the canonical product URL for efficient lookups.
+
+        URLs that differ only in tracking parameters, fragments or (on Amazon)
+        the descriptive path share one hash, so they share one cached analysis.
 
         Args:
             url: Product URL
@@ -81,11 +260,13 @@ class DatabaseService:
         Returns:
             Hex string of SHA256 hash
         """
-        return hashlib.sha256(url.encode()).hexdigest()
+        return _sha256_hex(url)
 
     async def get_cached_analysis(self, url_hash: str) -> Optional[Dict[str, Any]]:
         """Check if product analysis exists in cache.
 
+        Hits are memoized in process for ANALYSIS_MEMO_TTL_SECONDS.
+
         Args:
             url_hash: SHA256 hash of product URL
 
@@ -95,6 +276,14 @@ class DatabaseService:
         if not self.is_available:
             return None
 
+        entry = self._analysis_memo.get(url_hash)
+        if entry is not None:
+            if entry[0] > monotonic():
+                self._analysis_memo.move_to_end(url_hash)
+                logger.info(f"Cache HIT (in-process) for URL hash: {url_hash[:16]}...")
+                return entry[1]
+            del self._analysis_memo[url_hash]
+
         try:
             response = self.client.table('product_analyses')\
                 .select('*')\
@@ -103,6 +292,11 @@ class DatabaseService:
 
             if response.data:
                 logger.info(f"Cache HIT for URL hash: {url_hash[:16]}...")
+                self._analysis_memo[url_hash] = (
+                    monotonic() + ANALYSIS_MEMO_TTL_SECONDS, response.data[0]
+                )
+                if len(self._analysis_memo) > ANALYSIS_MEMO_MAX_SIZE:
+                    self._analysis_memo.popitem(last=False)
                 return response.data[0]
             else:
                 logger.info(f"Cache MISS for URL hash: {url_hash[:16]}...")
@@ -111,6 +305,82 @@ class DatabaseService:
             logger.error(f"Failed to check cache: {e}")
             return None
 
+    @staticmethod
+    def _analysis_row(
+        url_hash: str,
+        product_url: str,
+        analysis_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Build a product_analyses row from an analysis response.
+
+        Args:
+            url_hash: SHA256 hash of product URL
+            product_url: Original product URL
+            analysis_data: Analysis response from Claude
+
+        Returns:
+            Row matching the product_analyses columns
+        """
+        # Extract data from Claude's response
+        analysis = analysis_data.get('analysis', {})
+
+        # Calculate harm score (inverse of safety score)
+        harm_score = 100 - analysis.get('overall_score', 0)
+
+        # Prepare data for insertion - match actual schema columns
+        ingredients = analysis.get('ingredients', [])
+        # Ensure ingredients is a list of strings for PostgreSQL TEXT[] type
+        if not isinstance(ingredients, list):
+            ingredients = []
+
+        # Get allergens and PFAS - ensure they're lists and convert Pydantic models to dicts
+        allergens = analysis.get('allergens', analysis.get('allergens_detected', []))
+        if not isinstance(allergens, list):
+            allergens = []
+        # Convert Pydantic models to dictionaries
+        allergens = [item.model_dump() if hasattr(item, 'model_dump') else item for item in allergens]
+
+        pfas = analysis.get('pfas_compounds', analysis.get('pfas_detected', []))
+        if not isinstance(pfas, list):
+            pfas = []
+        # Convert Pydantic models to dictionaries
+        pfas = [item.model_dump() if hasattr(item, 'model_dump') else item for item in pfas]
+
+        other_concerns = analysis.get('other_concerns', [])
+        if not isinstance(other_concerns, list):
+            other_concerns = []
+        # Convert Pydantic models to dictionaries
+        other_concerns = [item.model_dump() if hasattr(item, 'model_dump') else item for item in other_concerns]
+
+        db_data = {
+            'product_url_hash': url_hash,
+            'product_url': product_url,
+            'product_name': analysis.get('product_name', ''),
+            'brand': analysis.get('brand', ''),
+            'category': analysis.get('category', ''),
+            'retailer': analysis.get('retailer', ''),
+            'ingredients': ingredients,  # PostgreSQL TEXT[] array
+            'harm_score': harm_score,
+            'overall_score': analysis.get('overall_score', 0),
+            'allergens_detected': allergens,  # JSONB - maps to allergens_detected column
+            'pfas_detected': pfas,  # JSONB - maps to pfas_detected column
+            'other_concerns': other_concerns,  # JSONB
+            'confidence': int(analysis.get('confidence', 0.8) * 100),  # INTEGER 0-100
+            'analyzed_at': datetime.now(timezone.utc).isoformat()
+        }
+
+        # Add token usage data if available
+        token_usage = analysis_data.get('token_usage')
+        if token_usage:
+            db_data['total_input_tokens'] = token_usage.get('total_input_tokens', 0)
+            db_data['total_output_tokens'] = token_usage.get('total_output_tokens', 0)
+            db_data['total_tokens'] = token_usage.get('total_tokens', 0)
+            db_data['total_cost_usd'] = token_usage.get('total_cost_usd', 0)
+            db_data['api_call_count'] = token_usage.get('api_call_count', 0)
+            db_data['token_usage_details'] = token_usage.get('token_usage_details', [])
+
+        return db_data
+
     async def store_analysis(
         self,
         url_hash: str,
@@ -131,73 +401,18 @@ class DatabaseService:
             logger.warning("Database not available, skipping analysis storage")
             return False
 
+        db_data: Dict[str, Any] = {}
         try:
-            # Extract data from Claude's response
-            analysis = analysis_data.get('analysis', {})
-
-            # Calculate harm score (inverse of safety score)
-            harm_score = 100 - analysis.get('overall_score', 0)
-
-            # Prepare data for insertion - match actual schema columns
-            ingredients = analysis.get('ingredients', [])
-            # Ensure ingredients is a list of strings for PostgreSQL TEXT[] type
-            if not isinstance(ingredients, list):
-                ingredients = []
-
-            # Get allergens and PFAS - ensure they're lists and convert Pydantic models to dicts
-            allergens = analysis.get('allergens', analysis.get('allergens_detected', []))
-            if not isinstance(allergens, list):
-                allergens = []
-            # Convert Pydantic models to dictionaries
-            allergens = [item.model_dump() if hasattr(item, 'model_dump') else item for item in allergens]
-
-            pfas = analysis.get('pfas_compounds', analysis.get('pfas_detected', []))
-            if not isinstance(pfas, list):
-                pfas = []
-            # Convert Pydantic models to dictionaries
-            pfas = [item.model_dump() if hasattr(item, 'model_dump') else item for item in pfas]
-
-            other_concerns = analysis.get('other_concerns', [])
-            if not isinstance(other_concerns, list):
-                other_concerns = []
-            # Convert Pydantic models to dictionaries
-            other_concerns = [item.model_dump() if hasattr(item, 'model_dump') else item for item in other_concerns]
-
-            db_data = {
-                'product_url_hash': url_hash,
-                'product_url': product_url,
-                'product_name': analysis.get('product_name', ''),
-                'brand': analysis.get('brand', ''),
-                'category': analysis.get('category', ''),
-                'retailer': analysis.get('retailer', ''),
-                'ingredients': ingredients,  # PostgreSQL TEXT[] array
-                'harm_score': harm_score,
-                'overall_score': analysis.get('overall_score', 0),
-                'allergens_detected': allergens,  # JSONB - maps to allergens_detected column
-                'pfas_detected': pfas,  # JSONB - maps to pfas_detected column
-                'other_concerns': other_concerns,  # JSONB
-                'confidence': int(analysis.get('confidence', 0.8) * 100),  # INTEGER 0-100
-                'analyzed_at': datetime.now(timezone.utc).isoformat()
-            }
-
-            # Add token usage data if available
-            token_usage = analysis_data.get('token_usage')
-            if token_usage:
-                db_data['total_input_tokens'] = token_usage.get('total_input_tokens', 0)
-                db_data['total_output_tokens'] = token_usage.get('total_output_tokens', 0)
-                db_data['total_tokens'] = token_usage.get('total_tokens', 0)
-                db_data['total_cost_usd'] = token_usage.get('total_cost_usd', 0)
-                db_data['api_call_count'] = token_usage.get('api_call_count', 0)
-                db_data['token_usage_details'] = token_usage.get('token_usage_details', [])
-
+            db_data = self._analysis_row(url_hash, product_url, analysis_data)
             logger.info(f"About to store analysis with keys: {list(db_data.keys())}")
 
             # Upsert (insert or update if exists)
             response = self.client.table('product_analyses')\
                 .upsert(db_data, on_conflict='product_url_hash')\
                 .execute()
+            self._analysis_memo.pop(url_hash, None)
 
-            logger.info(f"✅ Stored analysis for: {analysis.get('product_name', 'Unknown')}")
+            logger.info(f"✅ Stored analysis for: {db_data['product_name'] or 'Unknown'}")
             return True
         except Exception as e:
             logger.error(f"❌ Failed to store analysis: {e}")
@@ -208,6 +423,46 @@ class DatabaseService:
                 logger.error("Could not log db_data details")
             return False
 
+    async def store_analysis_with_reviews(
+        self,
+        url_hash: str,
+        product_url: str,
+        analysis_data: Dict[str, Any],
+        review_rows: List[Dict[str, Any]],
+        review_summary: Optional[Dict[str, Any]] = None
+    ) -> Optional[int]:
+        """Store an analysis, its review chunks and review summary in one transaction.
+
+        Calls the store_analysis_and_reviews SQL function, so the whole write is
+        a single round trip and the reviews are never stored without the analysis.
+
+        Args:
+            url_hash: SHA256 hash of product URL
+            product_url: Original product URL
+            analysis_data: Analysis response from Claude
+            review_rows: review_chunks rows with embeddings already computed
+            review_summary: review_summaries row, if reviews were parsed
+
+        Returns:
+            Number of review chunks stored, or None if the write failed
+        """
+        if not self.is_available:
+            logger.warning("Database not available, skipping analysis storage")
+            return None
+
+        try:
+            reviews_stored = await self.rpc('store_analysis_and_reviews', {
+                'p_analysis': self._analysis_row(url_hash, product_url, analysis_data),
+                'p_reviews': review_rows,
+                'p_review_summary': review_summary,
+            })
+            self._analysis_memo.pop(url_hash, None)
+            logger.info(f"✅ Stored analysis with {reviews_stored} reviews (hash: {url_hash[:16]}...)")
+            return reviews_stored
+        except Exception as e:
+            logger.error(f"❌ Failed to store analysis with reviews: {e}")
+            return None
+
     async def log_search(self, user_id: UUID, product_url: str) -> bool:
         """Log user search in database.
 
@@ -232,7 +487,7 @@ class DatabaseService:
                 'searched_at': datetime.now(timezone.utc).isoformat()
             }
 
-            self.client.table('user_searches').insert(search_data).execute()
+            await self.insert('user_searches', [search_data])
             logger.debug(f"Logged search for user {user_id}")
             return True
         except Exception as e:
@@ -279,6 +534,38 @@ class DatabaseService:
             logger.error(f"Failed to search PFAS: {e}")
             return []
 
+    async def _get_knowledge_base(self, table: str) -> List[Dict[str, Any]]:
+        """Get every row of a knowledge base table, cached for KNOWLEDGE_BASE_TTL_SECONDS.
+
+        Concurrent misses for the same table share a single fetch. Failed
+        fetches raise and are not cached.
+
+        Args:
+            table: Knowledge base table name
+
+        Returns:
+            List of all records in the table
+        """
+        entry = self._kb_cache.get(table)
+        if entry and entry[0] > monotonic():
+            logger.debug(f"Serving {table} from knowledge base cache")
+            return entry[1]
+
+        async with self._kb_locks[table]:
+            # Another request may have refreshed it while we waited
+            entry = self._kb_cache.get(table)
+            if entry and entry[0] > monotonic():
+                return entry[1]
+
+            rows, _ = await self.select(table, {'select': '*'})
+            rows = rows or []
+            self._kb_cache[table] = (monotonic() + KNOWLEDGE_BASE_TTL_SECONDS, rows)
+            return rows
+
+    def invalidate_knowledge_base_cache(self) -> None:
+        """Drop cached allergen/PFAS knowledge bases so the next read refetches them."""
+        self._kb_cache.clear()
+
     async def get_all_allergens(self) -> List[Dict[str, Any]]:
         """Get all allergens from knowledge base.
 
@@ -289,8 +576,7 @@ class DatabaseService:
             return []
 
         try:
-            response = self.client.table('allergens').select('*').execute()
-            return response.data or []
+            return await self._get_knowledge_base('allergens')
         except Exception as e:
             logger.error(f"Failed to get allergens: {e}")
             return []
@@ -305,8 +591,7 @@ class DatabaseService:
             return []
 
         try:
-            response = self.client.table('pfas_compounds').select('*').execute()
-            return response.data or []
+            return await self._get_knowledge_base('pfas_compounds')
         except Exception as e:
             logger.error(f"Failed to get PFAS compounds: {e}")
             return []
@@ -373,7 +658,7 @@ class DatabaseService:
                     return None
 
                 # Check freshness (reviews change, cache for 7 days)
-                analyzed_at = datetime.fromisoformat(cached['analyzed_at'].replace('Z', '+00:00'))
+                analyzed_at = datetime.fromisoformat(cached['analyzed_at'])
                 age_days = (datetime.now(timezone.utc) - analyzed_at).days
 
                 if age_days < 7:
@@ -0,0 +1,175 @@
+"""In-process cache for semantic review search results.
+
+Two tiers, both namespaced by the search filters:
+- exact: the same normalized query string returns the stored results
+- semantic: a query whose embedding is within SEMANTIC_MATCH_THRESHOLD cosine
+  similarity of a cached query returns that query's results, skipping the
+  pgvector search and Cohere rerank
+
+Embeddings are kept as a 1-bit-per-dimension sign signature (the same rule as
+Cohere's ubinary embeddings) plus a float32 copy. The semantic scan compares
+signatures with XOR + popcount and only rescores the few close candidates
+with the float cosine.
+"""
+
+import logging
+import math
+from array import array
+from collections import OrderedDict
+from operator import mul
+from time import monotonic
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Reviews only change when a product is (re-)analyzed
+REVIEW_SEARCH_CACHE_TTL_SECONDS = 300
+SEMANTIC_MATCH_THRESHOLD = 0.95
+
+# Maps the bytes False/True to the digits "0"/"1"
+_BIT_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+class ReviewSearchCache:
+    """TTL'd LRU of review search results with a semantic-similarity fallback."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = REVIEW_SEARCH_CACHE_TTL_SECONDS,
+        threshold: float = SEMANTIC_MATCH_THRESHOLD,
+        max_entries: int = 1024,
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            ttl_seconds: How long a cached result stays valid
+            threshold: Minimum cosine similarity for a semantic hit
+            max_entries: Entries kept before the least recently used is evicted
+        """
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # Signatures of vectors at the threshold angle differ in about angle/pi
+        # of their bits; allow twice that before rescoring with the floats
+        self._max_hamming_ratio = min(0.5, 2 * math.acos(threshold) / math.pi)
+        # (query, filters) -> (expiry, sign signature, unit-length float32 embedding, results)
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, int, array, List[Dict[str, Any]]]]" = OrderedDict()
+        # filters -> queries cached under them, for the semantic scan
+        self._by_filters: Dict[Hashable, Dict[str, None]] = {}
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Collapse case and whitespace so trivially different queries share an entry."""
+        return " ".join(query.lower().split())
+
+    def get_exact(self, query: str, filters: Hashable) -> Optional[List[Dict[str, Any]]]:
+        """Return cached results for this exact query and filters.
+
+        Args:
+            query: Search query
+            filters: Hashable search filters (product, counts, rating, verified)
+
+        Returns:
+            Cached results, or None on a miss
+        """
+        key = (self.normalize_query(query), filters)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[3]
+
+    def get_similar(
+        self,
+        embedding: List[float],
+        filters: Hashable
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Return results of the most similar cached query under the same filters.
+
+        Args:
+            embedding: Query embedding
+            filters: Hashable search filters (product, counts, rating, verified)
+
+        Returns:
+            Cached results if a query is at least `threshold` similar, else None
+        """
+        queries = self._by_filters.get(filters)
+        if not queries:
+            return None
+
+        signature = _signature(embedding)
+        max_hamming = int(len(embedding) * self._max_hamming_ratio)
+        vector = None
+        now = monotonic()
+        best_key, best_score = None, self.threshold
+        for query in list(queries):
+            key = (query, filters)
+            expiry, cached_signature, cached_vector, _ = self._entries[key]
+            if expiry <= now:
+                self._remove(key)
+                continue
+            if (signature ^ cached_signature).bit_count() > max_hamming:
+                continue
+            if vector is None:
+                vector = _unit(embedding)
+            score = sum(map(mul, vector, cached_vector))
+            if score >= best_score:
+                best_key, best_score = key, score
+
+        if best_key is None:
+            return None
+        logger.info(f"Review search semantic cache hit: '{best_key[0]}' (similarity {best_score:.3f})")
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key][3]
+
+    def put(
+        self,
+        query: str,
+        embedding: List[float],
+        filters: Hashable,
+        results: List[Dict[str, Any]]
+    ) -> None:
+        """Cache search results.
+
+        Args:
+            query: Search query
+            embedding: Query embedding
+            filters: Hashable search filters (product, counts, rating, verified)
+            results: Search results to return for this and similar queries
+        """
+        normalized = self.normalize_query(query)
+        key = (normalized, filters)
+        self._entries[key] = (
+            monotonic() + self.ttl_seconds,
+            _signature(embedding),
+            array('f', _unit(embedding)),
+            results,
+        )
+        self._entries.move_to_end(key)
+        self._by_filters.setdefault(filters, {})[normalized] = None
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Tuple[str, Hashable]) -> None:
+        """Drop an entry from both indexes."""
+        del self._entries[key]
+        query, filters = key
+        queries = self._by_filters[filters]
+        del queries[query]
+        if not queries:
+            del self._by_filters[filters]
+
+
+def _signature(vector: List[float]) -> int:
+    """Pack the signs of a vector into an int, one bit per dimension."""
+    return int(bytes(x > 0 for x in vector).translate(_BIT_DIGITS), 2)
+
+
+def _unit(vector: List[float]) -> List[float]:
+    """Scale a vector to unit length so a dot product is its cosine similarity."""
+    norm = math.sqrt(sum(map(mul, vector, vector))) or 1.0
+    return [x / norm for x in vector]
@@ -3,21 +3,30 @@
 Uses Cohere for embeddings and reranking, Supabase pgvector for storage.
 """
 
+import asyncio
 import logging
 import re
-from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
+from functools import partial
+from typing import List, Dict, Any, Hashable, Optional, Tuple, TYPE_CHECKING
 from datetime import datetime, timezone
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
 from .config import settings
 from .database import db
+from .review_search_cache import ReviewSearchCache
 
 if TYPE_CHECKING:
     import cohere
 
 logger = logging.getLogger(__name__)
 
+# Only review containers (and their descendants) are built into the parse tree
+REVIEW_DIV_STRAINER = SoupStrainer('div', attrs={'data-hook': 'review'})
+
+# Cohere accepts at most 96 texts per embed call
+EMBED_BATCH_SIZE = 96
+
 
 def clean_text(text: str) -> str:
     """Clean text before embedding.
@@ -57,6 +66,19 @@ class ReviewVectorService:
         self._embedding_cache: Dict[str, List[float]] = {}
         self._cache_max_size = 1000
 
+        # Search results for exact and near-duplicate queries
+        self._search_cache = ReviewSearchCache()
+        # Searches currently running, keyed by (normalized query, filters), so
+        # concurrent identical searches share one embed + RPC + rerank
+        self._inflight_searches: Dict[Tuple[str, Hashable], "asyncio.Task[List[Dict[str, Any]]]"] = {}
+
+        # Query embeddings waiting for the next batched Cohere call
+        self._pending_queries: List[Tuple[str, "asyncio.Future[Optional[List[float]]]"]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._embed_tasks: set = set()
+        # Bounds concurrent pgvector searches and Cohere reranks
+        self._search_semaphore = asyncio.Semaphore(settings.review_search_max_concurrency)
+
     def _init_cohere(self):
         """Initialize Cohere client lazily."""
         if self.co is None:
@@ -135,7 +157,7 @@ class ReviewVectorService:
             return [None] * len(texts)
 
         all_embeddings: List[Optional[List[float]]] = []
-        batch_size = 96  # Cohere limit
+        batch_size = EMBED_BATCH_SIZE
 
         for i in range(0, len(texts), batch_size):
             batch = texts[i:i + batch_size]
@@ -177,6 +199,67 @@ class ReviewVectorService:
 
         return all_embeddings
 
+    async def embed_query(self, query: str) -> Optional[List[float]]:
+        """Embed a search query, batched with other queries arriving together.
+
+        Queries are collected for query_embed_batch_window_ms (or until a full
+        Cohere batch is waiting) and embedded with one call in a worker
+        thread, so concurrent searches neither block the event loop nor make
+        one Cohere request each.
+
+        Args:
+            query: Search query
+
+        Returns:
+            1536-dimensional embedding vector, or None if failed
+        """
+        cached = self._get_cached_embedding(query, "search_query")
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending_queries.append((query, future))
+        if len(self._pending_queries) >= EMBED_BATCH_SIZE:
+            self._flush_queries()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(
+                settings.query_embed_batch_window_ms / 1000, self._flush_queries
+            )
+        return await future
+
+    def _flush_queries(self) -> None:
+        """Start embedding every pending query in one batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending_queries = self._pending_queries, []
+        if not pending:
+            return
+        task = asyncio.get_running_loop().create_task(self._embed_pending(pending))
+        # Hold a reference so the task isn't garbage collected mid-flight
+        self._embed_tasks.add(task)
+        task.add_done_callback(self._embed_tasks.discard)
+
+    async def _embed_pending(
+        self,
+        pending: List[Tuple[str, "asyncio.Future[Optional[List[float]]]"]]
+    ) -> None:
+        """Embed a batch of queries and resolve their futures."""
+        queries = list(dict.fromkeys(query for query, _ in pending))
+        try:
+            embeddings = await asyncio.to_thread(self.embed_batch, queries, "search_query")
+            by_query = dict(zip(queries, embeddings))
+        except Exception as e:
+            logger.error(f"Cohere query batch embed failed: {e}")
+            by_query = {}
+
+        if len(pending) > 1:
+            logger.info(f"Embedded {len(queries)} search queries in one batch for {len(pending)} searches")
+        for query, future in pending:
+            if not future.done():
+                future.set_result(by_query.get(query))
+
     def rerank(self, query: str, documents: List[str], top_n: int = 10) -> List[Dict[str, Any]]:
         """Rerank documents by relevance using Cohere.
 
@@ -228,10 +311,7 @@ class ReviewVectorService:
         """
         reviews = []
 
-        # Debug: Log raw HTML stats
-        html_size_kb = len(html) / 1024
-        string_count = html.count('data-hook="review"') + html.count("data-hook='review'")
-        logger.info(f"📝 Parsing reviews: {html_size_kb:.1f}KB HTML, {string_count} data-hook='review' string matches")
+        logger.info(f"📝 Parsing reviews: {len(html) / 1024:.1f}KB HTML")
 
         # Check if this is concatenated multi-page HTML
         # The extension joins pages with <!-- REVIEWS_PAGE_N --> markers
@@ -244,8 +324,9 @@ class ReviewVectorService:
 
         review_divs = []
         for i, chunk in enumerate(page_chunks):
-            # Use html.parser - more forgiving of Amazon's messy HTML than lxml
-            soup = BeautifulSoup(chunk, 'html.parser')
+            # Use html.parser - more forgiving of Amazon's messy HTML than lxml.
+            # The strainer skips building the ~2MB of surrounding page markup.
+            soup = BeautifulSoup(chunk, 'html.parser', parse_only=REVIEW_DIV_STRAINER)
             chunk_divs = soup.find_all('div', {'data-hook': 'review'})
             logger.debug(f"📝 Page chunk {i+1}: found {len(chunk_divs)} review divs")
             review_divs.extend(chunk_divs)
@@ -311,6 +392,87 @@ class ReviewVectorService:
         logger.info(f"Parsed {len(reviews)} reviews from HTML")
         return reviews
 
+    def prepare_reviews(
+        self,
+        url_hash: str,
+        product_url: str,
+        reviews_html: str,
+        source: str = "client",
+        pages_fetched: int = 1
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Parse and embed reviews into review_chunks and review_summaries rows.
+
+        Args:
+            url_hash: Product URL hash (links to product_analyses)
+            product_url: Original product URL
+            reviews_html: Raw HTML containing reviews
+            source: "client" or "scraper"
+            pages_fetched: Number of pages fetched
+
+        Returns:
+            Tuple of (review_chunks rows, review_summaries row or None if no reviews)
+        """
+        # Parse reviews from HTML
+        reviews = self.parse_reviews_html(reviews_html)
+        if not reviews:
+            logger.info("No reviews parsed from HTML")
+            return [], None
+
+        # Batch embed all reviews
+        review_texts = [r.get('review_text', '') for r in reviews]
+        embeddings = self.embed_batch(review_texts, input_type="search_document")
+
+        fetched_at = datetime.now(timezone.utc).isoformat()
+        rows = []
+        rating_counts = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+        verified_count = 0
+
+        for i, (review, embedding) in enumerate(zip(reviews, embeddings)):
+            # Track rating distribution and verified purchases
+            rating = review.get('review_rating')
+            if rating and 1 <= rating <= 5:
+                rating_counts[rating] += 1
+            verified = review.get('verified_purchase', False)
+            verified_count += bool(verified)
+
+            rows.append({
+                'url_hash': url_hash,
+                'product_url': product_url,
+                'review_text': review.get('review_text', '')[:10000],  # Limit text length
+                'review_rating': rating,
+                'reviewer_name': review.get('reviewer_name'),
+                'review_date': review.get('review_date'),
+                'verified_purchase': verified,
+                'helpful_votes': review.get('helpful_votes', 0),
+                'embedding': embedding,  # None if embedding failed
+                'chunk_index': i,
+                'source': source,
+                'page_number': (i // 10) + 1,  # Approximate page number
+                'fetched_at': fetched_at,
+            })
+
+        total_reviews = sum(rating_counts.values())
+        avg_rating = sum(r * c for r, c in rating_counts.items()) / max(total_reviews, 1)
+
+        summary = {
+            'url_hash': url_hash,
+            'product_url': product_url,
+            'total_reviews': total_reviews,
+            'pages_fetched': pages_fetched,
+            'rating_5_count': rating_counts[5],
+            'rating_4_count': rating_counts[4],
+            'rating_3_count': rating_counts[3],
+            'rating_2_count': rating_counts[2],
+            'rating_1_count': rating_counts[1],
+            'verified_ratio': verified_count / max(total_reviews, 1),
+            'avg_rating': round(avg_rating, 2),
+            'source': source,
+            'fetched_at': fetched_at,
+            'updated_at': fetched_at,
+        }
+
+        return rows, summary
+
     async def store_reviews(
         self,
         url_hash: str,
@@ -321,6 +483,9 @@ class ReviewVectorService:
     ) -> Tuple[int, int]:
         """Parse, embed, and store reviews in Supabase.
 
+        For a fresh analysis prefer prepare_reviews() plus
+        db.store_analysis_with_reviews(), which writes everything in one call.
+
         Args:
             url_hash: Product URL hash (links to product_analyses)
             product_url: Original product URL
@@ -335,54 +500,21 @@ class ReviewVectorService:
             logger.warning("Database not available - skipping review storage")
             return 0, 0
 
-        # Parse reviews from HTML
-        reviews = self.parse_reviews_html(reviews_html)
-        if not reviews:
-            logger.info("No reviews parsed from HTML")
+        rows, summary = self.prepare_reviews(
+            url_hash, product_url, reviews_html, source, pages_fetched
+        )
+        if not rows:
             return 0, 0
 
-        logger.info(f"Storing {len(reviews)} reviews for {url_hash[:16]}...")
-
-        # Extract review texts for batch embedding
-        review_texts = [r.get('review_text', '') for r in reviews]
-
-        # Batch embed all reviews
-        embeddings = self.embed_batch(review_texts, input_type="search_document")
+        logger.info(f"Storing {len(rows)} reviews for {url_hash[:16]}...")
 
         # Store each review with its embedding
         stored = 0
         failed = 0
-        rating_counts = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
 
-        for i, (review, embedding) in enumerate(zip(reviews, embeddings)):
+        for i, chunk_data in enumerate(rows):
             try:
-                # Track rating distribution
-                rating = review.get('review_rating')
-                if rating and 1 <= rating <= 5:
-                    rating_counts[rating] += 1
-
-                # Prepare data for Supabase
-                chunk_data = {
-                    'url_hash': url_hash,
-                    'product_url': product_url,
-                    'review_text': review.get('review_text', '')[:10000],  # Limit text length
-                    'review_rating': rating,
-                    'reviewer_name': review.get('reviewer_name'),
-                    'review_date': review.get('review_date'),
-                    'verified_purchase': review.get('verified_purchase', False),
-                    'helpful_votes': review.get('helpful_votes', 0),
-                    'chunk_index': i,
-                    'source': source,
-                    'page_number': (i // 10) + 1,  # Approximate page number
-                    'fetched_at': datetime.now(timezone.utc).isoformat(),
-                }
-
-                # Add embedding if available
-                if embedding:
-                    chunk_data['embedding'] = embedding
-
-                # Insert into Supabase
-                result = db.supabase.table('review_chunks').insert(chunk_data).execute()
+                result = db.client.table('review_chunks').insert(chunk_data).execute()
 
                 if result.data:
                     stored += 1
@@ -395,29 +527,8 @@ class ReviewVectorService:
 
         # Update or create review summary
         try:
-            total_reviews = sum(rating_counts.values())
-            verified_count = sum(1 for r in reviews if r.get('verified_purchase'))
-            avg_rating = sum(r * c for r, c in rating_counts.items()) / max(total_reviews, 1)
-
-            summary_data = {
-                'url_hash': url_hash,
-                'product_url': product_url,
-                'total_reviews': total_reviews,
-                'pages_fetched': pages_fetched,
-                'rating_5_count': rating_counts[5],
-                'rating_4_count': rating_counts[4],
-                'rating_3_count': rating_counts[3],
-                'rating_2_count': rating_counts[2],
-                'rating_1_count': rating_counts[1],
-                'verified_ratio': verified_count / max(total_reviews, 1),
-                'avg_rating': round(avg_rating, 2),
-                'source': source,
-                'fetched_at': datetime.now(timezone.utc).isoformat(),
-                'updated_at': datetime.now(timezone.utc).isoformat(),
-            }
-
-            db.supabase.table('review_summaries').upsert(
-                summary_data,
+            db.client.table('review_summaries').upsert(
+                summary,
                 on_conflict='url_hash'
             ).execute()
 
@@ -434,7 +545,8 @@ class ReviewVectorService:
         top_k: int = 30,
         rerank_top_n: int = 10,
         min_rating: Optional[int] = None,
-        verified_only: bool = False
+        verified_only: bool = False,
+        text_max_len: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """Search reviews by semantic similarity with optional reranking.
 
@@ -445,6 +557,8 @@ class ReviewVectorService:
             rerank_top_n: Number of results after reranking
             min_rating: Filter by minimum rating (optional)
             verified_only: Only include verified purchases
+            text_max_len: Truncate review_text in the returned results to this
+                many characters (optional; reranking always sees the full text)
 
         Returns:
             List of relevant review chunks with similarity scores
@@ -452,54 +566,123 @@ class ReviewVectorService:
         if not db.is_available:
             return []
 
+        filters = (url_hash, top_k, rerank_top_n, min_rating, verified_only, text_max_len)
+        cached = self._search_cache.get_exact(query, filters)
+        if cached is not None:
+            return cached
+
+        # The search runs in its own task that every caller awaits through a
+        # shield, so a cancelled caller never cancels a search others share
+        flight_key = (ReviewSearchCache.normalize_query(query), filters)
+        inflight = self._inflight_searches.get(flight_key)
+        if inflight is None:
+            inflight = asyncio.create_task(self._search_uncached(query, filters))
+            self._inflight_searches[flight_key] = inflight
+            inflight.add_done_callback(partial(self._finish_inflight_search, flight_key))
+        return await asyncio.shield(inflight)
+
+    def _finish_inflight_search(
+        self,
+        flight_key: Tuple[str, Hashable],
+        task: "asyncio.Task[List[Dict[str, Any]]]"
+    ) -> None:
+        """Forget a finished search task so the next identical query starts a fresh one."""
+        if self._inflight_searches.get(flight_key) is task:
+            del self._inflight_searches[flight_key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved so failures nobody awaited don't warn
+
+    async def _search_uncached(
+        self,
+        query: str,
+        filters: Tuple[Optional[str], int, int, Optional[int], bool, Optional[int]]
+    ) -> List[Dict[str, Any]]:
+        """Embed the query, then serve a semantic cache hit or run the search.
+
+        Args:
+            query: Search query
+            filters: (url_hash, top_k, rerank_top_n, min_rating, verified_only, text_max_len)
+
+        Returns:
+            List of relevant review chunks with similarity scores
+        """
         # Embed query
-        query_embedding = self.embed_text(query, input_type="search_query")
+        query_embedding = await self.embed_query(query)
         if not query_embedding:
             logger.warning("Failed to embed query")
             return []
 
-        try:
-            # Build filter conditions
-            # Use Supabase RPC for vector search
-            result = db.supabase.rpc(
-                'search_reviews',
-                {
-                    'query_embedding': query_embedding,
-                    'match_url_hash': url_hash,
-                    'match_threshold': 0.3,
-                    'match_count': top_k
-                }
-            ).execute()
-
-            if not result.data:
-                return []
+        cached = self._search_cache.get_similar(query_embedding, filters)
+        if cached is not None:
+            return cached
 
-            # Apply additional filters
-            candidates = result.data
-            if min_rating:
-                candidates = [c for c in candidates if c.get('review_rating', 0) >= min_rating]
-            if verified_only:
-                candidates = [c for c in candidates if c.get('verified_purchase')]
+        try:
+            async with self._search_semaphore:
+                results = await self._search_and_rerank(
+                    query, query_embedding, *filters
+                )
+        except Exception as e:
+            logger.error(f"Review search failed: {e}")
+            return []
 
-            # Rerank results
-            if candidates and len(candidates) > 1:
-                documents = [c['review_text'] for c in candidates]
-                reranked = self.rerank(query, documents, top_n=rerank_top_n)
+        # Empty results may come from a failed rerank - don't pin those for the TTL
+        if results:
+            self._search_cache.put(query, query_embedding, filters, results)
+        return results
 
-                # Map back to original results with rerank scores
-                final_results = []
-                for r in reranked:
-                    candidate = candidates[r['index']]
-                    candidate['rerank_score'] = r['score']
-                    final_results.append(candidate)
-                return final_results
+    async def _search_and_rerank(
+        self,
+        query: str,
+        query_embedding: List[float],
+        url_hash: Optional[str],
+        top_k: int,
+        rerank_top_n: int,
+        min_rating: Optional[int],
+        verified_only: bool,
+        text_max_len: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        """Run the filtered pgvector search and rerank (uncached).
 
-            return candidates[:rerank_top_n]
+        Raises:
+            Exception: If the vector search RPC fails
+        """
+        # Use Supabase RPC for vector search. Rating and verified filters are
+        # applied during the index scan, so top_k rows come back already filtered.
+        candidates = await db.rpc(
+            'search_reviews',
+            {
+                'query_embedding': query_embedding,
+                'match_url_hash': url_hash,
+                'match_threshold': 0.3,
+                'match_count': top_k,
+                'match_min_rating': min_rating,
+                'match_verified_only': verified_only
+            }
+        )
 
-        except Exception as e:
-            logger.error(f"Review search failed: {e}")
+        if not candidates:
             return []
 
+        # Rerank results on the full review text
+        if len(candidates) > 1:
+            documents = [c['review_text'] for c in candidates]
+            reranked = await asyncio.to_thread(self.rerank, query, documents, rerank_top_n)
+
+            # Map back to original results with rerank scores
+            final_results = []
+            for r in reranked:
+                candidate = candidates[r['index']]
+                candidate['rerank_score'] = r['score']
+                final_results.append(candidate)
+        else:
+            final_results = candidates[:rerank_top_n]
+
+        # Truncate only the rows being returned
+        if text_max_len is not None:
+            for result in final_results:
+                result['review_text'] = result['review_text'][:text_max_len]
+        return final_results
+
     async def get_review_summary(self, url_hash: str) -> Optional[Dict[str, Any]]:
         """Get review summary for a product.
 
@@ -7,14 +7,17 @@ Provides:
 - Aggregate tracking per analysis session
 """
 
+import hashlib
+import json
 import logging
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime, timezone
 
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 
-from .config import settings
+from .claude_client import claude_client
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +38,19 @@ PRICING = {
 # Default pricing for unknown models
 DEFAULT_PRICING = {"input": 3.00, "output": 15.00}
 
+# Prompt caching multipliers on the input price (5-minute ephemeral cache)
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.10
+
+# Rough characters-per-token ratio for estimating the uncached request tail
+CHARS_PER_TOKEN = 4
+
+# Token counts of cacheable prompt prefixes (tools + cached system blocks),
+# keyed by a digest of their content so a changed prompt or knowledge base
+# is counted again
+_prefix_token_counts: "OrderedDict[bytes, int]" = OrderedDict()
+_PREFIX_TOKEN_COUNTS_MAX = 32
+
 
 @dataclass
 class TokenUsage:
@@ -45,6 +61,8 @@ class TokenUsage:
     input_tokens: int
     output_tokens: int
     input_tokens_estimated: Optional[int] = None  # Pre-request estimate
+    cache_creation_input_tokens: int = 0  # Prompt-cache writes (not in input_tokens)
+    cache_read_input_tokens: int = 0  # Prompt-cache hits (not in input_tokens)
     timestamp: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
 
     @property
@@ -54,9 +72,14 @@ class TokenUsage:
 
     @property
     def input_cost(self) -> float:
-        """Cost for input tokens in USD."""
+        """Cost for input tokens in USD, including prompt-cache writes and reads."""
         pricing = PRICING.get(self.model, DEFAULT_PRICING)
-        return (self.input_tokens / 1_000_000) * pricing["input"]
+        billed_input = (
+            self.input_tokens
+            + self.cache_creation_input_tokens * CACHE_WRITE_MULTIPLIER
+            + self.cache_read_input_tokens * CACHE_READ_MULTIPLIER
+        )
+        return (billed_input / 1_000_000) * pricing["input"]
 
     @property
     def output_cost(self) -> float:
@@ -77,6 +100,8 @@ class TokenUsage:
             "input_tokens": self.input_tokens,
             "output_tokens": self.output_tokens,
             "input_tokens_estimated": self.input_tokens_estimated,
+            "cache_creation_input_tokens": self.cache_creation_input_tokens,
+            "cache_read_input_tokens": self.cache_read_input_tokens,
             "total_tokens": self.total_tokens,
             "input_cost_usd": round(self.input_cost, 6),
             "output_cost_usd": round(self.output_cost, 6),
@@ -163,7 +188,7 @@ class TokenTracker:
         tracker.start_analysis("abc123")
 
         # Before API call - count tokens (optional)
-        estimated = tracker.count_tokens(model, system, messages)
+        estimated = await tracker.count_tokens(model, messages, system)
 
         # After API call - record usage
         tracker.record_usage("product_extraction", model, response.usage)
@@ -175,14 +200,9 @@ class TokenTracker:
 
     def __init__(self):
         """Initialize token tracker."""
-        self.client: Optional[Anthropic] = None
+        self.client: AsyncAnthropic = claude_client
         self._current_analysis: Optional[AnalysisTokenSummary] = None
 
-    def _init_client(self):
-        """Initialize Anthropic client lazily."""
-        if self.client is None:
-            self.client = Anthropic(api_key=settings.anthropic_api_key)
-
     def start_analysis(self, url_hash: str):
         """Start tracking a new analysis.
 
@@ -192,11 +212,11 @@ class TokenTracker:
         self._current_analysis = AnalysisTokenSummary(url_hash=url_hash)
         logger.info(f"🔢 Token tracking started for {url_hash[:16]}...")
 
-    def count_tokens(
+    async def count_tokens(
         self,
         model: str,
         messages: List[Dict[str, Any]],
-        system: Optional[str] = None,
+        system: Optional[Union[str, List[Dict[str, Any]]]] = None,
         tools: Optional[List[Dict[str, Any]]] = None,
     ) -> int:
         """Count tokens before sending a request.
@@ -206,14 +226,12 @@ class TokenTracker:
         Args:
             model: Model name
             messages: List of message dicts
-            system: Optional system prompt
+            system: Optional system prompt (string or content blocks)
             tools: Optional list of tool definitions
 
         Returns:
             Estimated input token count
         """
-        self._init_client()
-
         try:
             params: Dict[str, Any] = {
                 "model": model,
@@ -226,7 +244,7 @@ class TokenTracker:
             if tools:
                 params["tools"] = tools
 
-            response = self.client.messages.count_tokens(**params)
+            response = await self.client.messages.count_tokens(**params)
             estimated_tokens = response.input_tokens
 
             logger.info(f"🔢 Pre-request estimate: {estimated_tokens:,} input tokens")
@@ -236,6 +254,60 @@ class TokenTracker:
             logger.warning(f"Token counting failed: {e}")
             return 0
 
+    async def estimate_input_tokens(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        system: List[Dict[str, Any]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+    ) -> int:
+        """Estimate input tokens without a count_tokens call per request.
+
+        The cacheable prefix (tools plus the system blocks up to the last
+        `cache_control` breakpoint) is counted with the count_tokens API once
+        per distinct content and memoized. The rest of the system prompt and
+        the messages are estimated from their length.
+
+        Args:
+            model: Model name
+            messages: List of message dicts (string content)
+            system: System prompt content blocks
+            tools: Optional list of tool definitions
+
+        Returns:
+            Estimated input token count
+        """
+        split = 0
+        for i, block in enumerate(system):
+            if "cache_control" in block:
+                split = i + 1
+        prefix, tail = system[:split], system[split:]
+
+        key = hashlib.blake2b(
+            json.dumps([model, prefix, tools], sort_keys=True).encode(),
+            digest_size=16,
+        ).digest()
+        prefix_tokens = _prefix_token_counts.get(key)
+        if prefix_tokens is None:
+            # count_tokens needs a message; a one-character one adds a few tokens
+            prefix_tokens = await self.count_tokens(
+                model, [{"role": "user", "content": "."}], prefix or None, tools
+            )
+            if not prefix_tokens:
+                return 0
+            _prefix_token_counts[key] = prefix_tokens
+            if len(_prefix_token_counts) > _PREFIX_TOKEN_COUNTS_MAX:
+                _prefix_token_counts.popitem(last=False)
+        else:
+            _prefix_token_counts.move_to_end(key)
+
+        tail_chars = sum(len(block.get("text", "")) for block in tail)
+        tail_chars += sum(len(str(message["content"])) for message in messages)
+        estimated_tokens = prefix_tokens + tail_chars // CHARS_PER_TOKEN
+
+        logger.info(f"🔢 Pre-request estimate: {estimated_tokens:,} input tokens ({prefix_tokens:,} in cached prefix)")
+        return estimated_tokens
+
     def record_usage(
         self,
         call_name: str,
@@ -260,6 +332,8 @@ class TokenTracker:
             input_tokens=usage.input_tokens,
             output_tokens=usage.output_tokens,
             input_tokens_estimated=estimated_input,
+            cache_creation_input_tokens=getattr(usage, "cache_creation_input_tokens", 0) or 0,
+            cache_read_input_tokens=getattr(usage, "cache_read_input_tokens", 0) or 0,
         )
 
         # Log detailed usage
@@ -278,13 +352,19 @@ class TokenTracker:
         logger.info("-" * 50)
 
         if usage.input_tokens_estimated:
-            diff = usage.input_tokens - usage.input_tokens_estimated
+            # Estimates cover the whole prompt, cached or not
+            actual = usage.input_tokens + usage.cache_creation_input_tokens + usage.cache_read_input_tokens
+            diff = actual - usage.input_tokens_estimated
             diff_pct = (diff / usage.input_tokens_estimated) * 100 if usage.input_tokens_estimated else 0
             logger.info(f"   Estimated:  {usage.input_tokens_estimated:,} tokens")
-            logger.info(f"   Actual:     {usage.input_tokens:,} tokens ({diff:+,}, {diff_pct:+.1f}%)")
+            logger.info(f"   Actual:     {actual:,} tokens ({diff:+,}, {diff_pct:+.1f}%)")
         else:
             logger.info(f"   Input:      {usage.input_tokens:,} tokens")
 
+        if usage.cache_creation_input_tokens or usage.cache_read_input_tokens:
+            logger.info(f"   Cache write: {usage.cache_creation_input_tokens:,} tokens")
+            logger.info(f"   Cache read:  {usage.cache_read_input_tokens:,} tokens")
+
         logger.info(f"   Output:     {usage.output_tokens:,} tokens")
         logger.info(f"   Total:      {usage.total_tokens:,} tokens")
         logger.info("-" * 50)
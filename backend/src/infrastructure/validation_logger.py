@@ -1,11 +1,23 @@
 """Validation logger for tracking Claude AI misclassifications."""
 
+import asyncio
 import logging
 from datetime import datetime, timezone
 from typing import Dict, List, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# Background writer bounds: logs beyond the queue size are dropped rather
+# than slowing down analyses, and are inserted in batches of LOG_BATCH_SIZE
+LOG_QUEUE_MAX_SIZE = 10_000
+LOG_BATCH_SIZE = 100
+
+# Union of the columns any log type sets, so mixed batches insert in one request
+LOG_INSERT_COLUMNS = (
+    "log_type,product_url,product_name,substance_name,severity,"
+    "confidence,category,cas_number,source,details"
+)
+
 
 class ValidationLogger:
     """Logs validation failures when Claude misclassifies substances to Supabase."""
@@ -15,6 +27,43 @@ class ValidationLogger:
         # Import here to avoid circular dependency
         from .database import db
         self.db = db
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the background writer. Until started, logs are written inline."""
+        if self._writer is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=LOG_QUEUE_MAX_SIZE)
+        self._writer = asyncio.create_task(self._drain())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Flush queued logs (up to `timeout` seconds) and stop the background writer."""
+        if self._writer is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️  Dropping {self._queue.qsize()} unwritten validation logs on shutdown")
+        self._writer.cancel()
+        self._writer = None
+        self._queue = None
+
+    async def _drain(self) -> None:
+        """Insert queued logs in batches until cancelled."""
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < LOG_BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await self.db.insert('validation_logs', batch, columns=LOG_INSERT_COLUMNS)
+                logger.debug(f"✅ Stored {len(batch)} validation logs")
+            except Exception as e:
+                logger.error(f"❌ Failed to write {len(batch)} validation logs to database: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
 
     def log_invalid_allergen(
         self,
@@ -192,6 +241,9 @@ class ValidationLogger:
     def _write_to_db(self, log_data: Dict[str, Any]) -> None:
         """Write log entry to Supabase database.
 
+        Queued for the background writer when it is running, so the request
+        path never waits on the insert.
+
         Args:
             log_data: Dictionary with log data matching validation_logs table schema
         """
@@ -199,6 +251,13 @@ class ValidationLogger:
             logger.warning("⚠️  Supabase not available, validation log not stored")
             return
 
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(log_data)
+            except asyncio.QueueFull:
+                logger.warning(f"⚠️  Validation log queue full, dropping {log_data['log_type']} log")
+            return
+
         try:
             self.db.client.table('validation_logs').insert(log_data).execute()
             logger.debug(f"✅ Validation log stored: {log_data['log_type']}")
@@ -0,0 +1,8 @@
+-- Migration: Composite index for keyset pagination of validation logs
+-- Purpose: Let /api/admin/validation-logs page on (timestamp DESC, id DESC)
+--          without OFFSET scans, so deep pages cost the same as the first
+-- Author: Backend team
+-- Date: 2026-10-15
+
+CREATE INDEX IF NOT EXISTS idx_validation_logs_timestamp_id
+    ON validation_logs (timestamp DESC, id DESC);
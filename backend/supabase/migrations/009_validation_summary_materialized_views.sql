@@ -0,0 +1,128 @@
+-- Migration: Pre-aggregate validation stats into materialized views
+-- Purpose: /api/admin/validation-stats re-ran get_recent_validation_summary over
+--          the raw validation_logs table on every dashboard poll. The views below
+--          hold daily aggregates and are refreshed every 5 minutes by pg_cron, so
+--          the function only reads at most ~90 days worth of pre-aggregated rows.
+-- Note: results are eventually consistent (up to 5 minutes stale) and the
+--       days_back window is aligned to whole UTC days.
+-- Author: Backend team
+-- Date: 2026-10-15
+
+-- ============================================================================
+-- 1. DAILY TOTALS
+-- ============================================================================
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_validation_summary_daily AS
+SELECT
+    date_trunc('day', timestamp) AS day,
+    COUNT(*) FILTER (WHERE log_type = 'validation_summary') AS validations,
+    COUNT(*) FILTER (WHERE log_type = 'invalid_allergen') AS invalid_allergens,
+    COUNT(*) FILTER (WHERE log_type = 'invalid_pfas') AS invalid_pfas,
+    COUNT(*) FILTER (WHERE log_type = 'reclassified_substance') AS reclassifications
+FROM validation_logs
+GROUP BY date_trunc('day', timestamp);
+
+-- Unique index is required for REFRESH ... CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_validation_summary_daily_day
+    ON mv_validation_summary_daily (day);
+
+-- ============================================================================
+-- 2. DAILY PER-PRODUCT TOTALS (distinct products + most problematic products)
+-- ============================================================================
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_validation_product_daily AS
+SELECT
+    date_trunc('day', timestamp) AS day,
+    product_url,
+    MAX(product_name) AS product_name,
+    COUNT(*) FILTER (WHERE log_type = 'validation_summary') AS validations,
+    COUNT(*) FILTER (WHERE log_type IN ('invalid_allergen', 'invalid_pfas')) AS invalid_count
+FROM validation_logs
+GROUP BY date_trunc('day', timestamp), product_url;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_validation_product_daily_day_url
+    ON mv_validation_product_daily (day, product_url);
+
+-- ============================================================================
+-- 3. REWRITE get_recent_validation_summary TO READ THE VIEWS
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION get_recent_validation_summary(
+    days_back INTEGER DEFAULT 7
+)
+RETURNS TABLE (
+    total_products_analyzed BIGINT,
+    total_invalid_allergens BIGINT,
+    total_invalid_pfas BIGINT,
+    accuracy_rate NUMERIC,
+    most_problematic_products JSONB
+) AS $$
+DECLARE
+    cutoff_day TIMESTAMPTZ := date_trunc('day', NOW() - make_interval(days => days_back));
+BEGIN
+    RETURN QUERY
+    WITH totals AS (
+        SELECT
+            COALESCE(SUM(d.validations), 0)::BIGINT AS validations,
+            COALESCE(SUM(d.invalid_allergens), 0)::BIGINT AS invalid_allergens,
+            COALESCE(SUM(d.invalid_pfas), 0)::BIGINT AS invalid_pfas
+        FROM mv_validation_summary_daily d
+        WHERE d.day >= cutoff_day
+    ),
+    products AS (
+        SELECT
+            p.product_url,
+            MAX(p.product_name) AS product_name,
+            SUM(p.validations) AS validations,
+            SUM(p.invalid_count) AS invalid_count
+        FROM mv_validation_product_daily p
+        WHERE p.day >= cutoff_day
+        GROUP BY p.product_url
+    ),
+    problematic AS (
+        SELECT pr.product_name, pr.product_url, pr.invalid_count
+        FROM products pr
+        WHERE pr.invalid_count > 0
+        ORDER BY pr.invalid_count DESC
+        LIMIT 10
+    )
+    SELECT
+        (SELECT COUNT(*) FROM products WHERE products.validations > 0)::BIGINT,
+        t.invalid_allergens,
+        t.invalid_pfas,
+        CASE
+            WHEN t.validations > 0 THEN
+                100.0 - ((t.invalid_allergens + t.invalid_pfas)::NUMERIC / t.validations) * 100
+            ELSE 0
+        END,
+        (SELECT jsonb_agg(jsonb_build_object(
+            'product_name', pb.product_name,
+            'product_url', pb.product_url,
+            'invalid_count', pb.invalid_count
+        ) ORDER BY pb.invalid_count DESC) FROM problematic pb)
+    FROM totals t;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- ============================================================================
+-- 4. SCHEDULE REFRESH EVERY 5 MINUTES (pg_cron)
+-- ============================================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_cron;
+
+SELECT cron.schedule(
+    'refresh-validation-summary',
+    '*/5 * * * *',
+    $$
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_validation_summary_daily;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_validation_product_daily;
+    $$
+);
+
+-- ============================================================================
+-- COMMENTS FOR DOCUMENTATION
+-- ============================================================================
+
+COMMENT ON MATERIALIZED VIEW mv_validation_summary_daily IS 'Daily validation log counts, refreshed every 5 minutes by pg_cron';
+COMMENT ON MATERIALIZED VIEW mv_validation_product_daily IS 'Daily validation log counts per product, refreshed every 5 minutes by pg_cron';
+COMMENT ON FUNCTION get_recent_validation_summary IS 'Returns summary statistics for recent validations (from materialized views, up to 5 minutes stale)';
@@ -0,0 +1,105 @@
+-- Migration: Store an analysis and its review embeddings in one call
+-- Purpose: /api/analyze upserted product_analyses through PostgREST and then
+--          inserted every review_chunks row with its own request. The function
+--          below writes the analysis, all review chunks and the review summary
+--          in a single transaction, so a fresh analysis costs one round trip and
+--          review_chunks never references a product_analyses row that failed to
+--          store.
+-- Author: Backend team
+-- Date: 2026-10-15
+
+CREATE OR REPLACE FUNCTION store_analysis_and_reviews(
+  p_analysis JSONB,
+  p_reviews JSONB DEFAULT '[]'::jsonb,
+  p_review_summary JSONB DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  reviews_stored INTEGER := 0;
+BEGIN
+  -- 1. Analysis (same upsert the API used to do through PostgREST)
+  INSERT INTO product_analyses (
+    product_url_hash, product_url, product_name, brand, category, retailer,
+    ingredients, harm_score, overall_score, allergens_detected, pfas_detected,
+    other_concerns, confidence, analyzed_at,
+    total_input_tokens, total_output_tokens, total_tokens, total_cost_usd,
+    api_call_count, token_usage_details
+  )
+  SELECT
+    a.product_url_hash, a.product_url, a.product_name, a.brand, a.category, a.retailer,
+    a.ingredients, a.harm_score, a.overall_score, a.allergens_detected, a.pfas_detected,
+    a.other_concerns, a.confidence, a.analyzed_at,
+    COALESCE(a.total_input_tokens, 0), COALESCE(a.total_output_tokens, 0),
+    COALESCE(a.total_tokens, 0), COALESCE(a.total_cost_usd, 0),
+    COALESCE(a.api_call_count, 0), COALESCE(a.token_usage_details, '[]'::jsonb)
+  FROM jsonb_populate_record(NULL::product_analyses, p_analysis) AS a
+  ON CONFLICT (product_url_hash) DO UPDATE SET
+    product_url = EXCLUDED.product_url,
+    product_name = EXCLUDED.product_name,
+    brand = EXCLUDED.brand,
+    category = EXCLUDED.category,
+    retailer = EXCLUDED.retailer,
+    ingredients = EXCLUDED.ingredients,
+    harm_score = EXCLUDED.harm_score,
+    overall_score = EXCLUDED.overall_score,
+    allergens_detected = EXCLUDED.allergens_detected,
+    pfas_detected = EXCLUDED.pfas_detected,
+    other_concerns = EXCLUDED.other_concerns,
+    confidence = EXCLUDED.confidence,
+    analyzed_at = EXCLUDED.analyzed_at,
+    total_input_tokens = EXCLUDED.total_input_tokens,
+    total_output_tokens = EXCLUDED.total_output_tokens,
+    total_tokens = EXCLUDED.total_tokens,
+    total_cost_usd = EXCLUDED.total_cost_usd,
+    api_call_count = EXCLUDED.api_call_count,
+    token_usage_details = EXCLUDED.token_usage_details;
+
+  -- 2. Review chunks (embeddings computed by the API)
+  INSERT INTO review_chunks (
+    url_hash, product_url, review_text, review_rating, reviewer_name, review_date,
+    verified_purchase, helpful_votes, embedding, chunk_index, source, page_number,
+    fetched_at
+  )
+  SELECT
+    r.url_hash, r.product_url, r.review_text, r.review_rating, r.reviewer_name, r.review_date,
+    COALESCE(r.verified_purchase, FALSE), COALESCE(r.helpful_votes, 0), r.embedding,
+    r.chunk_index, r.source, r.page_number, COALESCE(r.fetched_at, NOW())
+  FROM jsonb_populate_recordset(NULL::review_chunks, p_reviews) AS r;
+
+  GET DIAGNOSTICS reviews_stored = ROW_COUNT;
+
+  -- 3. Review summary
+  IF p_review_summary IS NOT NULL THEN
+    INSERT INTO review_summaries (
+      url_hash, product_url, total_reviews, pages_fetched,
+      rating_5_count, rating_4_count, rating_3_count, rating_2_count, rating_1_count,
+      verified_ratio, avg_rating, source, fetched_at, updated_at
+    )
+    SELECT
+      s.url_hash, s.product_url, s.total_reviews, s.pages_fetched,
+      s.rating_5_count, s.rating_4_count, s.rating_3_count, s.rating_2_count, s.rating_1_count,
+      s.verified_ratio, s.avg_rating, s.source, s.fetched_at, s.updated_at
+    FROM jsonb_populate_record(NULL::review_summaries, p_review_summary) AS s
+    ON CONFLICT (url_hash) DO UPDATE SET
+      product_url = EXCLUDED.product_url,
+      total_reviews = EXCLUDED.total_reviews,
+      pages_fetched = EXCLUDED.pages_fetched,
+      rating_5_count = EXCLUDED.rating_5_count,
+      rating_4_count = EXCLUDED.rating_4_count,
+      rating_3_count = EXCLUDED.rating_3_count,
+      rating_2_count = EXCLUDED.rating_2_count,
+      rating_1_count = EXCLUDED.rating_1_count,
+      verified_ratio = EXCLUDED.verified_ratio,
+      avg_rating = EXCLUDED.avg_rating,
+      source = EXCLUDED.source,
+      fetched_at = EXCLUDED.fetched_at,
+      updated_at = EXCLUDED.updated_at;
+  END IF;
+
+  RETURN reviews_stored;
+END;
+$$;
+
+COMMENT ON FUNCTION store_analysis_and_reviews IS 'Upsert a product analysis with its review chunks and review summary in one transaction';
@@ -0,0 +1,68 @@
+-- Migration: Filter review search inside the vector query
+-- Purpose: /api/reviews/search asked search_reviews for 3x the requested rows
+--          and dropped the ones below min_rating / not verified in Python, so
+--          filtered searches did extra ANN work and could still come back
+--          short. The function below applies those filters in the query, and
+--          pgvector's iterative HNSW scan keeps walking the graph until enough
+--          rows pass them, so exactly match_count filtered rows come back.
+-- Note: hnsw.iterative_scan requires pgvector 0.8+. relaxed_order can return
+--       rows slightly out of distance order, so they are re-sorted at the end.
+-- Author: Backend team
+-- Date: 2026-10-15
+
+-- The argument list changes, so drop the old signature instead of adding an
+-- overload PostgREST could not choose between
+DROP FUNCTION IF EXISTS search_reviews(vector, TEXT, FLOAT, INT);
+
+CREATE OR REPLACE FUNCTION search_reviews(
+  query_embedding vector(1536),
+  match_url_hash TEXT DEFAULT NULL,
+  match_threshold FLOAT DEFAULT 0.5,
+  match_count INT DEFAULT 10,
+  match_min_rating INT DEFAULT NULL,
+  match_verified_only BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (
+  id UUID,
+  url_hash TEXT,
+  review_text TEXT,
+  review_rating INTEGER,
+  verified_purchase BOOLEAN,
+  similarity FLOAT
+)
+LANGUAGE plpgsql
+SET hnsw.iterative_scan = relaxed_order
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH matches AS MATERIALIZED (
+    SELECT
+      rc.id,
+      rc.url_hash,
+      rc.review_text,
+      rc.review_rating,
+      rc.verified_purchase,
+      rc.embedding <=> query_embedding AS distance
+    FROM review_chunks rc
+    WHERE
+      (match_url_hash IS NULL OR rc.url_hash = match_url_hash)
+      AND (match_min_rating IS NULL OR rc.review_rating >= match_min_rating)
+      AND (NOT match_verified_only OR rc.verified_purchase)
+      AND rc.embedding IS NOT NULL
+      AND 1 - (rc.embedding <=> query_embedding) > match_threshold
+    ORDER BY rc.embedding <=> query_embedding
+    LIMIT match_count
+  )
+  SELECT
+    m.id,
+    m.url_hash,
+    m.review_text,
+    m.review_rating,
+    m.verified_purchase,
+    1 - m.distance AS similarity
+  FROM matches m
+  ORDER BY m.distance;
+END;
+$$;
+
+COMMENT ON FUNCTION search_reviews IS 'Semantic search across reviews using cosine similarity, with rating and verified-purchase filters';
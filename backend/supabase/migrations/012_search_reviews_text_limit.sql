@@ -0,0 +1,67 @@
+-- Migration: Truncate review text in search_reviews
+-- Purpose: /api/reviews/search only returns the first 500 characters of each
+--          review, but search_reviews sent the full text, which was then
+--          decoded and sliced in Python. match_text_max_len truncates in the
+--          projection so only the returned prefix crosses the wire.
+-- Note: NULL keeps the full text (the previous behaviour).
+-- Author: Backend team
+-- Date: 2026-10-15
+
+DROP FUNCTION IF EXISTS search_reviews(vector, TEXT, FLOAT, INT, INT, BOOLEAN);
+
+CREATE OR REPLACE FUNCTION search_reviews(
+  query_embedding vector(1536),
+  match_url_hash TEXT DEFAULT NULL,
+  match_threshold FLOAT DEFAULT 0.5,
+  match_count INT DEFAULT 10,
+  match_min_rating INT DEFAULT NULL,
+  match_verified_only BOOLEAN DEFAULT FALSE,
+  match_text_max_len INT DEFAULT NULL
+)
+RETURNS TABLE (
+  id UUID,
+  url_hash TEXT,
+  review_text TEXT,
+  review_rating INTEGER,
+  verified_purchase BOOLEAN,
+  similarity FLOAT
+)
+LANGUAGE plpgsql
+SET hnsw.iterative_scan = relaxed_order
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH matches AS MATERIALIZED (
+    SELECT
+      rc.id,
+      rc.url_hash,
+      rc.review_text,
+      rc.review_rating,
+      rc.verified_purchase,
+      rc.embedding <=> query_embedding AS distance
+    FROM review_chunks rc
+    WHERE
+      (match_url_hash IS NULL OR rc.url_hash = match_url_hash)
+      AND (match_min_rating IS NULL OR rc.review_rating >= match_min_rating)
+      AND (NOT match_verified_only OR rc.verified_purchase)
+      AND rc.embedding IS NOT NULL
+      AND 1 - (rc.embedding <=> query_embedding) > match_threshold
+    ORDER BY rc.embedding <=> query_embedding
+    LIMIT match_count
+  )
+  SELECT
+    m.id,
+    m.url_hash,
+    CASE
+      WHEN match_text_max_len IS NULL THEN m.review_text
+      ELSE LEFT(m.review_text, match_text_max_len)
+    END,
+    m.review_rating,
+    m.verified_purchase,
+    1 - m.distance AS similarity
+  FROM matches m
+  ORDER BY m.distance;
+END;
+$$;
+
+COMMENT ON FUNCTION search_reviews IS 'Semantic search across reviews using cosine similarity, with rating and verified-purchase filters';
@@ -0,0 +1,39 @@
+-- Migration: Drop cached analyses stored under pre-canonical URL hashes
+-- Purpose: generate_url_hash() now hashes canonical_product_url() (tracking
+--          parameters and fragments dropped, Amazon URLs collapsed to
+--          /dp/<ASIN>) instead of the raw URL. Rows stored under the hash of
+--          a raw URL that was not already canonical can no longer be looked
+--          up, and neither can their review_chunks / review_summaries rows.
+--          This deletes them; the product is re-analyzed on its next request.
+-- Note: product_url holds the raw request URL, so old-scheme rows are the ones
+--       whose hash is sha256(product_url). The URL-shape test below is a
+--       conservative approximation of "not already canonical": it may also
+--       drop a few still-reachable rows (costing one re-analysis), but never a
+--       row stored under a canonical hash. Analyses with user feedback or
+--       search references are kept. review_chunks go with their analysis
+--       (ON DELETE CASCADE).
+-- Author: Backend team
+-- Date: 2026-10-15
+
+WITH stale AS (
+  DELETE FROM product_analyses pa
+  WHERE
+    pa.product_url_hash = encode(sha256(convert_to(pa.product_url, 'UTF8')), 'hex')
+    AND (
+      pa.product_url ~ '[?#]'                -- query string or fragment
+      OR pa.product_url ~ '.+://[^/]+/.*/$'  -- trailing slash on the path
+      OR pa.product_url !~ '^[a-z]+://'      -- upper-case scheme
+      OR substring(pa.product_url FROM '^[^:]+://([^/?#]+)') ~ '[A-Z]'  -- host case
+      OR (
+        pa.product_url ~* '^[^:]+://[^/]*amazon\.'
+        AND pa.product_url ~* '/(dp|gp/product|gp/aw/d)/[A-Z0-9]{10}'
+        AND pa.product_url !~ '^https://[^/]+/dp/[A-Z0-9]{10}$'
+      )
+    )
+    AND NOT EXISTS (SELECT 1 FROM analysis_feedback af WHERE af.analysis_id = pa.id)
+    AND NOT EXISTS (SELECT 1 FROM user_searches us WHERE us.analysis_id = pa.id)
+  RETURNING pa.product_url_hash
+)
+DELETE FROM review_summaries rs
+USING stale
+WHERE rs.url_hash = stale.product_url_hash;